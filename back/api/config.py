@@ -39,6 +39,13 @@ class Config:
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Worker processes computing impacts concurrently, 1 to compute serially
+    IMPACT_PROCESS_POOL_WORKERS = os.cpu_count() or 1
+    # Minimum number of models of a project to compute them on the process pool
+    IMPACT_PROCESS_POOL_MIN_MODELS = 3
+    # Number of resources above which a model is split in subtrees computed by the workers
+    IMPACT_SHARD_THRESHOLD = 1000
+
 
 class ProdConfig(Config):
     """Production flask config"""
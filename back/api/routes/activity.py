@@ -31,7 +31,7 @@
 from typing import Any
 
 import jsonpatch
-from flask import abort, request
+from flask import Response, abort, current_app, request, stream_with_context
 
 from impacts_model.data_model import (
     db,
@@ -42,8 +42,19 @@ from impacts_model.data_model import (
 )
 from impacts_model.impacts import (
     ActivityImpactSchema,
+    ActivitySummarySchema,
+    ImpactSourceImpactSchema,
+    get_impact_categories,
 )
-from typing import Optional
+from impacts_model.display_units import get_display_units
+from impacts_model.flat import FlatImpactSchema, get_flat_impact
+from impacts_model.impact_cache import (
+    commit_activity_impacts,
+    get_activity_impact,
+    get_tree_versions,
+)
+from impacts_model.streaming import stream_activity_impact
+from typing import List, Optional
 
 
 def get_activities() -> Any:
@@ -118,19 +129,151 @@ def _exchange_parent(
             activity.subactivities[i].parent_activity_id = old_parent_id
 
 
-def get_activity_impacts(activity_id: int) -> Any:
+def get_activity_impacts(
+    activity_id: int,
+    interval: bool = False,
+    summary: bool = False,
+    sub_activities: bool = False,
+    depth: Optional[int] = None,
+    categories: Optional[List[str]] = None,
+    sub_impacts: bool = True,
+    stream: bool = False,
+    flat: bool = False,
+    units: Optional[List[str]] = None,
+) -> Any:
     """
     GET /activities/<activity_id>/impacts
     Get a activity environmental impact
     :param activity_id: the id of the activity to get the impact
-    :return: ActivityImpact if activity exist, 404 else
+    Other parameters are the ones of dump_activity_impact()
+    :return: ActivityImpact if activity exist, 404 else, 400 for an unknown category or unit, or
+    interval or depth with summary
     """
     activity: Activity = db.session.query(Activity).get_or_404(activity_id)
-    activity_impact = activity.get_impact()
-    schema = ActivityImpactSchema()
+    return dump_activity_impact(
+        activity,
+        interval=interval,
+        summary=summary,
+        sub_activities=sub_activities,
+        depth=depth,
+        categories=categories,
+        sub_impacts=sub_impacts,
+        stream=stream,
+        flat=flat,
+        units=units,
+    )
+
+
+def dump_activity_impact(
+    activity: Activity,
+    interval: bool = False,
+    summary: bool = False,
+    sub_activities: bool = False,
+    depth: Optional[int] = None,
+    categories: Optional[List[str]] = None,
+    sub_impacts: bool = True,
+    stream: bool = False,
+    flat: bool = False,
+    units: Optional[List[str]] = None,
+) -> Any:
+    """
+    Compute an activity impact and return the response of the impact routes of activities and
+    models, in the form given by the parameters
+    :param activity: the activity to get the impact
+    :param interval: if True, return the impacts min and max bounds along their nominal value
+    :param summary: if True, only return the total impact, see Activity.get_summary(). Only
+    categories apply, interval and depth cannot be set
+    :param sub_activities: with summary, add the totals of the direct sub activities
+    :param depth: levels of sub activities to return, all if None
+    :param categories: only compute these impact categories, all if None
+    :param sub_impacts: if False, impact sources sub impacts are only given as their total
+    :param stream: if True, the impact is written while computed, see stream_activity_impact()
+    :param flat: if True, return the impacts normalized in tables by id, see get_flat_impact()
+    :param units: display unit of impact categories, ex climate_change:t_co2e, see
+    get_display_units(). Units are the ones pint reduced the impacts to if None
+    :return: the dumped ActivityImpact, 400 for an unknown category or unit, or interval or
+    depth with summary
+    """
+    try:
+        impact_categories = (
+            get_impact_categories(categories) if categories is not None else None
+        )
+        display_units = get_display_units(units) if units is not None else None
+    except ValueError as err:
+        return abort(400, str(err))
+    context = {"display_units": display_units}
+
+    if summary:
+        if interval or depth is not None:
+            return abort(400, "Interval and depth cannot be set with summary")
+        impact_summary = activity.get_summary(sub_activities, impact_categories)
+        schema = ActivitySummarySchema(context=context)
+        return schema.dump(impact_summary)
+
+    if flat:
+        flat_impact = get_flat_impact(
+            activity, interval, impact_categories, sub_impacts
+        )
+        schema = FlatImpactSchema(context=context)
+        return schema.dump(flat_impact)
+
+    if stream:
+        return Response(
+            stream_with_context(
+                stream_activity_impact(
+                    activity,
+                    interval,
+                    depth,
+                    impact_categories,
+                    sub_impacts,
+                    display_units,
+                )
+            ),
+            mimetype="application/json",
+        )
+
+    if interval or categories is not None or not sub_impacts:
+        # Bounds, categories subsets and collapsed impact sources are not cached,
+        # computed in a single pass
+        activity_impact = activity.get_impact(
+            interval, depth, impact_categories, sub_impacts
+        )
+    else:
+        versions = get_tree_versions(db.session, [activity.id])
+        activity_impact = get_activity_impact(
+            activity,
+            shard_threshold=current_app.config["IMPACT_SHARD_THRESHOLD"],
+            max_workers=current_app.config["IMPACT_PROCESS_POOL_WORKERS"],
+            depth=depth,
+        )
+        # Save the computed impacts cache entries, unless the tree changed meanwhile
+        commit_activity_impacts(db.session, versions)
+
+    schema = ActivityImpactSchema(context=context)
     return schema.dump(activity_impact)
 
 
+def get_activity_impact_source(activity_id: int, impact_source_id: str) -> Any:
+    """
+    GET /activities/<activity_id>/impacts/<impact_source_id>
+    Get the impact of one impact source in an activity, with its sub impacts breakdown
+    :param activity_id: the id of the activity
+    :param impact_source_id: the id of the impact source to expand
+    :return: ImpactSourceImpact if the activity exists and uses the impact source, 404 else
+    """
+    activity: Activity = db.session.query(Activity).get_or_404(activity_id)
+    impact = activity.get_impact_source_impact(impact_source_id)
+    if impact is None:
+        return abort(
+            404,
+            "No resource of activity {activity_id} uses impact source {impact_source_id}".format(
+                activity_id=activity_id, impact_source_id=impact_source_id
+            ),
+        )
+    schema = ImpactSourceImpactSchema()
+    return schema.dump(impact)
+
+
 def delete_activity(activity_id: int) -> Any:
     """
     DELETE /activities/<activity_id>
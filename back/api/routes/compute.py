@@ -0,0 +1,65 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from typing import Any
+
+from flask import current_app
+
+from impacts_model.data_model import ProjectSchema
+from impacts_model.impacts import ModelImpactSchema
+from impacts_model.parallel import compute_activities_impacts
+
+
+def compute_project_impacts(project: dict[str, Any]) -> Any:
+    """
+    POST /compute
+    Compute the impacts of the models of a project that is not saved, ex a draft or a
+    generated one, in the format of a project export
+    The project is loaded as transient objects, out of the database session, nothing is
+    queried nor saved
+    :param project: the project to compute, as dumped by ProjectSchema
+    :return: the impact of each model of the project, 400 if the project is not valid
+    """
+    schema = ProjectSchema()
+    loaded = schema.load(project, transient=True)
+
+    models = [model for model in loaded.models if model.root_activity is not None]
+    computed = compute_activities_impacts(
+        [model.root_activity for model in models],
+        max_workers=current_app.config["IMPACT_PROCESS_POOL_WORKERS"],
+        min_parallel=current_app.config["IMPACT_PROCESS_POOL_MIN_MODELS"],
+    )
+    models_impacts = [
+        {"model_id": model.id, "model_name": model.name, "impact": impact}
+        for model, impact in zip(models, computed)
+    ]
+
+    schema = ModelImpactSchema(many=True)
+    return schema.dump(models_impacts)
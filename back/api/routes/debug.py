@@ -29,7 +29,9 @@
 # POSSIBILITY OF SUCH DAMAGE.
 
 from os.path import isfile, join
-from impacts_model.data_model import db, ProjectSchema
+from typing import Any
+from impacts_model.data_model import db, Model, ProjectSchema
+from impacts_model.impact_cache import check_activity_impact
 import json
 from os import listdir
 
@@ -60,3 +62,15 @@ def reset_db() -> None:
 
     # Commit to db
     db.session.commit()
+
+
+def check_impacts_cache() -> Any:
+    """
+    GET /debug/impacts_cache
+    Recompute the impact of all the models from scratch and compare it to the cached one
+    :return: the ids of the activities with an inconsistent cache entry
+    """
+    inconsistent_ids = []
+    for model in Model.query.all():
+        inconsistent_ids += check_activity_impact(model.root_activity)
+    return inconsistent_ids
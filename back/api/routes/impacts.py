@@ -0,0 +1,136 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from typing import Any, List, Optional
+
+from flask import abort
+
+from impacts_model.data_model import db, Model, Project
+from impacts_model.database import (
+    retrieve_activity_trees_db,
+    retrieve_models_resources_db,
+)
+from impacts_model.fleet import FleetImpactSchema, get_fleet_impact
+from impacts_model.impact_cache import (
+    commit_activity_impacts,
+    get_activity_impact,
+    get_tree_versions,
+)
+from impacts_model.impacts import ActivityImpactSchema, get_impact_categories
+
+
+def get_impacts_batch(batch: dict[str, Any]) -> Any:
+    """
+    POST /impacts/batch
+    Compute the impacts of many models and activities in one request
+    All the trees are loaded together, and share the impact sources computations
+    :param batch: model_ids and activity_ids to compute, full to return complete ActivityImpact instead of totals
+    :return: impacts of the models and activities, by id, 404 if one of them does not exist
+    """
+    model_ids = batch.get("model_ids", [])
+    activity_ids = batch.get("activity_ids", [])
+
+    models = Model.query.filter(Model.id.in_(model_ids)).all()
+    missing_models = set(model_ids) - {model.id for model in models}
+    if missing_models:
+        return abort(404, "No model found with ids {ids}".format(ids=missing_models))
+
+    root_ids = {model.id: model.root_activity_id for model in models}
+    versions = get_tree_versions(db.session, [*root_ids.values(), *activity_ids])
+    activities = retrieve_activity_trees_db([*root_ids.values(), *activity_ids])
+    missing_activities = set(activity_ids) - activities.keys()
+    if missing_activities:
+        return abort(
+            404, "No activity found with ids {ids}".format(ids=missing_activities)
+        )
+
+    schema = (
+        ActivityImpactSchema()
+        if batch.get("full", False)
+        else ActivityImpactSchema(only=("activity_id", "total"))
+    )
+    impacts = {
+        activity_id: schema.dump(get_activity_impact(activity))
+        for activity_id, activity in activities.items()
+    }
+    # Save the computed impacts cache entries, unless a tree changed meanwhile
+    commit_activity_impacts(db.session, versions)
+
+    return {
+        "models": {
+            str(model_id): impacts[root_id] for model_id, root_id in root_ids.items()
+        },
+        "activities": {
+            str(activity_id): impacts[activity_id] for activity_id in activity_ids
+        },
+    }
+
+
+def get_impact_sources_totals(
+    project_ids: Optional[List[int]] = None, categories: Optional[List[str]] = None
+) -> Any:
+    """
+    GET /impacts/sources
+    Aggregate the impacts of all the resources of many projects by impact source
+    All the resources are loaded in one query, and each impact source is computed once
+    :param project_ids: ids of the projects to aggregate, all if None
+    :param categories: only compute these impact categories, all if None
+    :return: the total and the impact of each impact source, 404 if one of the projects does
+    not exist, 400 if one of the categories is unknown
+    """
+    if project_ids is None:
+        project_ids = [project.id for project in Project.query.all()]
+    else:
+        existing = {
+            project.id
+            for project in Project.query.filter(Project.id.in_(project_ids)).all()
+        }
+        missing_projects = set(project_ids) - existing
+        if missing_projects:
+            return abort(
+                404, "No project found with ids {ids}".format(ids=missing_projects)
+            )
+
+    try:
+        impact_categories = (
+            get_impact_categories(categories) if categories is not None else None
+        )
+    except ValueError as err:
+        return abort(400, str(err))
+
+    models = Model.query.filter(Model.project_id.in_(project_ids)).all()
+    resources = retrieve_models_resources_db(models)
+
+    schema = FleetImpactSchema()
+    return schema.dump(
+        get_fleet_impact(
+            resources, len(set(project_ids)), len(models), impact_categories
+        )
+    )
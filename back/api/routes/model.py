@@ -28,14 +28,32 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
-from typing import Any
-from copy import copy
+from typing import Any, List, Optional
 
 import jsonpatch
 from flask import abort, request
 
-from impacts_model.impacts import ActivityImpactSchema
-from api.routes.activity import get_activity
+from impacts_model.impacts import get_impact_categories
+from impacts_model.hotspots import ModelHotspotsSchema, get_hotspots
+from impacts_model.diff import ActivityDiffSchema, get_activity_diff
+from impacts_model.linear import (
+    ScenarioImpactSchema,
+    ScenarioSchema,
+    compile_activity,
+    get_scenarios_impacts,
+)
+from impacts_model.solver import (
+    ReductionSchema,
+    ReductionTargetsSchema,
+    solve_reduction,
+)
+from impacts_model.sensitivity import ModelSensitivitySchema, get_sensitivity
+from impacts_model.timeline import ActivityTimelineSchema, get_activity_timeline
+from impacts_model.monte_carlo import (
+    ActivityUncertaintySchema,
+    get_activity_uncertainty,
+)
+from api.routes.activity import dump_activity_impact, get_activity
 from impacts_model.data_model import (
     Model,
     ModelSchema,
@@ -45,7 +63,7 @@ from impacts_model.data_model import (
     ActivitySchema,
 )
 from impacts_model.database import (
-    insert_model_db,
+    copy_model_db,
 )
 
 
@@ -71,17 +89,177 @@ def get_model(model_id: int) -> Any:
     return model_schema.dump(model)
 
 
-def get_model_impact(model_id: int) -> Any:
+def get_model_impact(
+    model_id: int,
+    interval: bool = False,
+    summary: bool = False,
+    sub_activities: bool = False,
+    depth: Optional[int] = None,
+    categories: Optional[List[str]] = None,
+    sub_impacts: bool = True,
+    stream: bool = False,
+    flat: bool = False,
+    units: Optional[List[str]] = None,
+) -> Any:
     """
     GET /models/<model_id>/impact
     :param model_id: the id of the model to retrieve the impact from
-    :return: The impact it model exists with id, 404 else
+    Other parameters are the ones of dump_activity_impact()
+    :return: The impact it model exists with id, 404 else, 400 for an unknown category or unit,
+    or interval or depth with summary
+    """
+    model = db.session.query(Model).get_or_404(model_id)
+    return dump_activity_impact(
+        model.root_activity,
+        interval=interval,
+        summary=summary,
+        sub_activities=sub_activities,
+        depth=depth,
+        categories=categories,
+        sub_impacts=sub_impacts,
+        stream=stream,
+        flat=flat,
+        units=units,
+    )
+
+
+def get_model_uncertainty(
+    model_id: int,
+    samples: int = 1000,
+    percentiles: Optional[List[float]] = None,
+    seed: Optional[int] = None,
+) -> Any:
+    """
+    GET /models/<model_id>/uncertainty
+    :param model_id: the id of the model to retrieve the impact uncertainty from
+    :param samples: number of Monte Carlo samples
+    :param percentiles: percentiles to return for each activity
+    :param seed: seed of the random generator
+    :return: The impacts mean and percentiles of each activity if model exists with id, 404 else
     """
     model = db.session.query(Model).get_or_404(model_id)
 
-    activity_impact = model.root_activity.get_impact()
-    schema = ActivityImpactSchema()
-    return schema.dump(activity_impact)
+    uncertainty = get_activity_uncertainty(
+        model.root_activity,
+        samples,
+        percentiles if percentiles is not None else [5, 50, 95],
+        seed,
+    )
+    schema = ActivityUncertaintySchema()
+    return schema.dump(uncertainty)
+
+
+def get_model_timeline(model_id: int, granularity: str = "month") -> Any:
+    """
+    GET /models/<model_id>/timeline
+    :param model_id: the id of the model to retrieve the impacts timeline from
+    :param granularity: length of the timeline buckets, month, quarter or year
+    :return: The impacts of each activity over time if model exists with id, 404 else
+    """
+    model = db.session.query(Model).get_or_404(model_id)
+
+    timeline = get_activity_timeline(model.root_activity, granularity)
+    schema = ActivityTimelineSchema()
+    return schema.dump(timeline)
+
+
+def get_model_scenarios(
+    model_id: int, scenarios: dict[str, Any], activities: bool = False
+) -> Any:
+    """
+    POST /models/<model_id>/scenarios
+    Compute the model impacts for many scalings of its resources, without modifying it
+    :param model_id: the id of the model
+    :param scenarios: scenarios to evaluate, each one with its scaling rules
+    :param activities: if True, return the impacts of all the activities for each scenario
+    :return: The impacts of each scenario if model exists with id, 404 else, 400 if a scaling rule selects nothing in the model
+    """
+    model = db.session.query(Model).get_or_404(model_id)
+    loaded = ScenarioSchema(many=True).load(scenarios["scenarios"])
+
+    compiled = compile_activity(model.root_activity)
+    try:
+        impacts = get_scenarios_impacts(compiled, loaded, activities)
+    except ValueError as err:
+        return abort(400, str(err))
+
+    schema = ScenarioImpactSchema(many=True)
+    return schema.dump(impacts)
+
+
+def get_model_sensitivity(model_id: int) -> Any:
+    """
+    GET /models/<model_id>/sensitivity
+    :param model_id: the id of the model
+    :return: The partial derivatives and elasticities of the model total to each resource and impact factor if model exists with id, 404 else
+    """
+    model = db.session.query(Model).get_or_404(model_id)
+
+    sensitivity = get_sensitivity(compile_activity(model.root_activity))
+    schema = ModelSensitivitySchema()
+    return schema.dump(sensitivity)
+
+
+def get_model_hotspots(
+    model_id: int, top: int = 10, categories: Optional[List[str]] = None
+) -> Any:
+    """
+    GET /models/<model_id>/hotspots
+    :param model_id: the id of the model
+    :param top: number of resources and activities to return by category
+    :param categories: only rank these impact categories, all if None
+    :return: The resources and activities with the biggest impacts if model exists with id, 404 else, 400 for an unknown category
+    """
+    model = db.session.query(Model).get_or_404(model_id)
+    try:
+        impact_categories = (
+            get_impact_categories(categories) if categories is not None else None
+        )
+    except ValueError as err:
+        return abort(400, str(err))
+
+    hotspots = get_hotspots(
+        compile_activity(model.root_activity), top, impact_categories
+    )
+    schema = ModelHotspotsSchema()
+    return schema.dump(hotspots)
+
+
+def get_model_diff(model_id: int, other_model_id: int) -> Any:
+    """
+    GET /models/<model_id>/diff/<other_model_id>
+    :param model_id: the id of the reference model
+    :param other_model_id: the id of the model to compare, ex an edited copy
+    :return: The impact differences of the other model minus the reference one, only for the changed activities and resources, if both models exist, 404 else
+    """
+    model = db.session.query(Model).get_or_404(model_id)
+    other_model = db.session.query(Model).get_or_404(other_model_id)
+
+    diff = get_activity_diff(model.root_activity, other_model.root_activity)
+    schema = ActivityDiffSchema()
+    return schema.dump(diff)
+
+
+def get_model_reduction(model_id: int, reduction: dict[str, Any]) -> Any:
+    """
+    POST /models/<model_id>/reduction
+    Find the smallest changes of the resources, within bounds, to meet impacts targets
+    The model is not modified
+    :param model_id: the id of the model
+    :param reduction: targets by impact category and allowed changes of the resources
+    :return: The changes if model exists with id, 404 else, 400 if a bound selects nothing in the model
+    """
+    model = db.session.query(Model).get_or_404(model_id)
+    loaded = ReductionTargetsSchema().load(reduction)
+
+    compiled = compile_activity(model.root_activity)
+    try:
+        result = solve_reduction(compiled, loaded["targets"], loaded["bounds"])
+    except ValueError as err:
+        return abort(400, str(err))
+
+    schema = ReductionSchema()
+    return schema.dump(result)
 
 
 def update_model(model_id: int) -> Any:
@@ -183,8 +361,6 @@ def duplicate_model(model_id: int) -> Any:
     """
     model = db.session.query(Model).get_or_404(model_id)
 
-    model_copy = copy(model)
-    model_copy.project_id = model.project_id
-    model_copy = insert_model_db(model_copy)
+    model_copy = copy_model_db(model)
     model_schema = ModelSchema()
     return model_schema.dump(model_copy)
@@ -28,10 +28,10 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
-from typing import Any
+from typing import Any, List, Optional
 from copy import copy
 import jsonpatch
-from flask import abort, request
+from flask import abort, current_app, request
 
 from impacts_model.data_model import (
     db,
@@ -41,6 +41,17 @@ from impacts_model.data_model import (
     ProjectSchema,
     Activity,
 )
+from impacts_model.database import retrieve_activity_trees_db
+from impacts_model.display_units import get_display_units
+from impacts_model.impact_cache import (
+    commit_activity_impacts,
+    get_activity_impact,
+    get_tree_versions,
+    is_cached,
+    store_activity_impact,
+)
+from impacts_model.impacts import ModelImpactSchema
+from impacts_model.parallel import compute_activities_impacts
 
 
 def get_projects() -> Any:
@@ -190,3 +201,51 @@ def get_models(project_id: int) -> Any:
 
     model_schema = ModelSchema(many=True)
     return model_schema.dump(project.models)
+
+
+def get_project_impacts(project_id: int, units: Optional[List[str]] = None) -> Any:
+    """
+    GET /projects/<project_id>/impacts
+    Compute the impacts of all the models of a project, to compare them
+    Models without a cached impact are computed concurrently on a process pool
+    :param project_id: id of the project to get the models impacts
+    :param units: display unit of impact categories, ex climate_change:t_co2e, see
+    get_display_units()
+    :return: the impact of each model of the project, 404 if the project does not exist,
+    400 for an unknown unit
+    """
+    project = db.session.query(Project).get_or_404(project_id)
+    try:
+        display_units = get_display_units(units) if units is not None else None
+    except ValueError as err:
+        return abort(400, str(err))
+    root_ids = [model.root_activity_id for model in project.models]
+    versions = get_tree_versions(db.session, root_ids)
+    roots = retrieve_activity_trees_db(root_ids)
+
+    to_compute = [root for root in roots.values() if not is_cached(root)]
+    computed = compute_activities_impacts(
+        to_compute,
+        max_workers=current_app.config["IMPACT_PROCESS_POOL_WORKERS"],
+        min_parallel=current_app.config["IMPACT_PROCESS_POOL_MIN_MODELS"],
+    )
+    impacts = {}
+    for root, impact in zip(to_compute, computed):
+        store_activity_impact(root, impact)
+        impacts[root.id] = impact
+
+    models_impacts = [
+        {
+            "model_id": model.id,
+            "model_name": model.name,
+            "impact": impacts[model.root_activity_id]
+            if model.root_activity_id in impacts
+            else get_activity_impact(roots[model.root_activity_id]),
+        }
+        for model in project.models
+    ]
+    # Save the computed impacts cache entries, unless a tree changed meanwhile
+    commit_activity_impacts(db.session, versions)
+
+    schema = ModelImpactSchema(many=True, context={"display_units": display_units})
+    return schema.dump(models_impacts)
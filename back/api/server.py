@@ -37,6 +37,7 @@ from marshmallow import ValidationError
 from api import config
 from api.config import DevelopmentConfig, ProdConfig, TestConfig
 from impacts_model import data_model
+from impacts_model.database import add_missing_columns_db
 
 
 def handle_validation_exceptions(error):
@@ -75,6 +76,7 @@ def create_app(env: str = "") -> flask.app.Flask:
 
     with app.app_context():
         data_model.db.create_all()
+        add_missing_columns_db()
 
     # Register validation exceptions
     app.register_error_handler(ValidationError, handle_validation_exceptions)
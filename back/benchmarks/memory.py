@@ -0,0 +1,91 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Benchmark of the peak memory used to compute and keep the impacts of a project models
+Run from the back directory: python -m benchmarks.memory
+"""
+
+import argparse
+import gc
+import resource
+import sys
+import time
+from typing import List
+
+from benchmarks.project_comparison import load_models
+from impacts_model.impacts import ActivityImpact, ImpactSourceImpact, ImpactValue
+
+
+def peak_rss() -> float:
+    """Return the peak resident set size of this process, in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def count_impact_objects() -> dict[str, int]:
+    """Return the number of live impact objects, by class name"""
+    classes = (ImpactValue, ImpactSourceImpact, ActivityImpact)
+    counts = {cls.__name__: 0 for cls in classes}
+    for obj in gc.get_objects():
+        if isinstance(obj, classes):
+            counts[type(obj).__name__] += 1
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--project", default="examples/gitlab.json")
+    parser.add_argument("--models", type=int, default=24)
+    args = parser.parse_args()
+
+    activities = load_models(args.project, args.models)
+    before = peak_rss()
+
+    start = time.perf_counter()
+    impacts: List[ActivityImpact] = [activity.get_impact() for activity in activities]
+    elapsed = time.perf_counter() - start
+
+    counts = count_impact_objects()
+    print(
+        "{models} models of {project}: {elapsed:.3f}s, peak RSS {before:.1f}MB before, {after:.1f}MB after".format(
+            models=len(impacts),
+            project=args.project,
+            elapsed=elapsed,
+            before=before,
+            after=peak_rss(),
+        )
+    )
+    print(", ".join("{} {}".format(count, name) for name, count in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
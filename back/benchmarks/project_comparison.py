@@ -0,0 +1,116 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Benchmark of the computation of all the models of a project on the process pool
+Run from the back directory: python -m benchmarks.project_comparison
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import List
+
+from impacts_model.content_cache import content_impact_cache
+from impacts_model.data_model import Activity, ProjectSchema
+from impacts_model.parallel import compute_activities_impacts, get_process_pool
+
+
+def load_models(path: str, count: int) -> List[Activity]:
+    """
+    Load the root activities of a project file models, repeated to get count models
+    The amounts of each model are scaled by a different factor close to 1, so that identical
+    models, or repeated copies, are not served by the content cache of the first one
+    """
+    with open(path, "r") as f:
+        data = json.load(f)
+    activities: List[Activity] = []
+    while len(activities) < count:
+        project = ProjectSchema().load(data)
+        for model in project.models:
+            _scale_amounts(model.root_activity, 1 + len(activities) * 1e-6)
+            activities.append(model.root_activity)
+    return activities[:count]
+
+
+def _scale_amounts(activity: Activity, factor: float) -> None:
+    """Multiply the amounts of the resources of an activity tree by a factor, in place"""
+    if factor == 1:
+        return
+    for resource in activity.resources:
+        if resource.amount is not None:
+            resource.amount = resource.amount * factor
+    for subactivity in activity.subactivities:
+        _scale_amounts(subactivity, factor)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--project", default="examples/gitlab.json")
+    parser.add_argument("--models", type=int, default=24)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=sorted({1, 2, 4, os.cpu_count() or 1}),
+    )
+    args = parser.parse_args()
+
+    activities = load_models(args.project, args.models)
+    print(
+        "{models} models of {project}, {cpus} cpus".format(
+            models=len(activities), project=args.project, cpus=os.cpu_count()
+        )
+    )
+
+    serial_time = None
+    for workers in args.workers:
+        # Each run starts from an empty content cache, also inherited by the new workers
+        content_impact_cache.clear()
+        if workers > 1:
+            # Start the workers before timing
+            get_process_pool(workers).map(abs, range(workers))
+        start = time.perf_counter()
+        compute_activities_impacts(activities, max_workers=workers, min_parallel=1)
+        elapsed = time.perf_counter() - start
+        serial_time = serial_time or elapsed
+        print(
+            "{workers:>3} workers: {elapsed:7.3f}s, {rate:7.2f} models/s, speedup x{speedup:.2f}".format(
+                workers=workers,
+                elapsed=elapsed,
+                rate=len(activities) / elapsed,
+                speedup=serial_time / elapsed,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
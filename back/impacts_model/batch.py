@@ -0,0 +1,181 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Offline computation of the impacts of exported project files, without Flask nor a database
+Projects are loaded as transient objects and all their models are computed on the process pool
+Run from the back directory: python -m impacts_model.batch examples/ --output summary.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from typing import Any, List, Optional, Tuple
+
+from marshmallow import ValidationError
+
+from impacts_model.data_model import Model, ProjectSchema
+from impacts_model.impacts import (
+    ActivityImpactSchema,
+    ActivitySummary,
+    ActivitySummarySchema,
+)
+from impacts_model.parallel import compute_activities_impacts
+
+
+def find_project_files(paths: List[str]) -> List[str]:
+    """
+    Return the project files to compute, sorted and without duplicates
+    :param paths: project files, directories of project files or glob patterns
+    """
+    files: set[str] = set()
+    for path in paths:
+        if os.path.isdir(path):
+            files.update(glob.glob(os.path.join(path, "*.json")))
+        elif os.path.isfile(path):
+            files.add(path)
+        else:
+            files.update(glob.glob(path, recursive=True))
+    return sorted(files)
+
+
+def load_project_models(path: str) -> Tuple[str, List[Model]]:
+    """
+    Load an exported project file as transient objects
+    :param path: project file, in the format of a project export
+    :return: the project name and its models with a root activity
+    """
+    with open(path, "r") as f:
+        data = json.load(f)
+    project = ProjectSchema().load(data, transient=True)
+    return project.name, [
+        model for model in project.models if model.root_activity is not None
+    ]
+
+
+def compute_projects(
+    files: List[str], max_workers: int, full: bool = False
+) -> dict[str, Any]:
+    """
+    Compute the impact of every model of the project files
+    Files that cannot be loaded are reported in the errors and do not stop the computation
+    :param files: project files to compute
+    :param max_workers: number of worker processes, 1 or less to compute serially
+    :param full: if True results have the complete impact tree, else only the models total
+    :return: the summary, with the results by model, the errors by file and the throughput
+    """
+    start = time.perf_counter()
+
+    models: List[Tuple[str, str, Model]] = []
+    errors: List[dict[str, Any]] = []
+    for path in files:
+        try:
+            project_name, project_models = load_project_models(path)
+        except ValidationError as e:
+            errors.append({"file": path, "error": e.messages})
+            continue
+        except (OSError, ValueError) as e:
+            errors.append({"file": path, "error": str(e)})
+            continue
+        models += [(path, project_name, model) for model in project_models]
+
+    computed = compute_activities_impacts(
+        [model.root_activity for _, _, model in models], max_workers=max_workers
+    )
+    elapsed = time.perf_counter() - start
+
+    if full:
+        impacts = ActivityImpactSchema(many=True).dump(computed)
+    else:
+        impacts = ActivitySummarySchema(many=True, exclude=["sub_activities"]).dump(
+            [
+                ActivitySummary(impact.activity_id, impact.total, [])
+                for impact in computed
+            ]
+        )
+    results = [
+        {
+            "file": path,
+            "project_name": project_name,
+            "model_name": model.name,
+            "impact": impact,
+        }
+        for (path, project_name, model), impact in zip(models, impacts)
+    ]
+    return {
+        "files": len(files),
+        "models": len(results),
+        "workers": max_workers,
+        "elapsed": elapsed,
+        "models_per_second": len(results) / elapsed if elapsed > 0 else 0.0,
+        "results": results,
+        "errors": errors,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "paths",
+        nargs="+",
+        help="project files, directories of project files or glob patterns",
+    )
+    parser.add_argument("--output", default="impacts_summary.json")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="write the complete impact trees instead of the models totals",
+    )
+    args = parser.parse_args(argv)
+
+    files = find_project_files(args.paths)
+    summary = compute_projects(files, max_workers=args.workers, full=args.full)
+    with open(args.output, "w") as f:
+        json.dump(summary, f, indent=2)
+
+    print(
+        "{models} models of {files} files in {elapsed:.3f}s, {rate:.2f} models/s, {workers} workers".format(
+            models=summary["models"],
+            files=summary["files"],
+            elapsed=summary["elapsed"],
+            rate=summary["models_per_second"],
+            workers=summary["workers"],
+        )
+    )
+    for error in summary["errors"]:
+        print("{file}: {error}".format(**error), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
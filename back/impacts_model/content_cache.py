@@ -0,0 +1,199 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Content addressed cache of activities impacts
+Two activity subtrees with the same content, resources impact sources and quantities whatever
+their names, have the same impact. The impact of each activity level is kept in memory by the
+hash of its subtree content and the catalog version, so identical subtrees of different models
+and projects, ex copies made by duplicate_model, are computed once
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+from impacts_model.data_model import Activity, Resource
+from impacts_model.impact_sources import catalog_version
+from impacts_model.impacts import (
+    ActivityImpact,
+    EnvironmentalImpact,
+    ImpactSourceId,
+    ImpactSourceImpact,
+    deserialize_env_impact,
+    deserialize_impact_sources,
+    serialize_env_impact,
+    serialize_impact_sources,
+)
+
+# Resource attributes making its impact, in their serialized database form
+# Used to compare resources, hash subtrees and send them to the process pool workers
+RESOURCE_CONTENT_ATTRIBUTES = [
+    "impact_source_id",
+    "_amount",
+    "_duration",
+    "_frequency",
+    "_period",
+]
+
+# Maximum number of activities levels kept in memory
+CONTENT_CACHE_MAX_ENTRIES = 10000
+
+
+def get_resource_content(resource: Resource) -> List[Optional[str]]:
+    """Return the values of the resource attributes making its impact"""
+    return [getattr(resource, a) for a in RESOURCE_CONTENT_ATTRIBUTES]
+
+
+def get_content_hash(
+    activity: Activity, hashes: dict[Activity, str], names: bool = False
+) -> str:
+    """
+    Return the hash of an activity subtree content, its resources impact sources and quantities
+    and its sub activities hashes, order aside. The activity own name is never part of it
+    :param activity: the activity
+    :param hashes: hashes already computed, filled with the hash of each activity of the subtree
+    :param names: if True, the resources and sub activities names are part of the hash
+    """
+    if activity in hashes:
+        return hashes[activity]
+
+    content = [
+        sorted(
+            [
+                *([resource.name] if names else []),
+                *(value or "" for value in get_resource_content(resource)),
+            ]
+            for resource in activity.resources
+        ),
+        sorted(
+            [
+                *([subactivity.name] if names else []),
+                get_content_hash(subactivity, hashes, names),
+            ]
+            for subactivity in activity.subactivities
+        ),
+    ]
+    content_hash = hashlib.sha256(json.dumps(content).encode()).hexdigest()
+    hashes[activity] = content_hash
+    return content_hash
+
+
+class ContentImpactCache:
+    """
+    Least recently used activities levels impacts, total and impact sources, by content hash
+    Impacts are kept as plain data so that those returned can be modified
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Tuple[str, str], Any] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, content_hash: str) -> bool:
+        return (content_hash, catalog_version) in self._entries
+
+    def get(
+        self, content_hash: str
+    ) -> Optional[Tuple[EnvironmentalImpact, dict[ImpactSourceId, ImpactSourceImpact]]]:
+        """
+        Return the total and impact sources saved for a content hash, None if missing
+        """
+        key = (content_hash, catalog_version)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        total, impact_sources = entry
+        return deserialize_env_impact(total), deserialize_impact_sources(impact_sources)
+
+    def set(self, content_hash: str, impact: ActivityImpact) -> None:
+        """
+        Save an ActivityImpact own level for a content hash, for the current catalog version
+        """
+        self._entries[(content_hash, catalog_version)] = (
+            serialize_env_impact(impact.total),
+            serialize_impact_sources(impact.impact_sources),
+        )
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+content_impact_cache = ContentImpactCache(CONTENT_CACHE_MAX_ENTRIES)
+
+
+def get_activity_impact(
+    activity: Activity,
+    subactivities: Optional[List[ActivityImpact]] = None,
+    hashes: Optional[dict[Activity, str]] = None,
+) -> ActivityImpact:
+    """
+    Return the activity complete impact, computing only the levels whose content is not cached
+    Results are identical to Activity.get_impact()
+    :param activity: the activity to get the impact
+    :param subactivities: ActivityImpact of each of activity.subactivities if already known,
+    else they are retrieved the same way
+    :param hashes: content hashes already computed, see get_content_hash()
+    :return: the activity complete ActivityImpact
+    """
+    if hashes is None:
+        hashes = {}
+    if subactivities is None:
+        subactivities = [
+            get_activity_impact(subactivity, hashes=hashes)
+            for subactivity in activity.subactivities
+        ]
+
+    content_hash = get_content_hash(activity, hashes)
+    cached = content_impact_cache.get(content_hash)
+    if cached is not None:
+        total, impact_sources = cached
+        return ActivityImpact(
+            activity_id=activity.id,
+            total=total,
+            sub_activities=subactivities,
+            impact_sources=impact_sources,
+        )
+
+    impact = activity.aggregate_impact(subactivities)
+    content_impact_cache.set(content_hash, impact)
+    return impact
@@ -28,10 +28,12 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
+import json
 import re
 from copy import copy, deepcopy
-from typing import Any, List
+from typing import Any, Iterable, List, Optional
 
+import numpy as np
 from flask_marshmallow import Marshmallow as FlaskMarshmallow
 from flask_sqlalchemy import SQLAlchemy
 from marshmallow import (
@@ -51,19 +53,28 @@ from sqlalchemy.ext.hybrid import hybrid_property
 from impacts_model.impact_sources import (
     ImpactSource,
     ImpactSourceError,
+    catalog_version,
     impact_source_factory,
 )
 from impacts_model.impacts import (
     EnvironmentalImpact,
+    ImpactCategory,
     ImpactSourceId,
     ImpactSourceImpact,
     ActivityImpact,
+    ActivitySummary,
+    add_impact,
+    deserialize_env_impact,
+    deserialize_impact_sources,
     merge_env_impact,
+    serialize_env_impact,
+    serialize_impact_sources,
 )
 from impacts_model.quantities.quantities import (
     deserialize_quantity,
     serialize_quantity,
 )
+from impacts_model.uncertainty import EXACT_INTERVAL, Uncertainty, UncertaintySchema
 
 db = SQLAlchemy()
 ma = FlaskMarshmallow()
@@ -85,6 +96,7 @@ class Resource(db.Model):  # type: ignore
     _duration = db.Column(db.String)
     _frequency = db.Column(db.String)
     _period = db.Column(db.String)
+    _uncertainty = db.Column(db.String)
 
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
     updated_at = db.Column(
@@ -238,6 +250,20 @@ class Resource(db.Model):  # type: ignore
             _duration=self._duration,
             _frequency=self._frequency,
             _period=self._period,
+            _uncertainty=self._uncertainty,
+        )
+
+    @hybrid_property
+    def uncertainty(self) -> Optional[Uncertainty]:
+        """Uncertainty of the resource amount, None if the amount is exact"""
+        if self._uncertainty is None:
+            return None
+        return Uncertainty.from_dict(json.loads(self._uncertainty))
+
+    @uncertainty.setter
+    def uncertainty(self, uncertainty: Optional[Uncertainty]) -> None:
+        self._uncertainty = (
+            json.dumps(uncertainty.to_dict()) if uncertainty is not None else None
         )
 
     def value(self) -> Quantity[Any]:
@@ -265,24 +291,57 @@ class Resource(db.Model):  # type: ignore
 
         return (self.amount * time).to_reduced_units()
 
-    def get_impact(self) -> ImpactSourceImpact:
+    def get_impact(
+        self,
+        interval: bool = False,
+        categories: Optional[Iterable[ImpactCategory]] = None,
+        sub_impacts: bool = True,
+    ) -> ImpactSourceImpact:
         """
         Get the complete impact, as an ImpactSource
         Environmental impact by self.impact_source_id
         For each ImpactCategory of the ImpactSource, multiply by this resource value()
         Retrun aresource impact, as its value multiplied by the impact source impact
+        :param interval: if True, impacts magnitudes are arrays [min, nominal, max] bounded
+        by the amount and impact factors uncertainties
+        :param categories: only compute these categories, all if None
+        :param sub_impacts: if False, impact sources sub impacts are not built, only their total
         :return: an ImpactSourceImpact to keep track of the impact source id
         """
-        result: ImpactSourceImpact = self.impact_source.get_impact()
-        value = self.value()
-        result.multiply_by(value)
+        unit_impact = self.impact_source.get_unit_impact(
+            interval, categories, sub_impacts
+        )
+        if not interval:
+            return unit_impact.multiplied_by(self.value())
 
-        return result
+        bounds = (
+            self.uncertainty.interval()
+            if self.uncertainty is not None
+            else EXACT_INTERVAL
+        )
+        return unit_impact.multiplied_by(self.value() * bounds)
+
+    def get_total_impact(
+        self, categories: Optional[Iterable[ImpactCategory]] = None
+    ) -> EnvironmentalImpact:
+        """
+        Get the resource EnvironmentalImpact only, without the impact sources it comes from
+        :param categories: only compute these categories, all if None
+        :return: the impact source unit total multiplied by this resource value()
+        """
+        value = self.value()
+        return {
+            category: impact.multiplied_by(value)
+            for category, impact in self.impact_source.unit_total_impact.items()
+            if categories is None or category in categories
+        }
 
 
 class QuantitySchema(Schema):
     value = fields.Number()
     unit = fields.Str()
+    min = fields.Number()
+    max = fields.Number()
 
     @post_load
     def post_load(self, data, **kwargs):
@@ -296,12 +355,28 @@ class QuantitySchema(Schema):
             'value': 12421.4213,
             'unit': "KG_CO2E",
         }
+        Impact values are written in the context display_units if set, see EnvironmentalImpactField
         """
         if isinstance(data, Quantity):
-            data = {
-                "value": data.magnitude,
-                "unit": data.units,
-            }
+            magnitude, unit = data.magnitude, data.units
+            display_units = self.context.get("display_units")
+            if display_units is not None:
+                category = self.context["category"]
+                magnitude = magnitude * display_units.factor(category, unit)
+                unit = display_units.units[category]
+            if isinstance(magnitude, np.ndarray):
+                # Interval impacts, with [min, nominal, max] magnitudes
+                data = {
+                    "value": magnitude[1],
+                    "min": magnitude[0],
+                    "max": magnitude[2],
+                    "unit": unit,
+                }
+            else:
+                data = {
+                    "value": magnitude,
+                    "unit": unit,
+                }
         else:  # mean its a string
             try:
                 split = data.split()
@@ -373,6 +448,13 @@ class ResourceSchema(ma.SQLAlchemyAutoSchema):  # type: ignore
         allow_none=True,
         many=False,
     )
+    _uncertainty = Nested(
+        UncertaintySchema,
+        data_key="uncertainty",
+        attribute="_uncertainty",
+        allow_none=True,
+        many=False,
+    )
 
     @pre_load
     def pre_load(self, data, **kwargs):
@@ -489,6 +571,92 @@ class ResourceSchema(ma.SQLAlchemyAutoSchema):  # type: ignore
             raise ValidationError(errors)
 
 
+class ActivityImpactCache(db.Model):  # type: ignore
+    """
+    Table activity_impact_cache, materialized impact of an activity and its subtree
+    Only the activity own level is saved (total and impact sources), as sub activities have their own entry
+    An entry is valid only for the impact sources catalog version it has been computed with
+    """
+
+    __tablename__ = "activity_impact_cache"
+    activity_id = db.Column(db.Integer, db.ForeignKey("activity.id"), primary_key=True)
+    catalog_version = db.Column(db.String, nullable=False)
+
+    # Impacts are stored as json plain data
+    _total = db.Column(db.String, nullable=False)
+    _impact_sources = db.Column(db.String, nullable=False)
+
+    updated_at = db.Column(
+        db.DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+    @hybrid_property
+    def is_valid(self) -> bool:
+        """True if the entry has been computed with the current impact sources catalog"""
+        return self.catalog_version == catalog_version
+
+    @property
+    def total(self) -> EnvironmentalImpact:
+        return deserialize_env_impact(json.loads(self._total))
+
+    @property
+    def impact_sources(self) -> dict[ImpactSourceId, ImpactSourceImpact]:
+        return deserialize_impact_sources(json.loads(self._impact_sources))
+
+    def set_impact(self, impact: ActivityImpact) -> None:
+        """
+        Save an ActivityImpact own level into this entry, for the current catalog version
+        """
+        self.catalog_version = catalog_version
+        self._set(impact.total, impact.impact_sources)
+
+    def add_impact_source_impact(self, impact: ImpactSourceImpact) -> None:
+        """
+        Add an ImpactSourceImpact, as the impact difference of a resource, to this entry
+        total and impact sources
+        """
+        total = merge_env_impact(self.total, impact.total_impact)
+
+        impact_sources = self.impact_sources
+        if impact.impact_source_id in impact_sources:
+            impact_sources[impact.impact_source_id].add(deepcopy(impact))
+        else:
+            impact_sources[impact.impact_source_id] = deepcopy(impact)
+
+        self._set(total, impact_sources)
+
+    def _set(
+        self,
+        total: EnvironmentalImpact,
+        impact_sources: dict[ImpactSourceId, ImpactSourceImpact],
+    ) -> None:
+        self._total = json.dumps(serialize_env_impact(total))
+        self._impact_sources = json.dumps(serialize_impact_sources(impact_sources))
+
+    def get_impact(self, sub_activities: List[ActivityImpact]) -> ActivityImpact:
+        """
+        Return the saved ActivityImpact, completed with its sub activities impacts
+        """
+        return ActivityImpact(
+            activity_id=self.activity_id,
+            total=self.total,
+            sub_activities=sub_activities,
+            impact_sources=self.impact_sources,
+        )
+
+
+class ActivityTreeVersion(db.Model):  # type: ignore
+    """
+    Table activity_tree_version, counter of the changes of an activity tree impact
+    Incremented with each invalidation or update of the tree cache entries, so that entries
+    computed concurrently from an older tree can be discarded instead of saved
+    """
+
+    __tablename__ = "activity_tree_version"
+    root_activity_id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False)
+
+
 class Activity(db.Model):  # type: ignore
     """
     Table activity representing one project phase
@@ -511,6 +679,10 @@ class Activity(db.Model):  # type: ignore
         Resource, backref="resource", lazy=True, cascade="all"
     )
 
+    impact_cache = db.relationship(
+        ActivityImpactCache, lazy=True, uselist=False, cascade="all, delete-orphan"
+    )
+
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
     updated_at = db.Column(
         db.DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
@@ -524,12 +696,131 @@ class Activity(db.Model):  # type: ignore
             resources=[copy(resource) for resource in self.resources],
         )
 
-    def get_impact(self) -> ActivityImpact:
+    def get_impact(
+        self,
+        interval: bool = False,
+        depth: Optional[int] = None,
+        categories: Optional[Iterable[ImpactCategory]] = None,
+        sub_impacts: bool = True,
+    ) -> ActivityImpact:
         """
         Compute and return this Activity complete impact as a ActivityImpact
+        :param interval: if True, impacts magnitudes are arrays [min, nominal, max], see Resource.get_impact()
+        :param depth: levels of sub activities to return, all if None. Below, the resources
+        impacts are summed directly in the impact sources of the last level
+        :param categories: only compute these categories, all if None
+        :param sub_impacts: if False, impact sources sub impacts are not built, only their total
+        """
+        if depth is not None and depth <= 0:
+            resources = self._get_subtree_resources_impact(
+                interval, categories, sub_impacts
+            )
+            return ActivityImpact(
+                activity_id=self.id,
+                total=self._get_total(resources),
+                sub_activities=[],
+                impact_sources=resources,
+            )
+
+        subactivities = self._get_subactivities_impact(
+            interval, depth - 1 if depth is not None else None, categories, sub_impacts
+        )
+        return self.aggregate_impact(subactivities, interval, categories, sub_impacts)
+
+    def get_total_impact(
+        self, categories: Optional[Iterable[ImpactCategory]] = None
+    ) -> EnvironmentalImpact:
+        """
+        Compute and return this Activity total EnvironmentalImpact only
+        The tree is walked depth first, summing each level in one EnvironmentalImpact, a valid
+        cache entry giving directly its subtree total, so memory is proportional to the tree depth
+        :param categories: only compute these categories, all if None
+        """
+        categories = set(categories) if categories is not None else None
+        if self.impact_cache is not None and self.impact_cache.is_valid:
+            return {
+                category: value
+                for category, value in self.impact_cache.total.items()
+                if categories is None or category in categories
+            }
+
+        total: EnvironmentalImpact = {}
+        for subactivity in self.subactivities:
+            for category, value in subactivity.get_total_impact(categories).items():
+                add_impact(total, category, value)
+        for resource in self.resources:
+            for category, value in resource.get_total_impact(categories).items():
+                add_impact(total, category, value)
+        return total
+
+    def get_summary(
+        self,
+        sub_activities: bool = False,
+        categories: Optional[Iterable[ImpactCategory]] = None,
+    ) -> ActivitySummary:
+        """
+        Return this Activity total only, as an ActivitySummary, see get_total_impact()
+        :param sub_activities: if True, add the totals of the direct subactivities
+        :param categories: only compute these categories, all if None
         """
-        subactivities = self._get_subactivities_impact()
-        resources = self._get_resources_impact(subactivities)
+        categories = set(categories) if categories is not None else None
+        if not sub_activities:
+            return ActivitySummary(self.id, self.get_total_impact(categories), [])
+
+        children = [
+            subactivity.get_summary(categories=categories)
+            for subactivity in self.subactivities
+        ]
+        total: EnvironmentalImpact = {}
+        for child in children:
+            for category, value in child.total.items():
+                add_impact(total, category, deepcopy(value))
+        for resource in self.resources:
+            for category, value in resource.get_total_impact(categories).items():
+                add_impact(total, category, value)
+        return ActivitySummary(self.id, total, children)
+
+    def get_impact_source_impact(
+        self, impact_source_id: ImpactSourceId
+    ) -> Optional[ImpactSourceImpact]:
+        """
+        Return the impact of one impact source in this Activity, with its sub impacts expanded
+        Impacts being linear, the values of the resources using it in the subtree are summed
+        and the impact source unit impact multiplied once
+        :param impact_source_id: id of the impact source to expand
+        :return: the ImpactSourceImpact, None if no resource of the subtree uses the impact source
+        """
+        resources = []
+        activities = [self]
+        while activities:
+            activity = activities.pop()
+            activities.extend(activity.subactivities)
+            resources.extend(
+                r for r in activity.resources if r.impact_source_id == impact_source_id
+            )
+        if not resources:
+            return None
+
+        value = sum((r.value() for r in resources[1:]), resources[0].value())
+        return resources[0].impact_source.unit_impact.multiplied_by(value)
+
+    def aggregate_impact(
+        self,
+        subactivities: List[ActivityImpact],
+        interval: bool = False,
+        categories: Optional[Iterable[ImpactCategory]] = None,
+        sub_impacts: bool = True,
+    ) -> ActivityImpact:
+        """
+        Return this Activity complete impact from its subactivities already computed impacts
+        :param subactivities: ActivityImpact of each of self.subactivities, in the same order
+        :param interval: if True, compute the resources interval impacts
+        :param categories: only compute the resources impacts of these categories, all if None
+        :param sub_impacts: if False, only compute the total of the impact sources sub impacts
+        """
+        resources = self._get_resources_impact(
+            subactivities, interval, categories, sub_impacts
+        )
         total = self._get_total(resources)
 
         return ActivityImpact(
@@ -555,7 +846,11 @@ class Activity(db.Model):  # type: ignore
         return result
 
     def _get_resources_impact(
-        self, subactivities_impacts: List[ActivityImpact]
+        self,
+        subactivities_impacts: List[ActivityImpact],
+        interval: bool = False,
+        categories: Optional[Iterable[ImpactCategory]] = None,
+        sub_impacts: bool = True,
     ) -> dict[ImpactSourceId, ImpactSourceImpact]:
         """
         Get resources impacts, sum of this one AND subactivities one
@@ -577,19 +872,59 @@ class Activity(db.Model):  # type: ignore
         # Sum self resources
         for r in self.resources:
             if r.impact_source_id not in result:
-                result[r.impact_source_id] = r.get_impact()
+                result[r.impact_source_id] = r.get_impact(
+                    interval, categories, sub_impacts
+                )
             else:
-                result[r.impact_source_id].add(r.get_impact())
+                result[r.impact_source_id].add(
+                    r.get_impact(interval, categories, sub_impacts)
+                )
 
         return result
 
-    def _get_subactivities_impact(self) -> List[ActivityImpact]:
+    def _get_subtree_resources_impact(
+        self,
+        interval: bool = False,
+        categories: Optional[Iterable[ImpactCategory]] = None,
+        sub_impacts: bool = True,
+    ) -> dict[ImpactSourceId, ImpactSourceImpact]:
+        """
+        Get the resources impacts of this activity and all the ones under it, summed in a single
+        dict without building the impact of each subactivity
+        """
+        result: dict[ImpactSourceId, ImpactSourceImpact] = {}
+
+        activities = [self]
+        while activities:
+            activity = activities.pop()
+            activities.extend(activity.subactivities)
+            for r in activity.resources:
+                if r.impact_source_id not in result:
+                    result[r.impact_source_id] = r.get_impact(
+                        interval, categories, sub_impacts
+                    )
+                else:
+                    result[r.impact_source_id].add(
+                        r.get_impact(interval, categories, sub_impacts)
+                    )
+
+        return result
+
+    def _get_subactivities_impact(
+        self,
+        interval: bool = False,
+        depth: Optional[int] = None,
+        categories: Optional[Iterable[ImpactCategory]] = None,
+        sub_impacts: bool = True,
+    ) -> List[ActivityImpact]:
         """
         Return a dict with all subactivity ids as key, with their ActivityImpact as values
         """
         impacts_list: List[ActivityImpact] = []
         for subactivity in self.subactivities:
-            impacts_list.append(subactivity.get_impact())
+            impacts_list.append(
+                subactivity.get_impact(interval, depth, categories, sub_impacts)
+            )
         return impacts_list
 
 
@@ -607,6 +942,7 @@ class ActivitySchema(ma.SQLAlchemyAutoSchema):  # type: ignore
         load_instance = True
         include_fk = True
         sqla_session = db.session
+        exclude = ("impact_cache",)
 
     id = ma.auto_field(allow_none=True)
     subactivities = Nested("ActivitySchema", many=True)
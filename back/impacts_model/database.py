@@ -28,8 +28,44 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
-from impacts_model.data_model import db, Model, Activity
-from typing import List
+from collections import defaultdict
+from impacts_model.content_cache import RESOURCE_CONTENT_ATTRIBUTES
+from impacts_model.data_model import (
+    db,
+    Model,
+    Activity,
+    ActivityImpactCache,
+    Resource,
+)
+from sqlalchemy import inspect, select, text
+from typing import Any, List, Optional, Tuple
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+
+
+def add_missing_columns_db() -> None:
+    """
+    Add the data model columns missing from the existing tables, create_all() only creating
+    the missing tables, ex resource._uncertainty in a database created before it
+    Columns are added without constraints, existing rows having no value
+    """
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                db.session.execute(
+                    text(
+                        'ALTER TABLE {table} ADD COLUMN "{column}" {type}'.format(
+                            table=table.name,
+                            column=column.name,
+                            type=column.type.compile(dialect=db.engine.dialect),
+                        )
+                    )
+                )
+    db.session.commit()
 
 
 def retrieve_all_models_db() -> List[Model]:
@@ -55,3 +91,153 @@ def insert_model_db(model: Model) -> Model:
     db.session.add(model)
     db.session.commit()
     return model
+
+
+def retrieve_activity_trees_db(activity_ids: List[int]) -> dict[int, Activity]:
+    """
+    Load the complete trees of activities, with their resources and cached impacts
+    Use one query by tree level instead of one by activity: each level subactivities
+    collections are populated directly, without lazy loading
+    :param activity_ids: ids of the root activities of the trees to load
+    :return: the loaded root activities by id, missing ids are not in the result
+    """
+    options = [selectinload(Activity.resources), selectinload(Activity.impact_cache)]
+    roots = Activity.query.filter(Activity.id.in_(activity_ids)).options(*options).all()
+
+    level = roots
+    loaded_ids = {activity.id for activity in roots}
+    while level:
+        children = (
+            Activity.query.filter(
+                Activity.parent_activity_id.in_([activity.id for activity in level])
+            )
+            .options(*options)
+            .order_by(Activity.id)
+            .all()
+        )
+        children_by_parent = defaultdict(list)
+        for child in children:
+            children_by_parent[child.parent_activity_id].append(child)
+        for activity in level:
+            set_committed_value(
+                activity, "subactivities", children_by_parent[activity.id]
+            )
+
+        # Activities requested in several trees are loaded only once
+        level = [child for child in children if child.id not in loaded_ids]
+        loaded_ids.update(child.id for child in level)
+
+    return {activity.id: activity for activity in roots}
+
+
+def retrieve_models_resources_db(models: List[Model]) -> List[Resource]:
+    """
+    Load all the resources of models activity trees in one query
+    The activities of the trees are found by a recursive query from the models root activities
+    :param models: models to get the resources of
+    :return: the resources, in no particular order
+    """
+    root_ids = [
+        model.root_activity_id for model in models if model.root_activity_id is not None
+    ]
+    if not root_ids:
+        return []
+
+    tree = (
+        select(Activity.id)
+        .where(Activity.id.in_(root_ids))
+        .cte(name="tree", recursive=True)
+    )
+    tree = tree.union_all(
+        select(Activity.id).where(Activity.parent_activity_id == tree.c.id)
+    )
+    return Resource.query.join(tree, Resource.activity_id == tree.c.id).all()
+
+
+# Resource columns copied with it, see Resource.__copy__()
+RESOURCE_COPY_COLUMNS = ["name", *RESOURCE_CONTENT_ATTRIBUTES, "_uncertainty"]
+
+
+def copy_model_db(model: Model) -> Model:
+    """
+    Insert a copy of a model, as Model.__copy__(), with the valid cached impacts of its activities
+    Unlike inserting the copied objects, that flushes them one by one, rows are inserted level
+    by level of the tree: the activities one by one to get their ids, then all the level
+    resources and cache entries with one executemany
+    :param model: the model to copy
+    :return: the copy, committed
+    """
+    root_id: Optional[int] = None
+    if model.root_activity_id is not None:
+        root = retrieve_activity_trees_db([model.root_activity_id])[
+            model.root_activity_id
+        ]
+        root_id = _copy_activity_trees_db([(root, root.name + " copy", None)])
+
+    model_copy = Model(
+        name=model.name + " copy",
+        project_id=model.project_id,
+        root_activity_id=root_id,
+    )
+    db.session.add(model_copy)
+    db.session.commit()
+    return model_copy
+
+
+def _copy_activity_trees_db(
+    level: List[Tuple[Activity, str, Optional[int]]]
+) -> Optional[int]:
+    """
+    Insert copies of activity trees loaded by retrieve_activity_trees_db()
+    :param level: activities to copy, with the name and parent id of their copy
+    :return: the id of the first activity copy
+    """
+    first_id: Optional[int] = None
+    while level:
+        next_level: List[Tuple[Activity, str, Optional[int]]] = []
+        resources: List[dict[str, Any]] = []
+        caches: List[dict[str, Any]] = []
+
+        for activity, name, parent_id in level:
+            result = db.session.execute(
+                Activity.__table__.insert().values(
+                    name=name, parent_activity_id=parent_id
+                )
+            )
+            copy_id = result.inserted_primary_key[0]
+            if first_id is None:
+                first_id = copy_id
+
+            resources += [
+                {
+                    "activity_id": copy_id,
+                    **{
+                        column: getattr(resource, column)
+                        for column in RESOURCE_COPY_COLUMNS
+                    },
+                }
+                for resource in activity.resources
+            ]
+            cache = activity.impact_cache
+            if cache is not None and cache.is_valid:
+                # Same content, same impact
+                caches.append(
+                    {
+                        "activity_id": copy_id,
+                        "catalog_version": cache.catalog_version,
+                        "_total": cache._total,
+                        "_impact_sources": cache._impact_sources,
+                    }
+                )
+            next_level += [
+                (subactivity, subactivity.name, copy_id)
+                for subactivity in activity.subactivities
+            ]
+
+        if resources:
+            db.session.execute(Resource.__table__.insert(), resources)
+        if caches:
+            db.session.execute(ActivityImpactCache.__table__.insert(), caches)
+        level = next_level
+
+    return first_id
@@ -0,0 +1,289 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Impact differences between two activity trees, ex a model and its edited copy
+Activities are matched by name and resources by name and impact source, subtrees with the
+same content are pruned from their fingerprint without computing anything, so only the
+impacts of the changed resources and of the added or removed subtrees are computed
+"""
+
+from __future__ import annotations
+
+from copy import deepcopy
+from typing import Callable, Hashable, List, Optional, Sequence, TypeVar
+
+from marshmallow import Schema, fields
+
+from impacts_model.content_cache import get_content_hash, get_resource_content
+from impacts_model.data_model import Activity, Resource
+from impacts_model.impacts import (
+    EnvironmentalImpact,
+    EnvironmentalImpactField,
+    ImpactValue,
+    add_impact,
+)
+
+ADDED = "added"
+REMOVED = "removed"
+CHANGED = "changed"
+UNCHANGED = "unchanged"
+
+T = TypeVar("T")
+
+
+class ResourceDiff:
+    """
+    Impact difference of a resource, added, removed or changed
+    """
+
+    def __init__(
+        self,
+        name: str,
+        impact_source_id: str,
+        status: str,
+        delta: EnvironmentalImpact,
+    ) -> None:
+        self.name = name
+        self.impact_source_id = impact_source_id
+        self.status = status
+        self.delta = delta
+
+
+class ResourceDiffSchema(Schema):
+    name = fields.Str()
+    impact_source_id = fields.Str()
+    status = fields.Str()
+    delta = EnvironmentalImpactField()
+
+
+class ActivityDiff:
+    """
+    Impact difference of an activity subtree
+    Only the changed resources and sub activities are listed, added and removed sub activities
+    only with their total
+    """
+
+    def __init__(
+        self,
+        name: str,
+        status: str,
+        delta: EnvironmentalImpact,
+        resources: List[ResourceDiff],
+        sub_activities: List[ActivityDiff],
+        first_activity_id: Optional[int] = None,
+        second_activity_id: Optional[int] = None,
+    ) -> None:
+        self.name = name
+        self.status = status
+        self.delta = delta
+        self.resources = resources
+        self.sub_activities = sub_activities
+        self.first_activity_id = first_activity_id
+        self.second_activity_id = second_activity_id
+
+
+class ActivityDiffSchema(Schema):
+    name = fields.Str()
+    status = fields.Str()
+    first_activity_id = fields.Int(allow_none=True)
+    second_activity_id = fields.Int(allow_none=True)
+    delta = EnvironmentalImpactField()
+    resources = fields.Nested("ResourceDiffSchema", many=True)
+    sub_activities = fields.Nested("ActivityDiffSchema", many=True)
+
+
+def get_activity_diff(first: Activity, second: Activity) -> ActivityDiff:
+    """
+    Return the impact difference of the second activity tree minus the first one
+    :param first: root of the reference tree
+    :param second: root of the compared tree, matched with the first whatever its name
+    :return: the ActivityDiff of the roots, unchanged if the trees have the same content
+    """
+    # Names are part of the hashes, as activities and resources are matched by name
+    first_fingerprints: dict[Activity, str] = {}
+    second_fingerprints: dict[Activity, str] = {}
+    get_content_hash(first, first_fingerprints, names=True)
+    get_content_hash(second, second_fingerprints, names=True)
+    diff = _diff_activities(first, second, first_fingerprints, second_fingerprints)
+    if diff is None:
+        return ActivityDiff(
+            second.name,
+            UNCHANGED,
+            {},
+            [],
+            [],
+            first_activity_id=first.id,
+            second_activity_id=second.id,
+        )
+    return diff
+
+
+def _diff_activities(
+    first: Activity,
+    second: Activity,
+    first_fingerprints: dict[Activity, str],
+    second_fingerprints: dict[Activity, str],
+) -> Optional[ActivityDiff]:
+    if first_fingerprints[first] == second_fingerprints[second]:
+        return None
+
+    resources: List[ResourceDiff] = []
+    for first_resource, second_resource in _match(
+        first.resources,
+        second.resources,
+        lambda resource: (resource.name, resource.impact_source_id),
+    ):
+        if first_resource is None:
+            resources.append(
+                ResourceDiff(
+                    second_resource.name,
+                    second_resource.impact_source_id,
+                    ADDED,
+                    second_resource.get_total_impact(),
+                )
+            )
+        elif second_resource is None:
+            resources.append(
+                ResourceDiff(
+                    first_resource.name,
+                    first_resource.impact_source_id,
+                    REMOVED,
+                    _negate(first_resource.get_total_impact()),
+                )
+            )
+        elif get_resource_content(first_resource) != get_resource_content(
+            second_resource
+        ):
+            resources.append(
+                ResourceDiff(
+                    second_resource.name,
+                    second_resource.impact_source_id,
+                    CHANGED,
+                    _subtract(
+                        second_resource.get_total_impact(),
+                        first_resource.get_total_impact(),
+                    ),
+                )
+            )
+
+    sub_activities: List[ActivityDiff] = []
+    for first_subactivity, second_subactivity in _match(
+        first.subactivities,
+        second.subactivities,
+        lambda activity: activity.name,
+    ):
+        if first_subactivity is None:
+            sub_activities.append(
+                ActivityDiff(
+                    second_subactivity.name,
+                    ADDED,
+                    second_subactivity.get_total_impact(),
+                    [],
+                    [],
+                    second_activity_id=second_subactivity.id,
+                )
+            )
+        elif second_subactivity is None:
+            sub_activities.append(
+                ActivityDiff(
+                    first_subactivity.name,
+                    REMOVED,
+                    _negate(first_subactivity.get_total_impact()),
+                    [],
+                    [],
+                    first_activity_id=first_subactivity.id,
+                )
+            )
+        else:
+            diff = _diff_activities(
+                first_subactivity,
+                second_subactivity,
+                first_fingerprints,
+                second_fingerprints,
+            )
+            if diff is not None:
+                sub_activities.append(diff)
+
+    delta: EnvironmentalImpact = {}
+    for changed in [*resources, *sub_activities]:
+        for category, value in changed.delta.items():
+            add_impact(delta, category, deepcopy(value))
+
+    return ActivityDiff(
+        second.name,
+        CHANGED,
+        delta,
+        resources,
+        sub_activities,
+        first_activity_id=first.id,
+        second_activity_id=second.id,
+    )
+
+
+def _match(
+    first: Sequence[T], second: Sequence[T], key: Callable[[T], Hashable]
+) -> List[tuple[Optional[T], Optional[T]]]:
+    """
+    Pair the elements of two lists with the same key, the nth with the nth if a key is repeated
+    Unpaired elements are paired with None, first list order then second list one
+    """
+    second_by_key: dict[Hashable, List[T]] = {}
+    for element in second:
+        second_by_key.setdefault(key(element), []).append(element)
+
+    pairs: List[tuple[Optional[T], Optional[T]]] = []
+    for element in first:
+        candidates = second_by_key.get(key(element))
+        pairs.append((element, candidates.pop(0) if candidates else None))
+
+    paired = {id(other) for _, other in pairs if other is not None}
+    pairs += [(None, element) for element in second if id(element) not in paired]
+    return pairs
+
+
+def _negate(impact: EnvironmentalImpact) -> EnvironmentalImpact:
+    return {
+        category: ImpactValue(
+            manufacture=-value.manufacture if value.manufacture is not None else None,
+            use=-value.use if value.use is not None else None,
+        )
+        for category, value in impact.items()
+    }
+
+
+def _subtract(
+    first: EnvironmentalImpact, second: EnvironmentalImpact
+) -> EnvironmentalImpact:
+    """Return first - second"""
+    result = _negate(second)
+    for category, value in first.items():
+        add_impact(result, category, value)
+    return result
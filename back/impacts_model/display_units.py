@@ -0,0 +1,102 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Display units of the impacts of a response, ex tonnes of CO2e instead of kilograms
+Computed impacts have the units pint reduced them to, ex kilogram for kg_co2e. They are
+converted to one unit by category when serialized, QuantitySchema multiplying each value by
+a factor computed once by category and computed unit, given DisplayUnits in the schema
+context, ex ActivityImpactSchema(context={"display_units": display_units})
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
+from pint import Unit
+
+from impacts_model.impacts import ImpactCategory, get_impact_categories
+from impacts_model.quantities.quantities import Q_, deserialize_unit, ureg
+
+# Units each category can be displayed in besides its reference unit. Units of the same
+# dimension are not enough, kg_co2e, kg_Sbe and kg_mips all being kilograms
+CATEGORY_DISPLAY_UNITS: dict[ImpactCategory, list[Unit]] = {
+    ImpactCategory.CLIMATE_CHANGE: [ureg.t_co2e, ureg.g_co2e],
+    ImpactCategory.WATER_DEPLETION: [ureg.liter],
+}
+
+
+class DisplayUnits:
+    """
+    Unit of each impact category for a response, the category reference unit if not set
+    """
+
+    def __init__(self, units: Optional[dict[ImpactCategory, Unit]] = None) -> None:
+        self.units = {
+            category: deserialize_unit(category.value) for category in ImpactCategory
+        }
+        self.units.update(units or {})
+        self._factors: dict[tuple[ImpactCategory, Unit], float] = {}
+
+    def factor(self, category: ImpactCategory, unit: Unit) -> float:
+        """
+        Return the factor converting a category value from unit to its display unit
+        """
+        key = (category, unit)
+        if key not in self._factors:
+            self._factors[key] = Q_(1, unit).to(self.units[category]).magnitude
+        return self._factors[key]
+
+
+def get_display_units(entries: Iterable[str]) -> DisplayUnits:
+    """
+    Return the DisplayUnits of a list of category:unit entries, ex climate_change:t_co2e
+    :raise ValueError: if an entry category or unit is unknown, or not one of the category units
+    """
+    units: dict[ImpactCategory, Unit] = {}
+    for entry in entries:
+        name, separator, unit_name = entry.partition(":")
+        if not separator:
+            raise ValueError("Display unit must be category:unit, not " + entry)
+        category = get_impact_categories([name])[0]
+        try:
+            unit = deserialize_unit(unit_name)
+        except Exception:
+            raise ValueError("Unknown unit " + unit_name)
+        if unit != deserialize_unit(category.value) and unit not in (
+            CATEGORY_DISPLAY_UNITS.get(category, [])
+        ):
+            raise ValueError(
+                "Unit {unit} cannot display {category}".format(
+                    unit=unit_name, category=str(category)
+                )
+            )
+        units[category] = unit
+    return DisplayUnits(units)
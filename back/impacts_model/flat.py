@@ -0,0 +1,158 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Normalized impact of an activity tree
+Each activity appears once, referencing its sub activities by id, and each impact source
+impact once, for the resources of one activity only. Ancestors impact sources are not
+repeated, the response size grows linearly with the tree size
+"""
+
+from __future__ import annotations
+
+from copy import deepcopy
+from typing import Iterable, List, Optional
+
+from marshmallow import Schema, fields
+from marshmallow_sqlalchemy.fields import Nested
+
+from impacts_model.data_model import Activity
+from impacts_model.impacts import (
+    EnvironmentalImpact,
+    EnvironmentalImpactField,
+    ImpactCategory,
+    ImpactSourceImpact,
+    add_impact,
+)
+
+
+class FlatActivityImpact:
+    """
+    Impact of an activity, its total includes its sub activities but its impact sources are
+    only the ones of its own resources, as keys of FlatImpact.impact_sources
+    """
+
+    def __init__(
+        self,
+        activity_id: str,
+        total: EnvironmentalImpact,
+        sub_activities: List[str],
+        impact_sources: List[str],
+    ) -> None:
+        self.activity_id = activity_id
+        self.total = total
+        self.sub_activities = sub_activities
+        self.impact_sources = impact_sources
+
+
+class FlatActivityImpactSchema(Schema):
+    activity_id = fields.Str()
+    total = EnvironmentalImpactField()
+    sub_activities = fields.List(fields.Str())
+    impact_sources = fields.List(fields.Str())
+
+
+class FlatImpact:
+    """
+    Activities and impact sources impacts of a tree, keyed by id
+    Impact sources are keyed by activity id and impact source id, ex "12/electricity"
+    """
+
+    def __init__(
+        self,
+        root_activity_id: str,
+        activities: dict[str, FlatActivityImpact],
+        impact_sources: dict[str, ImpactSourceImpact],
+    ) -> None:
+        self.root_activity_id = root_activity_id
+        self.activities = activities
+        self.impact_sources = impact_sources
+
+
+class FlatImpactSchema(Schema):
+    root_activity_id = fields.Str()
+    activities = fields.Dict(
+        keys=fields.Str(), values=Nested("FlatActivityImpactSchema")
+    )
+    impact_sources = fields.Dict(
+        keys=fields.Str(), values=Nested("ImpactSourceImpactSchema")
+    )
+
+
+def get_flat_impact(
+    activity: Activity,
+    interval: bool = False,
+    categories: Optional[Iterable[ImpactCategory]] = None,
+    sub_impacts: bool = True,
+) -> FlatImpact:
+    """
+    Compute the normalized impact of an activity tree
+    Only the resources of each activity are computed, and its total summed with the ones
+    of its sub activities, no impact source impact is copied to the ancestors
+    Parameters are the ones of Activity.get_impact()
+    :param activity: root of the tree
+    :return: the FlatImpact of the tree
+    """
+    categories = list(categories) if categories is not None else None
+    result = FlatImpact(str(activity.id), {}, {})
+    _add_activity(result, activity, interval, categories, sub_impacts)
+    return result
+
+
+def _add_activity(
+    result: FlatImpact,
+    activity: Activity,
+    interval: bool,
+    categories: Optional[List[ImpactCategory]],
+    sub_impacts: bool,
+) -> EnvironmentalImpact:
+    """Add an activity subtree to the result, and return the activity total"""
+    own = activity.aggregate_impact([], interval, categories, sub_impacts)
+    total = own.total
+    for subactivity in activity.subactivities:
+        for category, value in _add_activity(
+            result, subactivity, interval, categories, sub_impacts
+        ).items():
+            # Copied as interval magnitudes are arrays added in place
+            add_impact(total, category, deepcopy(value))
+
+    keys = []
+    for impact_source_id, impact in own.impact_sources.items():
+        key = str(activity.id) + "/" + impact_source_id
+        result.impact_sources[key] = impact
+        keys.append(key)
+
+    result.activities[str(activity.id)] = FlatActivityImpact(
+        str(activity.id),
+        total,
+        [str(subactivity.id) for subactivity in activity.subactivities],
+        keys,
+    )
+    return total
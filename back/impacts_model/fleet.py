@@ -0,0 +1,149 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Impacts of all the resources of many projects, aggregated by impact source
+Impacts being linear in resources values, the values of the resources using an impact source
+are summed and its unit impact multiplied once, without computing any activity tree
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, List, Optional
+
+from marshmallow import Schema, fields
+from marshmallow_sqlalchemy.fields import Nested
+from pint import Quantity
+
+from impacts_model.data_model import Resource
+from impacts_model.impact_sources import impact_source_factory
+from impacts_model.impacts import (
+    EnvironmentalImpact,
+    EnvironmentalImpactField,
+    ImpactCategory,
+    ImpactSourceId,
+    merge_env_impact,
+)
+
+
+class ImpactSourceTotal:
+    """
+    Total impact of the resources using an impact source
+    """
+
+    def __init__(
+        self,
+        impact_source_id: ImpactSourceId,
+        name: str,
+        resources: int,
+        value: Quantity,
+        total_impact: EnvironmentalImpact,
+    ) -> None:
+        self.impact_source_id = impact_source_id
+        self.name = name
+        self.resources = resources
+        self.value = value
+        self.total_impact = total_impact
+
+
+class ImpactSourceTotalSchema(Schema):
+    impact_source_id = fields.Str()
+    name = fields.Str()
+    resources = fields.Int()
+    value = Nested("QuantitySchema")
+    total_impact = EnvironmentalImpactField()
+
+
+class FleetImpact:
+    """
+    Total impact of many projects, and its split by impact source
+    """
+
+    def __init__(
+        self,
+        projects: int,
+        models: int,
+        total: EnvironmentalImpact,
+        impact_sources: dict[ImpactSourceId, ImpactSourceTotal],
+    ) -> None:
+        self.projects = projects
+        self.models = models
+        self.total = total
+        self.impact_sources = impact_sources
+
+
+class FleetImpactSchema(Schema):
+    projects = fields.Int()
+    models = fields.Int()
+    total = EnvironmentalImpactField()
+    impact_sources = fields.Dict(
+        keys=fields.Str(), values=Nested("ImpactSourceTotalSchema")
+    )
+
+
+def get_fleet_impact(
+    resources: Iterable[Resource],
+    projects: int,
+    models: int,
+    categories: Optional[Iterable[ImpactCategory]] = None,
+) -> FleetImpact:
+    """
+    Aggregate the impacts of resources by impact source, in one pass over them
+    :param resources: all the resources of the projects models
+    :param projects: number of projects the resources are from
+    :param models: number of models the resources are from
+    :param categories: only compute these categories, all if None
+    :return: the total and the impact of each impact source used
+    """
+    values: dict[ImpactSourceId, List[Quantity]] = {}
+    for resource in resources:
+        values.setdefault(resource.impact_source_id, []).append(resource.value())
+
+    categories = set(categories) if categories is not None else None
+    impact_sources: dict[ImpactSourceId, ImpactSourceTotal] = {}
+    total: EnvironmentalImpact = {}
+    for impact_source_id, source_values in values.items():
+        impact_source = impact_source_factory(impact_source_id)
+        value = sum(source_values[1:], source_values[0]).to(impact_source.unit)
+        source_total = {
+            category: unit_value.multiplied_by(value)
+            for category, unit_value in impact_source.unit_total_impact.items()
+            if categories is None or category in categories
+        }
+        total = merge_env_impact(total, source_total)
+        impact_sources[impact_source_id] = ImpactSourceTotal(
+            impact_source_id,
+            impact_source.name,
+            len(source_values),
+            value,
+            source_total,
+        )
+
+    return FleetImpact(projects, models, total, impact_sources)
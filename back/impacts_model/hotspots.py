@@ -0,0 +1,168 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""
+Hotspots of a model, its resources and activities with the biggest impacts
+Each resource impact is evaluated once from the compiled model, then the top ones of each
+category are kept in a bounded heap, without building the impact tree
+"""
+
+from __future__ import annotations
+
+import heapq
+from typing import Iterable, List, Optional
+
+import numpy as np
+from marshmallow import Schema, fields
+from marshmallow_sqlalchemy.fields import Nested
+from pint import Quantity
+
+from impacts_model.impacts import ImpactCategory
+from impacts_model.linear import CompiledModel, EnvironmentalImpactTotal, to_quantities
+from impacts_model.quantities.quantities import Q_
+
+
+class Hotspot:
+    """
+    Impact of a resource, or of an activity own resources, with its share of the model total
+    """
+
+    def __init__(self, id: int, name: str, impact: Quantity, share: float) -> None:
+        self.id = id
+        self.name = name
+        self.impact = impact
+        self.share = share
+
+
+class HotspotSchema(Schema):
+    id = fields.Int()
+    name = fields.Str()
+    impact = Nested("QuantitySchema")
+    share = fields.Float()
+
+
+class ModelHotspots:
+    """
+    Top resources and activities of a model, by impact category
+    """
+
+    def __init__(
+        self,
+        total: EnvironmentalImpactTotal,
+        resources: dict[ImpactCategory, List[Hotspot]],
+        activities: dict[ImpactCategory, List[Hotspot]],
+    ) -> None:
+        self.total = total
+        self.resources = resources
+        self.activities = activities
+
+
+class ModelHotspotsSchema(Schema):
+    total = fields.Dict(keys=fields.Str(), values=Nested("QuantitySchema"))
+    resources = fields.Dict(
+        keys=fields.Str(), values=fields.Nested("HotspotSchema", many=True)
+    )
+    activities = fields.Dict(
+        keys=fields.Str(), values=fields.Nested("HotspotSchema", many=True)
+    )
+
+
+def get_hotspots(
+    compiled: CompiledModel,
+    top: int = 10,
+    categories: Optional[Iterable[ImpactCategory]] = None,
+) -> ModelHotspots:
+    """
+    Return the resources and activities with the biggest impacts of a compiled model
+    An activity impact is the one of its own resources, without its sub activities
+    which would always come first
+    :param compiled: the CompiledModel
+    :param top: number of resources and activities to return by category
+    :param categories: categories to rank, all if None
+    :return: the ModelHotspots, ordered by decreasing impact
+    """
+    resource_impacts = compiled.values[:, np.newaxis] * compiled.factors
+    total = resource_impacts.sum(axis=0)
+
+    # Own resources are the first rows of an activity range
+    cumulated = np.vstack(
+        [np.zeros((1, len(ImpactCategory))), np.cumsum(resource_impacts, axis=0)]
+    )
+    starts = compiled.activity_ranges[:, 0]
+    ends = starts + np.array(
+        [len(activity.resources) for activity in compiled.activities], dtype=int
+    )
+    activity_impacts = cumulated[ends] - cumulated[starts]
+
+    resources = {}
+    activities = {}
+    for index, category in enumerate(ImpactCategory):
+        if categories is not None and category not in categories:
+            continue
+        resources[category] = [
+            Hotspot(
+                resource.id,
+                resource.name,
+                Q_(float(impact), category.value),
+                _share(impact, total[index]),
+            )
+            for resource, impact in _top(
+                compiled.resources, resource_impacts[:, index], top
+            )
+        ]
+        activities[category] = [
+            Hotspot(
+                activity.id,
+                activity.name,
+                Q_(float(impact), category.value),
+                _share(impact, total[index]),
+            )
+            for activity, impact in _top(
+                compiled.activities, activity_impacts[:, index], top
+            )
+        ]
+    return ModelHotspots(to_quantities(total), resources, activities)
+
+
+def _top(elements: List, impacts: np.ndarray, top: int) -> List:
+    """Return the top elements with a positive impact and their impact, biggest first"""
+    return heapq.nlargest(
+        top,
+        (
+            (element, impacts[index])
+            for index, element in enumerate(elements)
+            if impacts[index] > 0
+        ),
+        key=lambda item: item[1],
+    )
+
+
+def _share(impact: float, total: float) -> float:
+    """Return the share of an impact in the total, 0 for a category without impact"""
+    return float(impact / total) if total != 0 else 0.0
@@ -0,0 +1,535 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Materialized ActivityImpact cache
+Each activity impact is saved in an ActivityImpactCache entry when computed
+An entry is invalidated, with those of all the activity ancestors, as soon as
+a resource or a subactivity under it is created, updated, moved or deleted
+Impacts being linear in resources values, a created resource or a resource whose
+quantities are updated is instead applied as a difference to the entries of its ancestors
+Each of these changes increments the version of the activity tree, so that entries computed
+by a concurrent request from the tree before the change are discarded instead of saved, see
+commit_activity_impacts()
+"""
+
+from contextlib import nullcontext
+from typing import Any, ContextManager, Iterable, List, Optional
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.exc import StaleDataError
+
+from impacts_model import content_cache
+from impacts_model.content_cache import content_impact_cache, get_content_hash
+from impacts_model.data_model import (
+    Activity,
+    ActivityImpactCache,
+    ActivityTreeVersion,
+    Resource,
+)
+from impacts_model.impact_sources import ImpactSourceError
+from impacts_model.parallel import compute_sharded_impact, count_resources
+from impacts_model.impacts import (
+    ActivityImpact,
+    EnvironmentalImpact,
+    ImpactCategory,
+    ImpactSourceImpact,
+    ImpactValue,
+)
+
+# Resource attributes moving its impact to another place in the tree
+RESOURCE_SOURCE_ATTRIBUTES = ["impact_source_id", "activity_id"]
+# Resource attributes only changing its impact value
+RESOURCE_QUANTITY_ATTRIBUTES = ["_amount", "_duration", "_frequency", "_period"]
+
+
+def get_activity_impact(
+    activity: Activity,
+    shard_threshold: int = 0,
+    max_workers: int = 1,
+    depth: Optional[int] = None,
+) -> ActivityImpact:
+    """
+    Return the activity complete impact, from its cache entry if valid
+    Invalid or missing entries of the subtree are computed, or retrieved from the content
+    cache of identical subtrees, and saved in the session, the caller is responsible for
+    committing them, see commit_activity_impacts()
+    :param activity: the activity to get the impact
+    :param shard_threshold: if set, a tree whose root and direct children are not cached, with
+    more resources, is split in subtrees computed by max_workers processes, see
+    compute_sharded_impact()
+    :param max_workers: number of worker processes to compute a split tree
+    :param depth: levels of sub activities to return, all if None. Valid entries below are not read
+    :return: the activity ActivityImpact
+    """
+    with _no_autoflush(activity):
+        return _get_activity_impact(activity, shard_threshold, max_workers, depth, {})
+
+
+def _get_activity_impact(
+    activity: Activity,
+    shard_threshold: int,
+    max_workers: int,
+    depth: Optional[int],
+    hashes: dict[Activity, str],
+) -> ActivityImpact:
+    if depth is not None and depth <= 0 and is_cached(activity):
+        return activity.impact_cache.get_impact([])
+
+    if (
+        shard_threshold > 0
+        and max_workers > 1
+        and not is_cached(activity)
+        and not any(is_cached(subactivity) for subactivity in activity.subactivities)
+        and count_resources(activity) > shard_threshold
+        and get_content_hash(activity, hashes) not in content_impact_cache
+    ):
+        impact = compute_sharded_impact(activity, shard_threshold, max_workers)
+        _store_activity_impact(activity, impact)
+        return limit_depth(impact, depth)
+
+    # Missing entries are computed for the whole subtree, to be saved
+    subactivities = [
+        _get_activity_impact(
+            subactivity,
+            0,
+            1,
+            depth - 1 if depth is not None and depth > 0 else None,
+            hashes,
+        )
+        for subactivity in activity.subactivities
+    ]
+
+    cache = activity.impact_cache
+    if is_cached(activity):
+        return cache.get_impact(subactivities)
+
+    # Same content levels of other activities may have been computed already
+    impact = content_cache.get_activity_impact(activity, subactivities, hashes)
+    if cache is None:
+        cache = ActivityImpactCache(activity_id=activity.id)
+        activity.impact_cache = cache
+    cache.set_impact(impact)
+    return limit_depth(impact, depth)
+
+
+def limit_depth(impact: ActivityImpact, depth: Optional[int]) -> ActivityImpact:
+    """
+    Remove the sub activities of an ActivityImpact below depth levels, in place
+    :param impact: the ActivityImpact to cut
+    :param depth: levels of sub activities to keep, all if None
+    :return: the same ActivityImpact
+    """
+    if depth is None:
+        return impact
+    if depth <= 0:
+        impact.sub_activities = []
+    for sub_activity in impact.sub_activities:
+        limit_depth(sub_activity, depth - 1)
+    return impact
+
+
+def is_cached(activity: Activity) -> bool:
+    """True if the activity has a valid cache entry, and so its whole subtree"""
+    return activity.impact_cache is not None and activity.impact_cache.is_valid
+
+
+def store_activity_impact(activity: Activity, impact: ActivityImpact) -> None:
+    """
+    Save an ActivityImpact computed elsewhere in the cache entries of the activity subtree
+    Changes are added to the session, the caller is responsible for committing them, see
+    commit_activity_impacts()
+    :param activity: the activity the impact has been computed for
+    :param impact: the activity complete impact
+    """
+    with _no_autoflush(activity):
+        _store_activity_impact(activity, impact)
+
+
+def _store_activity_impact(activity: Activity, impact: ActivityImpact) -> None:
+    for subactivity, subactivity_impact in zip(
+        activity.subactivities, impact.sub_activities
+    ):
+        _store_activity_impact(subactivity, subactivity_impact)
+
+    if activity.impact_cache is None:
+        activity.impact_cache = ActivityImpactCache(activity_id=activity.id)
+    activity.impact_cache.set_impact(impact)
+
+
+def _no_autoflush(activity: Activity) -> ContextManager[Any]:
+    """
+    Return a context not flushing the session of the activity, so that the computed entries
+    stay pending until committed together, see commit_activity_impacts()
+    """
+    session = object_session(activity)
+    return session.no_autoflush if session is not None else nullcontext()
+
+
+def get_tree_versions(session: Session, activity_ids: Iterable[int]) -> dict[int, int]:
+    """
+    Return the versions of the trees of activities, to be read before loading their subtrees
+    to compute impacts, see commit_activity_impacts()
+    :param session: session to read the versions in
+    :param activity_ids: ids of the activities to compute the impact
+    :return: the version of each tree, by root activity id
+    """
+    root_ids = {_get_root_id(session, activity_id) for activity_id in activity_ids}
+    versions = dict(
+        session.execute(
+            select(
+                ActivityTreeVersion.root_activity_id, ActivityTreeVersion.version
+            ).where(ActivityTreeVersion.root_activity_id.in_(root_ids))
+        ).all()
+    )
+    return {root_id: versions.get(root_id, 0) for root_id in root_ids}
+
+
+def commit_activity_impacts(session: Session, versions: dict[int, int]) -> bool:
+    """
+    Commit the cache entries computed in the session, unless one of their trees changed since
+    its version was read. New entries are inserted only if a concurrent request did not
+    insert one for the same activity first
+    Writes being serialized by the database, no change can be committed between the check of
+    the versions and the commit
+    :param session: session holding the computed entries and no other pending change
+    :param versions: versions of the trees the entries belong to, see get_tree_versions()
+    :return: True if the entries have been saved, False if they have been discarded
+    """
+    rows = []
+    for cache in [c for c in session.new if isinstance(c, ActivityImpactCache)]:
+        if cache.activity_id is None:
+            continue  # Entry of a new activity, inserted with it
+        rows.append(
+            {
+                "activity_id": cache.activity_id,
+                "catalog_version": cache.catalog_version,
+                "_total": cache._total,
+                "_impact_sources": cache._impact_sources,
+            }
+        )
+        activity = session.get(Activity, cache.activity_id)
+        set_committed_value(activity, "impact_cache", None)
+        session.expunge(cache)
+
+    try:
+        if rows:
+            session.execute(
+                insert(ActivityImpactCache).on_conflict_do_nothing(
+                    index_elements=[ActivityImpactCache.activity_id]
+                ),
+                rows,
+            )
+        session.flush()
+    except StaleDataError:
+        # An updated entry has been deleted by a concurrent change
+        session.rollback()
+        return False
+
+    if get_tree_versions(session, versions.keys()) != versions:
+        session.rollback()
+        return False
+    session.commit()
+    return True
+
+
+def invalidate_activity(session: Session, activity_id: Optional[int]) -> None:
+    """
+    Delete the cache entries of an activity and all its ancestors
+    :param session: session to delete the entries in
+    :param activity_id: id of the first activity to invalidate
+    """
+    _invalidate_activities(session, [activity_id], set())
+
+
+def _invalidate_activities(
+    session: Session, activity_ids: Iterable[Optional[int]], visited: set[int]
+) -> None:
+    for activity_id in activity_ids:
+        # Go up the tree until the root, or an activity already invalidated
+        while activity_id is not None and activity_id not in visited:
+            visited.add(activity_id)
+
+            cache = session.get(ActivityImpactCache, activity_id)
+            if cache is not None and cache not in session.deleted:
+                session.delete(cache)
+
+            activity = session.get(Activity, activity_id)
+            activity_id = activity.parent_activity_id if activity is not None else None
+
+
+def _get_root_id(session: Session, activity_id: int) -> int:
+    """Return the id of the root of an activity tree"""
+    visited: set[int] = set()
+    while activity_id not in visited:
+        visited.add(activity_id)
+        activity = session.get(Activity, activity_id)
+        if activity is None or activity.parent_activity_id is None:
+            break
+        activity_id = activity.parent_activity_id
+    return activity_id
+
+
+def _increment_tree_versions(
+    session: Session, activity_ids: Iterable[Optional[int]]
+) -> None:
+    """
+    Increment the versions of the trees of activities whose impact changed
+    Upserted, as concurrent changes of the same tree may create its version
+    """
+    root_ids = {
+        _get_root_id(session, activity_id)
+        for activity_id in activity_ids
+        if activity_id is not None
+    }
+    for root_id in root_ids:
+        session.execute(
+            insert(ActivityTreeVersion)
+            .values(root_activity_id=root_id, version=1)
+            .on_conflict_do_update(
+                index_elements=[ActivityTreeVersion.root_activity_id],
+                set_={"version": ActivityTreeVersion.version + 1},
+            )
+        )
+
+
+def get_resource_delta(resource: Resource) -> ImpactSourceImpact:
+    """
+    Return the difference of the resource impact made by its pending changes
+    The whole impact for a new resource
+    :param resource: a new resource, or one with only its quantities modified
+    :return: the impact after the changes minus the impact before
+    """
+    delta = resource.get_impact()
+
+    state = inspect(resource)
+    if state.persistent:
+        # Rebuild the resource as before the changes
+        previous = Resource(impact_source_id=resource.impact_source_id)
+        for attribute in RESOURCE_QUANTITY_ATTRIBUTES:
+            history = state.attrs[attribute].load_history()
+            values = [*history.unchanged, *history.deleted]
+            setattr(previous, attribute, values[0] if values else None)
+        delta.subtract(previous.get_impact())
+
+    return delta
+
+
+def apply_resource_delta(
+    session: Session, activity_id: Optional[int], delta: ImpactSourceImpact
+) -> None:
+    """
+    Add a resource impact difference to the cache entries of its activity and all its ancestors
+    As the entries above a missing one are missing too, stop at the first one, O(depth)
+    :param session: session to update the entries in
+    :param activity_id: id of the resource activity
+    :param delta: impact difference, see get_resource_delta()
+    """
+    visited: set[int] = set()
+    while activity_id is not None and activity_id not in visited:
+        visited.add(activity_id)
+
+        cache = session.get(ActivityImpactCache, activity_id)
+        if cache is None or cache in session.deleted or not cache.is_valid:
+            return
+        cache.add_impact_source_impact(delta)
+
+        activity = session.get(Activity, activity_id)
+        activity_id = activity.parent_activity_id if activity is not None else None
+
+
+def check_activity_impact(activity: Activity, rel_tol: float = 1e-6) -> List[int]:
+    """
+    Consistency checker of the cache, recompute the activity impact from scratch and compare
+    it to the valid cache entries of the subtree
+    Values are compared relatively to the activity total of their category
+    :param activity: the activity to check
+    :param rel_tol: relative tolerance of the comparison
+    :return: ids of the activities with an entry different from the computation
+    """
+    impact = activity.get_impact()
+    scales = {
+        category: max(abs(_magnitude(value.manufacture)), abs(_magnitude(value.use)))
+        for category, value in impact.total.items()
+    }
+    return _check_activity_impact(activity, impact, scales, rel_tol)
+
+
+def _check_activity_impact(
+    activity: Activity,
+    impact: ActivityImpact,
+    scales: dict[ImpactCategory, float],
+    rel_tol: float,
+) -> List[int]:
+    inconsistent_ids: List[int] = []
+
+    cache = activity.impact_cache
+    if cache is not None and cache.is_valid:
+        cached_sources = cache.impact_sources
+        if (
+            not _env_impacts_close(cache.total, impact.total, scales, rel_tol)
+            or cached_sources.keys() != impact.impact_sources.keys()
+            or not all(
+                _env_impacts_close(
+                    cached_sources[source].total_impact,
+                    impact.impact_sources[source].total_impact,
+                    scales,
+                    rel_tol,
+                )
+                for source in cached_sources
+            )
+        ):
+            inconsistent_ids.append(activity.id)
+
+    for subactivity, subactivity_impact in zip(
+        activity.subactivities, impact.sub_activities
+    ):
+        inconsistent_ids += _check_activity_impact(
+            subactivity, subactivity_impact, scales, rel_tol
+        )
+    return inconsistent_ids
+
+
+def _env_impacts_close(
+    first: EnvironmentalImpact,
+    second: EnvironmentalImpact,
+    scales: dict[ImpactCategory, float],
+    rel_tol: float,
+) -> bool:
+    for category in first.keys() | second.keys():
+        first_value = first.get(category, ImpactValue())
+        second_value = second.get(category, ImpactValue())
+        for first_quantity, second_quantity in [
+            (first_value.manufacture, second_value.manufacture),
+            (first_value.use, second_value.use),
+        ]:
+            a = _magnitude(first_quantity)
+            b = _magnitude(second_quantity)
+            if abs(a - b) > rel_tol * max(abs(a), abs(b), scales.get(category, 0)):
+                return False
+    return True
+
+
+def _magnitude(quantity: Any) -> float:
+    """Magnitude of a quantity in base units, 0 for None"""
+    return 0 if quantity is None else quantity.to_base_units().magnitude
+
+
+def _attribute_values(instance: Any, attribute: str) -> List[Any]:
+    """
+    Return the current and previous values of an instance attribute
+    """
+    history = inspect(instance).attrs[attribute].load_history()
+    return [
+        value
+        for value in [*history.unchanged, *history.added, *history.deleted]
+        if value is not None
+    ]
+
+
+def _is_modified(instance: Any, attributes: List[str]) -> bool:
+    state = inspect(instance)
+    return any(state.attrs[attribute].history.has_changes() for attribute in attributes)
+
+
+def _get_pending_changes(session: Session) -> tuple[List[int], List[Resource]]:
+    """
+    Return the pending session changes impacting the cache
+    :return: ids of the activities to invalidate, and resources to apply as a difference
+    """
+    activity_ids: List[int] = []
+    resources: List[Resource] = []
+
+    for resource in session.new:
+        if isinstance(resource, Resource) and resource.activity_id is not None:
+            # Resources added to an activity collection are handled with the activity
+            resources.append(resource)
+
+    for resource in session.deleted:
+        if isinstance(resource, Resource):
+            activity_ids += _attribute_values(resource, "activity_id")
+
+    for resource in session.dirty:
+        if isinstance(resource, Resource):
+            if _is_modified(resource, RESOURCE_SOURCE_ATTRIBUTES):
+                activity_ids += _attribute_values(resource, "activity_id")
+            elif _is_modified(resource, RESOURCE_QUANTITY_ATTRIBUTES):
+                resources.append(resource)
+
+    for activity in [*session.new, *session.deleted]:
+        if isinstance(activity, Activity):
+            activity_ids += _attribute_values(activity, "parent_activity_id")
+
+    for activity in session.dirty:
+        if isinstance(activity, Activity):
+            if _is_modified(activity, ["subactivities", "resources"]):
+                activity_ids.append(activity.id)
+            if _is_modified(activity, ["parent_activity_id"]):
+                # Moved activity, both the old and new parents are impacted
+                activity_ids += _attribute_values(activity, "parent_activity_id")
+
+    return activity_ids, resources
+
+
+@event.listens_for(Session, "before_flush")
+def _update_on_flush(session: Session, flush_context: Any, instances: Any) -> None:
+    """
+    Invalidate or update the cache entries impacted by the changes about to be flushed
+    """
+    with session.no_autoflush:
+        activity_ids, resources = _get_pending_changes(session)
+
+        visited: set[int] = set()
+        _invalidate_activities(session, activity_ids, visited)
+
+        for resource in resources:
+            try:
+                delta = get_resource_delta(resource)
+            except ImpactSourceError:
+                _invalidate_activities(session, [resource.activity_id], visited)
+                continue
+            apply_resource_delta(session, resource.activity_id, delta)
+
+        deleted_ids = [
+            activity.id
+            for activity in session.deleted
+            if isinstance(activity, Activity) and activity.id is not None
+        ]
+        _increment_tree_versions(
+            session,
+            [
+                *activity_ids,
+                *[resource.activity_id for resource in resources],
+                *deleted_ids,
+            ],
+        )
@@ -30,7 +30,9 @@
 
 from __future__ import annotations
 from copy import deepcopy
+import hashlib
 import re
+from typing import Iterable, Optional
 from impacts_model.impacts import (
     EnvironmentalImpact,
     ImpactCategory,
@@ -46,6 +48,7 @@ from impacts_model.quantities.quantities import (
     deserialize_unit,
 )
 from marshmallow import Schema, fields
+from impacts_model.uncertainty import EXACT_INTERVAL, Uncertainty
 
 
 class ImpactSource:
@@ -62,6 +65,7 @@ class ImpactSource:
         uses=[],
         source: str = "",
         methodology: str = "",
+        uncertainty: Optional[Uncertainty | dict[str, Uncertainty]] = None,
     ) -> None:
 
         self.id = id
@@ -72,6 +76,22 @@ class ImpactSource:
 
         self.source = source
         self.methodology = methodology
+        self._unit_impact: Optional[ImpactSourceImpact] = None
+        self._interval_unit_impact: Optional[ImpactSourceImpact] = None
+        self._unit_total_impact: Optional[EnvironmentalImpact] = None
+        self._unit_impacts: dict[
+            tuple[bool, Optional[frozenset[ImpactCategory]], bool], ImpactSourceImpact
+        ] = {}
+
+        # Uncertainty of the impact factors, the same for all categories or set by category
+        self.uncertainty: dict[ImpactCategory, Uncertainty] = {}
+        if isinstance(uncertainty, Uncertainty):
+            self.uncertainty = {category: uncertainty for category in self._own_impact}
+        elif uncertainty is not None:
+            self.uncertainty = {
+                ImpactCategory[category.upper()]: value
+                for category, value in uncertainty.items()
+            }
 
         # Set as impact per ImpactSource unit
         for impact in self._own_impact:
@@ -81,9 +101,80 @@ class ImpactSource:
         """
         Return this impact source impact for one unit
         """
-        sub_impacts = self._get_sub_impacts()
-        # total = self._get_total(sub_impacts)
-        return ImpactSourceImpact(self.id, deepcopy(self._own_impact), sub_impacts)
+        return deepcopy(self.unit_impact)
+
+    @property
+    def unit_impact(self) -> ImpactSourceImpact:
+        """
+        This impact source impact for one unit, computed once as the catalog does not change
+        Shared by all the resources using this impact source, must not be modified,
+        use ImpactSourceImpact.multiplied_by() to get a new one
+        """
+        if self._unit_impact is None:
+            sub_impacts = self._get_sub_impacts()
+            self._unit_impact = ImpactSourceImpact(
+                self.id, deepcopy(self._own_impact), sub_impacts
+            )
+        return self._unit_impact
+
+    def get_unit_impact(
+        self,
+        interval: bool = False,
+        categories: Optional[Iterable[ImpactCategory]] = None,
+        sub_impacts: bool = True,
+    ) -> ImpactSourceImpact:
+        """
+        Return unit_impact, or interval_unit_impact, with only some categories or collapsed
+        Computed once by variant, shared the same way as unit_impact, must not be modified
+        :param interval: if True, start from interval_unit_impact
+        :param categories: categories to keep, all if None
+        :param sub_impacts: if False, sub impacts are collapsed, see ImpactSourceImpact.collapsed()
+        """
+        unit_impact = self.interval_unit_impact if interval else self.unit_impact
+        if categories is None and sub_impacts:
+            return unit_impact
+
+        key = (
+            interval,
+            frozenset(categories) if categories is not None else None,
+            sub_impacts,
+        )
+        if key not in self._unit_impacts:
+            impact = unit_impact.filtered(key[1]) if key[1] is not None else unit_impact
+            self._unit_impacts[key] = impact if sub_impacts else impact.collapsed()
+        return self._unit_impacts[key]
+
+    @property
+    def unit_total_impact(self) -> EnvironmentalImpact:
+        """
+        Total of unit_impact, own and sub impacts summed by category, computed once
+        Shared the same way as unit_impact, must not be modified
+        """
+        if self._unit_total_impact is None:
+            self._unit_total_impact = self.unit_impact.total_impact
+        return self._unit_total_impact
+
+    @property
+    def interval_unit_impact(self) -> ImpactSourceImpact:
+        """
+        This impact source impact for one unit, with [min, nominal, max] magnitudes from the
+        impact factors uncertainty and the ones of the impact sources used
+        Shared the same way as unit_impact, must not be modified
+        """
+        if self._interval_unit_impact is None:
+            own_impact = {
+                category: value.multiplied_by(
+                    self.uncertainty[category].interval()
+                    if category in self.uncertainty
+                    else EXACT_INTERVAL
+                )
+                for category, value in self._own_impact.items()
+            }
+            sub_impacts = self._get_sub_impacts(interval=True)
+            self._interval_unit_impact = ImpactSourceImpact(
+                self.id, own_impact, sub_impacts
+            )
+        return self._interval_unit_impact
 
     def _get_total(
         self, sub_impacts: dict[ImpactSourceId, ImpactSourceImpact]
@@ -98,9 +189,12 @@ class ImpactSource:
             total = merge_env_impact(total, sub_impacts[sub_impact].total_impact)
         return total
 
-    def _get_sub_impacts(self) -> dict[ImpactSourceId, ImpactSourceImpact]:
+    def _get_sub_impacts(
+        self, interval: bool = False
+    ) -> dict[ImpactSourceId, ImpactSourceImpact]:
         """
         Return a list of ImpactSourceImpact, for all the sub_impacts of this ImpactSource
+        :param interval: if True, use the interval impacts of the impact sources used
         """
         result: dict[ImpactSourceId, ImpactSourceImpact] = {}
 
@@ -111,9 +205,13 @@ class ImpactSource:
             amount = deserialize_quantity(use["quantity"])
 
             if amount:
-                impact = impact_source.get_impact()
                 # Compute the other resource quantity consumed to remove its unit
-                impact.multiply_by(amount)
+                unit_impact = (
+                    impact_source.interval_unit_impact
+                    if interval
+                    else impact_source.unit_impact
+                )
+                impact = unit_impact.multiplied_by(amount)
                 # Set as quantity per this ImpactSource unit
                 impact.divide_by(self.unit)
                 # Add to sub impacts list
@@ -147,6 +245,9 @@ class ImpactSourceSchema(Schema):
     )
 
 
+IMPACT_SOURCES_PATH = "impacts_model/data/impact_sources/default.yaml"
+
+
 def _get_all_impact_sources() -> list[ImpactSource]:
     def impact_source_constructor(loader, node):
         fields = loader.construct_mapping(node, deep=True)
@@ -193,19 +294,34 @@ def _get_all_impact_sources() -> list[ImpactSource]:
             else ImpactValue(),
         }
 
+    def uncertainty_constructor(loader, node) -> Uncertainty:
+        fields = loader.construct_mapping(node, deep=True)
+        return Uncertainty(**fields)
+
     yaml.add_constructor("!ImpactSource", impact_source_constructor)
     yaml.add_constructor("!ImpactValue", impact_value_constructor)
     yaml.add_constructor("!EnvironmentalImpact", environmental_impact_constructor)
+    yaml.add_constructor("!Uncertainty", uncertainty_constructor)
 
     list = []
-    with open("impacts_model/data/impact_sources/default.yaml", "r") as stream:
+    with open(IMPACT_SOURCES_PATH, "r") as stream:
         data_loaded = yaml.load_all(stream, Loader=yaml.Loader)
         for data in data_loaded:
             list.append(data)
     return list
 
 
+def _get_catalog_version() -> str:
+    """
+    Return a version of the impact sources catalog, as a hash of its file content
+    Used to discard impacts computed with another version of the catalog
+    """
+    with open(IMPACT_SOURCES_PATH, "rb") as stream:
+        return hashlib.sha256(stream.read()).hexdigest()
+
+
 impact_sources = _get_all_impact_sources()
+catalog_version = _get_catalog_version()
 
 
 class ImpactSourceError(Exception):
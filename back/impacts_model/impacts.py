@@ -33,7 +33,7 @@ from copy import deepcopy
 from dataclasses import dataclass
 
 from enum import Enum
-from typing import Any, List, Optional
+from typing import Any, Iterable, List, Optional
 from marshmallow_sqlalchemy.fields import Nested
 from marshmallow import fields, post_dump, Schema
 from pint import Quantity, Unit
@@ -47,6 +47,8 @@ from impacts_model.quantities.quantities import (
     MOL_HPOS,
     KG_MIPS,
     deserialize_quantity,
+    deserialize_quantity_compact,
+    serialize_quantity_compact,
 )
 
 
@@ -79,10 +81,26 @@ class ImpactCategory(str, Enum):
         }.get(self.name, self.name + " not implemented")
 
 
+def get_impact_categories(names: Iterable[str]) -> List[ImpactCategory]:
+    """
+    Return the ImpactCategory of each name, case insensitive, ex climate_change
+    :raise ValueError: if a name is not an ImpactCategory
+    """
+    categories = []
+    for name in names:
+        if name.upper() not in ImpactCategory.__members__:
+            raise ValueError("Unknown impact category " + name)
+        categories.append(ImpactCategory[name.upper()])
+    return categories
+
+
 ###############
 # ImpactValue #
 ###############
 class ImpactValue:
+    # Many of them are created by a model impact computation, slots save their __dict__
+    __slots__ = ("manufacture", "use")
+
     def __init__(
         self,
         manufacture: Optional[Quantity[Any]] = None,
@@ -144,22 +162,69 @@ class ImpactValue:
             ),
         )
 
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Return this ImpactValue as plain data, with compact quantities
+        """
+        return {
+            "manufacture": serialize_quantity_compact(self.manufacture),
+            "use": serialize_quantity_compact(self.use),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> ImpactValue:
+        """
+        Create an ImpactValue from the plain data returned by to_dict()
+        """
+        return cls(
+            manufacture=deserialize_quantity_compact(data["manufacture"]),
+            use=deserialize_quantity_compact(data["use"]),
+        )
+
 
 class ImpactValueSchema(Schema):
     manufacture = Nested("QuantitySchema")
     use = Nested("QuantitySchema")
 
 
+class EnvironmentalImpactField(fields.Dict):
+    """
+    Serialize an EnvironmentalImpact, setting the category of each value in the schema
+    context for QuantitySchema to write it in the context display_units if any
+    """
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(
+            keys=fields.Str(), values=Nested("ImpactValueSchema"), **kwargs
+        )
+
+    def _serialize(self, value: Any, attr: Any, obj: Any, **kwargs: Any) -> Any:
+        if value is None:
+            return None
+        result = {}
+        for category, impact_value in value.items():
+            self.context["category"] = category
+            result[str(category)] = self.value_field._serialize(
+                impact_value, None, None, **kwargs
+            )
+        return result
+
+
 class ImpactSourceImpact:
+    __slots__ = ("impact_source_id", "own_impact", "sub_impacts", "sub_total")
+
     def __init__(
         self,
         impact_source_id: str,
         own_impact: EnvironmentalImpact,
         sub_impacts: dict[ImpactSourceId, ImpactSourceImpact],
+        sub_total: Optional[EnvironmentalImpact] = None,
     ) -> None:
         self.impact_source_id = impact_source_id
         self.own_impact = own_impact
         self.sub_impacts = sub_impacts
+        # Total of the sub impacts not expanded, see collapsed()
+        self.sub_total = sub_total if sub_total is not None else {}
 
     @property
     def total_impact(self) -> EnvironmentalImpact:
@@ -167,7 +232,7 @@ class ImpactSourceImpact:
         Return this ImpactSource EnvironmentalImpact, as the sum of its sub impact sources and own impact
         """
         # The result will always add this ImpactSource own impact
-        total = deepcopy(self.own_impact)
+        total = merge_env_impact(deepcopy(self.own_impact), self.sub_total)
         # Iterate though sub_impacts to sum them into the result
         for sub_impact in self.sub_impacts:
             total = merge_env_impact(total, self.sub_impacts[sub_impact].total_impact)
@@ -180,6 +245,7 @@ class ImpactSourceImpact:
         Add another ImpactSourceImpact into this one
         """
         self.own_impact = merge_env_impact(self.own_impact, other.own_impact)
+        self.sub_total = merge_env_impact(self.sub_total, other.sub_total)
 
         for sub_impact in other.sub_impacts:
             if sub_impact in self.sub_impacts:
@@ -187,6 +253,14 @@ class ImpactSourceImpact:
             else:
                 self.sub_impacts[sub_impact] = other.sub_impacts[sub_impact]
 
+    def subtract(self, other: ImpactSourceImpact) -> None:
+        """
+        Subtract another ImpactSourceImpact from this one
+        """
+        negative = deepcopy(other)
+        negative.multiply_by(-1)
+        self.add(negative)
+
     def multiply_by(self, amount: Quantity[Any]) -> None:
         """
         Multiply all impacts, and sub ones, by given amount
@@ -194,11 +268,72 @@ class ImpactSourceImpact:
         # Multiply all category of own_impact
         for category in self.own_impact:
             self.own_impact[category] = self.own_impact[category].multiplied_by(amount)
+        for category in self.sub_total:
+            self.sub_total[category] = self.sub_total[category].multiplied_by(amount)
 
         # Multiply sub impacts as well
         for sub_impact in self.sub_impacts:
             self.sub_impacts[sub_impact].multiply_by(amount)
 
+    def multiplied_by(self, amount: Quantity[Any]) -> ImpactSourceImpact:
+        """
+        Return a new ImpactSourceImpact with all impacts, and sub ones, multiplied by given amount
+        """
+        return ImpactSourceImpact(
+            impact_source_id=self.impact_source_id,
+            own_impact={
+                category: value.multiplied_by(amount)
+                for category, value in self.own_impact.items()
+            },
+            sub_impacts={
+                sub_impact: self.sub_impacts[sub_impact].multiplied_by(amount)
+                for sub_impact in self.sub_impacts
+            },
+            sub_total={
+                category: value.multiplied_by(amount)
+                for category, value in self.sub_total.items()
+            },
+        )
+
+    def filtered(self, categories: Iterable[ImpactCategory]) -> ImpactSourceImpact:
+        """
+        Return a new ImpactSourceImpact with only the given categories, in its own and sub impacts
+        """
+        categories = set(categories)
+        return ImpactSourceImpact(
+            impact_source_id=self.impact_source_id,
+            own_impact={
+                category: value
+                for category, value in self.own_impact.items()
+                if category in categories
+            },
+            sub_impacts={
+                sub_impact: self.sub_impacts[sub_impact].filtered(categories)
+                for sub_impact in self.sub_impacts
+            },
+            sub_total={
+                category: value
+                for category, value in self.sub_total.items()
+                if category in categories
+            },
+        )
+
+    def collapsed(self) -> ImpactSourceImpact:
+        """
+        Return a new ImpactSourceImpact with its sub impacts replaced by their total
+        Its total_impact is the same, without the sub impacts tree to build, add or multiply
+        """
+        sub_total = deepcopy(self.sub_total)
+        for sub_impact in self.sub_impacts.values():
+            for category, value in sub_impact.total_impact.items():
+                add_impact(sub_total, category, value)
+        return ImpactSourceImpact(
+            impact_source_id=self.impact_source_id,
+            own_impact=self.own_impact,
+            sub_impacts={},
+            sub_total=sub_total,
+        )
+
     def divide_by(self, unit: Unit) -> None:
         """
         Divide all impacts, and sub ones, by given amount
@@ -206,22 +341,57 @@ class ImpactSourceImpact:
         # Divide all category of own_impact
         for category in self.own_impact:
             self.own_impact[category] = self.own_impact[category].divided_by(unit)
+        for category in self.sub_total:
+            self.sub_total[category] = self.sub_total[category].divided_by(unit)
 
         # Divide sub impacts as well
         for sub_impact in self.sub_impacts:
             self.sub_impacts[sub_impact].divide_by(unit)
 
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Return this ImpactSourceImpact, and its sub impacts, as plain data
+        """
+        return {
+            "impact_source_id": self.impact_source_id,
+            "own_impact": serialize_env_impact(self.own_impact),
+            "sub_impacts": {
+                sub_impact: self.sub_impacts[sub_impact].to_dict()
+                for sub_impact in self.sub_impacts
+            },
+            "sub_total": serialize_env_impact(self.sub_total),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> ImpactSourceImpact:
+        """
+        Create an ImpactSourceImpact from the plain data returned by to_dict()
+        """
+        return cls(
+            impact_source_id=data["impact_source_id"],
+            own_impact=deserialize_env_impact(data["own_impact"]),
+            sub_impacts={
+                sub_impact: ImpactSourceImpact.from_dict(
+                    data["sub_impacts"][sub_impact]
+                )
+                for sub_impact in data["sub_impacts"]
+            },
+            sub_total=deserialize_env_impact(data.get("sub_total", {})),
+        )
+
 
 class ImpactSourceImpactSchema(Schema):
     impact_source_id = fields.Str()
-    own_impact = fields.Dict(keys=fields.Str(), values=Nested("ImpactValueSchema"))
+    own_impact = EnvironmentalImpactField()
     sub_impacts = fields.Dict(
         keys=fields.Str(), values=Nested("ImpactSourceImpactSchema")
     )
-    total_impact = fields.Dict(keys=fields.Str(), values=Nested("ImpactValueSchema"))
+    total_impact = EnvironmentalImpactField()
 
 
 class ActivityImpact:
+    __slots__ = ("activity_id", "total", "sub_activities", "impact_sources")
+
     def __init__(
         self,
         activity_id: str,
@@ -234,16 +404,75 @@ class ActivityImpact:
         self.sub_activities = sub_activities
         self.impact_sources = impact_sources
 
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Return this ActivityImpact, and its sub activities ones, as plain data
+        """
+        return {
+            "activity_id": self.activity_id,
+            "total": serialize_env_impact(self.total),
+            "sub_activities": [
+                sub_activity.to_dict() for sub_activity in self.sub_activities
+            ],
+            "impact_sources": serialize_impact_sources(self.impact_sources),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> ActivityImpact:
+        """
+        Create an ActivityImpact from the plain data returned by to_dict()
+        """
+        return cls(
+            activity_id=data["activity_id"],
+            total=deserialize_env_impact(data["total"]),
+            sub_activities=[
+                ActivityImpact.from_dict(sub_activity)
+                for sub_activity in data["sub_activities"]
+            ],
+            impact_sources=deserialize_impact_sources(data["impact_sources"]),
+        )
+
 
 class ActivityImpactSchema(Schema):
     activity_id = fields.Str()
-    total = fields.Dict(keys=fields.Str(), values=Nested("ImpactValueSchema"))
+    total = EnvironmentalImpactField()
     sub_activities = fields.Nested("ActivityImpactSchema", many=True)
     impact_sources = fields.Dict(
         keys=fields.Str(), values=Nested("ImpactSourceImpactSchema")
     )
 
 
+class ActivitySummary:
+    """
+    Total impact of an activity, without its impact sources
+    Sub activities are only set for the first level of a summary
+    """
+
+    __slots__ = ("activity_id", "total", "sub_activities")
+
+    def __init__(
+        self,
+        activity_id: str,
+        total: EnvironmentalImpact,
+        sub_activities: list[ActivitySummary],
+    ) -> None:
+        self.activity_id = activity_id
+        self.total = total
+        self.sub_activities = sub_activities
+
+
+class ActivitySummarySchema(Schema):
+    activity_id = fields.Str()
+    total = EnvironmentalImpactField()
+    sub_activities = fields.Nested("ActivitySummarySchema", many=True)
+
+
+class ModelImpactSchema(Schema):
+    model_id = fields.Int()
+    model_name = fields.Str()
+    impact = fields.Nested("ActivityImpactSchema")
+
+
 EnvironmentalImpact = dict[ImpactCategory, ImpactValue]
 
 
@@ -270,6 +499,50 @@ def merge_env_impact(
     return result
 
 
+def serialize_env_impact(environmental_impact: EnvironmentalImpact) -> dict[str, Any]:
+    """
+    Return an EnvironmentalImpact as plain data, keyed by ImpactCategory names
+    """
+    return {
+        category.name: value.to_dict()
+        for category, value in environmental_impact.items()
+    }
+
+
+def deserialize_env_impact(data: dict[str, Any]) -> EnvironmentalImpact:
+    """
+    Create an EnvironmentalImpact from the plain data returned by serialize_env_impact()
+    """
+    return {
+        ImpactCategory[category]: ImpactValue.from_dict(value)
+        for category, value in data.items()
+    }
+
+
+def serialize_impact_sources(
+    impact_sources: dict[ImpactSourceId, ImpactSourceImpact]
+) -> dict[str, Any]:
+    """
+    Return a dict of ImpactSourceImpact as plain data
+    """
+    return {
+        impact_source_id: impact_source_impact.to_dict()
+        for impact_source_id, impact_source_impact in impact_sources.items()
+    }
+
+
+def deserialize_impact_sources(
+    data: dict[str, Any]
+) -> dict[ImpactSourceId, ImpactSourceImpact]:
+    """
+    Create a dict of ImpactSourceImpact from the plain data returned by serialize_impact_sources()
+    """
+    return {
+        impact_source_id: ImpactSourceImpact.from_dict(impact_source_impact)
+        for impact_source_id, impact_source_impact in data.items()
+    }
+
+
 def add_impact(
     environmental_impact: EnvironmentalImpact,
     category: ImpactCategory,
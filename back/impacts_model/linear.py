@@ -0,0 +1,369 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""
+Linear form of a model
+Impacts are linear in the resources values, so an activity tree is compiled once into
+arrays, the resources values times their impact factors by category, then evaluated
+for many variations of the resources values with matrix products
+"""
+
+from __future__ import annotations
+
+from typing import Any, List, Optional
+
+import numpy as np
+from marshmallow import Schema, ValidationError, fields, validates_schema
+from marshmallow_sqlalchemy.fields import Nested
+from pint import Quantity, Unit
+
+from impacts_model.data_model import Activity, Resource
+from impacts_model.impact_sources import ImpactSource, impact_source_factory
+from impacts_model.impacts import ImpactCategory, ImpactSourceId, ImpactSourceImpact
+from impacts_model.quantities.quantities import Q_
+
+# Total impact by category, manufacture and use summed
+EnvironmentalImpactTotal = dict[ImpactCategory, Quantity[Any]]
+
+
+class CompiledModel:
+    """
+    Linear form of an activity tree
+    Activities and resources are ordered depth first, so the resources of an activity subtree
+    are the contiguous rows activity_ranges[activity index] of the resources arrays
+    All impacts are magnitudes in each ImpactCategory unit, categories in the enum order
+    """
+
+    def __init__(
+        self,
+        activities: List[Activity],
+        activity_ranges: np.ndarray,
+        resources: List[Resource],
+        values: np.ndarray,
+        impact_sources: dict[ImpactSourceId, ImpactSource],
+        source_index: np.ndarray,
+        factor_ids: List[ImpactSourceId],
+        unit_factors: np.ndarray,
+    ) -> None:
+        """
+        :param activities: activities of the tree, depth first
+        :param activity_ranges: first and last + 1 resource row of each activity subtree, shape (activities, 2)
+        :param resources: resources of the tree, depth first
+        :param values: value of each resource in its impact source unit, shape (resources,)
+        :param impact_sources: impact sources used by the resources, by id, in the rows order of unit_factors
+        :param source_index: impact source row of each resource, shape (resources,)
+        :param factor_ids: impact sources whose own impact factors are used, directly or by other impact sources
+        :param unit_factors: impact of one unit of each impact source split by factor, shape (impact sources, factors, categories)
+        """
+        self.activities = activities
+        self.activity_ranges = activity_ranges
+        self.resources = resources
+        self.values = values
+        self.impact_sources = impact_sources
+        self.source_index = source_index
+        self.factor_ids = factor_ids
+        self.unit_factors = unit_factors
+
+        # Impact of one unit of each resource, shape (resources, categories)
+        self.factors = unit_factors.sum(axis=1)[source_index]
+
+    @property
+    def factor_sources(self) -> List[ImpactSource]:
+        """
+        Impact source of each factor, the ones used by other impact sources are retrieved the same
+        way ImpactSource does
+        """
+        return [
+            self.impact_sources.get(factor_id) or impact_source_factory(factor_id)
+            for factor_id in self.factor_ids
+        ]
+
+    def get_own_factors(self) -> np.ndarray:
+        """
+        Return the own impact of one unit of each factor impact source, without the impact sources it uses
+        :return: array of shape (factors, categories)
+        """
+        return np.array(
+            [
+                get_unit_factors(impact_source)[impact_source.id]
+                for impact_source in self.factor_sources
+            ]
+        ).reshape(-1, len(ImpactCategory))
+
+    def evaluate(
+        self, scaling: Optional[np.ndarray] = None, activities: bool = False
+    ) -> np.ndarray:
+        """
+        Compute the impacts for many scalings of the resources values at once
+        :param scaling: factors applied to each resource value, shape (scenarios, resources), nominal values if None
+        :param activities: if True, compute the impacts of all the activities, else of the root one
+        :return: impacts by category, shape (scenarios, activities, categories)
+        """
+        if scaling is None:
+            scaling = np.ones((1, len(self.resources)))
+        values = scaling * self.values
+
+        if not activities:
+            return (values @ self.factors)[:, np.newaxis, :]
+        return np.stack(
+            [
+                values[:, start:end] @ self.factors[start:end]
+                for start, end in self.activity_ranges
+            ],
+            axis=1,
+        )
+
+    def get_scaling(self, rules: List[dict[str, Any]]) -> np.ndarray:
+        """
+        Return the factors applied to each resource value by a scenario
+        Each rule multiplies the resources it selects, all the resources of an activity subtree,
+        using an impact source, or a single one
+        :param rules: loaded by ScalingRuleSchema
+        :return: array of shape (resources,)
+        """
+        scaling = np.ones(len(self.resources))
+        for rule in rules:
+            scaling[self.select(rule)] *= rule["factor"]
+        return scaling
+
+    def select(self, rule: dict[str, Any]) -> np.ndarray:
+        """
+        Return the resources rows selected by a rule, see get_scaling()
+        :raise ValueError: if the activity, resource or impact source is not in the model
+        """
+        if "activity_id" in rule:
+            for activity, (start, end) in zip(self.activities, self.activity_ranges):
+                if activity.id == rule["activity_id"]:
+                    return np.arange(start, end)
+            raise ValueError("No activity " + str(rule["activity_id"]) + " in model")
+        if "resource_id" in rule:
+            rows = [
+                index
+                for index, resource in enumerate(self.resources)
+                if resource.id == rule["resource_id"]
+            ]
+            if not rows:
+                raise ValueError(
+                    "No resource " + str(rule["resource_id"]) + " in model"
+                )
+            return np.array(rows)
+        if rule["impact_source_id"] not in self.impact_sources:
+            raise ValueError(
+                "No resource using " + rule["impact_source_id"] + " in model"
+            )
+        source = list(self.impact_sources).index(rule["impact_source_id"])
+        return np.flatnonzero(self.source_index == source)
+
+
+class SelectorSchema(Schema):
+    """
+    Selection of resources of a compiled model, see CompiledModel.select()
+    """
+
+    activity_id = fields.Int()
+    resource_id = fields.Int()
+    impact_source_id = fields.Str()
+
+    @validates_schema
+    def validate_selector(self, data, **kwargs):
+        selectors = ["activity_id", "resource_id", "impact_source_id"]
+        if len([selector for selector in selectors if selector in data]) != 1:
+            raise ValidationError(
+                "Exactly one of activity_id, resource_id or impact_source_id is required"
+            )
+
+
+class ScalingRuleSchema(SelectorSchema):
+    factor = fields.Float(required=True)
+
+
+class ScenarioSchema(Schema):
+    name = fields.Str(required=True)
+    scaling = fields.List(fields.Nested(ScalingRuleSchema), required=True)
+
+
+class ScenarioImpact:
+    """
+    Impacts of a model for a scenario, of the root activity and optionally of all the activities
+    """
+
+    def __init__(
+        self,
+        name: str,
+        total: EnvironmentalImpactTotal,
+        activities: Optional[dict[int, EnvironmentalImpactTotal]] = None,
+    ) -> None:
+        self.name = name
+        self.total = total
+        self.activities = activities
+
+
+class ScenarioImpactSchema(Schema):
+    name = fields.Str()
+    total = fields.Dict(keys=fields.Str(), values=Nested("QuantitySchema"))
+    activities = fields.Dict(
+        keys=fields.Str(),
+        values=fields.Dict(keys=fields.Str(), values=Nested("QuantitySchema")),
+    )
+
+
+def get_scenarios_impacts(
+    compiled: CompiledModel, scenarios: List[dict[str, Any]], activities: bool = False
+) -> List[ScenarioImpact]:
+    """
+    Evaluate many scenarios on a compiled model at once
+    :param compiled: the CompiledModel
+    :param scenarios: loaded by ScenarioSchema
+    :param activities: if True, also return the impacts of all the activities
+    :return: the ScenarioImpact of each scenario, in the same order
+    :raise ValueError: if a scaling rule selects something not in the model
+    """
+    scaling = np.array(
+        [compiled.get_scaling(scenario["scaling"]) for scenario in scenarios]
+    )
+    impacts = compiled.evaluate(
+        scaling.reshape(-1, len(compiled.resources)), activities
+    )
+
+    return [
+        ScenarioImpact(
+            scenario["name"],
+            to_quantities(impacts[index, 0]),
+            {
+                activity.id: to_quantities(impacts[index, activity_index])
+                for activity_index, activity in enumerate(compiled.activities)
+            }
+            if activities
+            else None,
+        )
+        for index, scenario in enumerate(scenarios)
+    ]
+
+
+def to_quantities(impacts: np.ndarray) -> EnvironmentalImpactTotal:
+    """Return impacts magnitudes by category as quantities"""
+    return {
+        category: Q_(float(impacts[index]), category.value)
+        for index, category in enumerate(ImpactCategory)
+    }
+
+
+def compile_activity(activity: Activity) -> CompiledModel:
+    """
+    Compile an activity tree into its linear form
+    Only the impact sources catalog is computed with pint, once by impact source used
+    :param activity: root of the tree
+    :return: the CompiledModel of the tree
+    """
+    activities: List[Activity] = []
+    ranges: List[List[int]] = []
+    resources: List[Resource] = []
+    _collect_tree(activity, activities, ranges, resources)
+
+    impact_sources: dict[ImpactSourceId, ImpactSource] = {}
+    for resource in resources:
+        if resource.impact_source_id not in impact_sources:
+            impact_sources[resource.impact_source_id] = resource.impact_source
+
+    source_factors = {
+        impact_source_id: get_unit_factors(impact_source)
+        for impact_source_id, impact_source in impact_sources.items()
+    }
+    factor_ids = sorted({id for factors in source_factors.values() for id in factors})
+    factor_index = {id: index for index, id in enumerate(factor_ids)}
+    unit_factors = np.zeros((len(impact_sources), len(factor_ids), len(ImpactCategory)))
+    for source, factors in enumerate(source_factors.values()):
+        for factor_id, values in factors.items():
+            unit_factors[source, factor_index[factor_id]] = values
+
+    source_rows = {id: index for index, id in enumerate(impact_sources)}
+    source_index = np.array(
+        [source_rows[resource.impact_source_id] for resource in resources], dtype=int
+    )
+    values = np.array(
+        [
+            resource.value()
+            .to(impact_sources[resource.impact_source_id].unit)
+            .magnitude
+            for resource in resources
+        ],
+        dtype=float,
+    )
+
+    return CompiledModel(
+        activities,
+        np.array(ranges, dtype=int).reshape(-1, 2),
+        resources,
+        values,
+        impact_sources,
+        source_index,
+        factor_ids,
+        unit_factors,
+    )
+
+
+def _collect_tree(
+    activity: Activity,
+    activities: List[Activity],
+    ranges: List[List[int]],
+    resources: List[Resource],
+) -> None:
+    """Add an activity subtree depth first, with the rows range of its resources"""
+    activity_range = [len(resources), 0]
+    activities.append(activity)
+    ranges.append(activity_range)
+    resources += activity.resources
+    for subactivity in activity.subactivities:
+        _collect_tree(subactivity, activities, ranges, resources)
+    activity_range[1] = len(resources)
+
+
+def get_unit_factors(impact_source: ImpactSource) -> dict[ImpactSourceId, np.ndarray]:
+    """
+    Return the impact of one unit of an impact source, split by the impact source factors it
+    depends on, itself and the ones it uses, as magnitudes in each category unit
+    """
+    result: dict[ImpactSourceId, np.ndarray] = {}
+    _add_unit_factors(impact_source.unit_impact, impact_source.unit, result)
+    return result
+
+
+def _add_unit_factors(
+    impact: ImpactSourceImpact, unit: Unit, result: dict[ImpactSourceId, np.ndarray]
+) -> None:
+    values = result.setdefault(impact.impact_source_id, np.zeros(len(ImpactCategory)))
+    for index, category in enumerate(ImpactCategory):
+        impact_value = impact.own_impact.get(category)
+        if impact_value is None:
+            continue
+        for quantity in [impact_value.manufacture, impact_value.use]:
+            if quantity is not None:
+                values[index] += (quantity * unit).to(category.value).magnitude
+    for sub_impact in impact.sub_impacts.values():
+        _add_unit_factors(sub_impact, unit, result)
@@ -0,0 +1,192 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""
+Uncertainty propagation of the impacts with Monte Carlo sampling
+Impacts are linear in the impact factors and the resources amounts, so the samples of a
+whole model are computed as NumPy arrays, one row of samples per impact category,
+instead of running the pint computation once per sample
+"""
+
+from __future__ import annotations
+
+from typing import List, Optional
+
+import numpy as np
+from marshmallow import Schema, fields
+
+from impacts_model.data_model import Activity
+from impacts_model.impacts import ImpactCategory
+from impacts_model.linear import compile_activity
+
+
+class ImpactStatistics:
+    """
+    Statistics of an impact category samples, in the category unit
+    """
+
+    def __init__(self, unit: str, mean: float, percentiles: dict[str, float]) -> None:
+        self.unit = unit
+        self.mean = mean
+        self.percentiles = percentiles
+
+
+class ImpactStatisticsSchema(Schema):
+    unit = fields.Str()
+    mean = fields.Float()
+    percentiles = fields.Dict(keys=fields.Str(), values=fields.Float())
+
+
+class ActivityUncertainty:
+    """
+    Impacts statistics of an activity, and of its sub activities
+    """
+
+    def __init__(
+        self,
+        activity_id: Optional[int],
+        total: dict[ImpactCategory, ImpactStatistics],
+        sub_activities: List[ActivityUncertainty],
+    ) -> None:
+        self.activity_id = activity_id
+        self.total = total
+        self.sub_activities = sub_activities
+
+
+class ActivityUncertaintySchema(Schema):
+    activity_id = fields.Str()
+    total = fields.Dict(
+        keys=fields.Str(), values=fields.Nested("ImpactStatisticsSchema")
+    )
+    sub_activities = fields.Nested("ActivityUncertaintySchema", many=True)
+
+
+def get_activity_uncertainty(
+    activity: Activity,
+    samples: int,
+    percentiles: List[float],
+    seed: Optional[int] = None,
+) -> ActivityUncertainty:
+    """
+    Propagate the impact factors and resources amounts uncertainties through an activity tree
+    The samples of each impact source for one unit are computed once from the compiled
+    model, as a matrix product of the impact factors samples, then scaled by each resource value
+    :param activity: root Activity of the tree
+    :param samples: number of Monte Carlo samples
+    :param percentiles: percentiles to return, between 0 and 100
+    :param seed: seed of the random generator, for reproducible results
+    :return: the ActivityUncertainty of the root activity and its sub activities
+    """
+    rng = np.random.default_rng(seed)
+    compiled = compile_activity(activity)
+
+    # Factors samples, shape (categories, factors, samples)
+    factor_samples = np.ones((len(ImpactCategory), len(compiled.factor_ids), samples))
+    for factor_index, impact_source in enumerate(compiled.factor_sources):
+        uncertainties = impact_source.uncertainty
+        for category_index, category in enumerate(ImpactCategory):
+            if category in uncertainties:
+                factor_samples[category_index, factor_index] = uncertainties[
+                    category
+                ].sample(rng, samples)
+
+    # Samples of each impact source for one unit, shape (categories, impact sources, samples)
+    unit_samples = np.matmul(compiled.unit_factors.transpose(2, 0, 1), factor_samples)
+
+    resource_index = {
+        id(resource): index for index, resource in enumerate(compiled.resources)
+    }
+    return _get_activity_uncertainty(
+        activity,
+        compiled.values,
+        unit_samples,
+        compiled.source_index,
+        resource_index,
+        rng,
+        samples,
+        percentiles,
+    )[0]
+
+
+def _get_activity_uncertainty(
+    activity: Activity,
+    values: np.ndarray,
+    unit_samples: np.ndarray,
+    source_index: np.ndarray,
+    resource_index: dict[int, int],
+    rng: np.random.Generator,
+    samples: int,
+    percentiles: List[float],
+) -> tuple[ActivityUncertainty, np.ndarray]:
+    """
+    Return the ActivityUncertainty of an activity and its samples, of shape (categories, samples)
+    The samples of one unit of a resource are read from its impact source ones when used,
+    not materialized for all the resources at once
+    """
+    total = np.zeros((len(ImpactCategory), samples))
+
+    sub_activities = []
+    for subactivity in activity.subactivities:
+        sub_uncertainty, sub_samples = _get_activity_uncertainty(
+            subactivity,
+            values,
+            unit_samples,
+            source_index,
+            resource_index,
+            rng,
+            samples,
+            percentiles,
+        )
+        sub_activities.append(sub_uncertainty)
+        total += sub_samples
+
+    for resource in activity.resources:
+        index = resource_index[id(resource)]
+        resource_samples = unit_samples[:, source_index[index]]
+        if resource.uncertainty is not None:
+            total += resource_samples * (
+                values[index] * resource.uncertainty.sample(rng, samples)
+            )
+        else:
+            total += resource_samples * values[index]
+
+    means = total.mean(axis=1)
+    percentile_values = np.percentile(total, percentiles, axis=1)
+    statistics = {
+        category: ImpactStatistics(
+            str(category.value),
+            float(means[index]),
+            {
+                "{:g}".format(percentile): float(percentile_values[p_index, index])
+                for p_index, percentile in enumerate(percentiles)
+            },
+        )
+        for index, category in enumerate(ImpactCategory)
+    }
+    return ActivityUncertainty(activity.id, statistics, sub_activities), total
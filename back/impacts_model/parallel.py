@@ -0,0 +1,220 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Impacts computation on a process pool
+Impacts computation is CPU bound pint arithmetic, activity trees are sent to worker
+processes as compact plain data and their impacts are sent back as plain data
+A single large tree can be split in subtrees computed by different workers
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, List, Optional
+
+from impacts_model import content_cache
+from impacts_model.data_model import Activity, Resource
+from impacts_model.impacts import ActivityImpact
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_workers = 0
+
+
+def get_process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """
+    Return the process pool shared by the impacts computations
+    The pool is created on first use, and created again if the number of workers changes
+    :param max_workers: number of worker processes
+    """
+    global _process_pool, _process_pool_workers
+    if _process_pool is None or _process_pool_workers != max_workers:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False)
+        _process_pool = ProcessPoolExecutor(max_workers=max_workers)
+        _process_pool_workers = max_workers
+    return _process_pool
+
+
+def serialize_activity_tree(activity: Activity) -> dict[str, Any]:
+    """
+    Return an activity tree as compact plain data, with only what is needed to compute its impact
+    Resources quantities are kept in their serialized database form
+    """
+    return {
+        "id": activity.id,
+        "resources": [
+            content_cache.get_resource_content(resource)
+            for resource in activity.resources
+        ],
+        "subactivities": [
+            serialize_activity_tree(subactivity)
+            for subactivity in activity.subactivities
+        ],
+    }
+
+
+def deserialize_activity_tree(data: dict[str, Any]) -> Activity:
+    """
+    Create a transient activity tree, not bound to any session, from serialize_activity_tree() data
+    """
+    return Activity(
+        id=data["id"],
+        resources=[
+            Resource(**dict(zip(content_cache.RESOURCE_CONTENT_ATTRIBUTES, content)))
+            for content in data["resources"]
+        ],
+        subactivities=[
+            deserialize_activity_tree(subactivity)
+            for subactivity in data["subactivities"]
+        ],
+    )
+
+
+def _compute_activity_tree(data: dict[str, Any]) -> dict[str, Any]:
+    """Worker function, compute a serialized activity tree impact as plain data"""
+    return content_cache.get_activity_impact(deserialize_activity_tree(data)).to_dict()
+
+
+def compute_activities_impacts(
+    activities: List[Activity], max_workers: int, min_parallel: int = 2
+) -> List[ActivityImpact]:
+    """
+    Compute the complete impact of many activity trees concurrently on the process pool
+    Fallback to a serial computation when there is too few of them to pay for the transfers
+    :param activities: activity trees to compute
+    :param max_workers: number of worker processes, 1 or less to compute serially
+    :param min_parallel: minimum number of activities to use the process pool
+    :return: the ActivityImpact of each activity, in the same order
+    """
+    if max_workers <= 1 or len(activities) < min_parallel:
+        return [content_cache.get_activity_impact(activity) for activity in activities]
+
+    pool = get_process_pool(max_workers)
+    results = pool.map(
+        _compute_activity_tree,
+        [serialize_activity_tree(activity) for activity in activities],
+    )
+    return [ActivityImpact.from_dict(result) for result in results]
+
+
+def _compute_activity_trees(data: List[dict[str, Any]]) -> List[dict[str, Any]]:
+    """Worker function, compute many serialized activity trees impacts as plain data"""
+    return [_compute_activity_tree(tree) for tree in data]
+
+
+def count_resources(activity: Activity, counts: Optional[dict[int, int]] = None) -> int:
+    """
+    Return the number of resources of an activity subtree
+    :param counts: if set, filled with the count of each activity of the subtree, by object id
+    """
+    count = len(activity.resources) + sum(
+        count_resources(subactivity, counts) for subactivity in activity.subactivities
+    )
+    if counts is not None:
+        counts[id(activity)] = count
+    return count
+
+
+def split_activity_tree(
+    activity: Activity, threshold: int, counts: Optional[dict[int, int]] = None
+) -> List[Activity]:
+    """
+    Split an activity tree in subtrees of at most threshold resources
+    Activities above the subtrees, with too many resources, are left out of the result
+    :param activity: root of the tree to split
+    :param threshold: maximum number of resources of a subtree
+    :param counts: number of resources of each activity by object id, see count_resources()
+    :return: the subtrees root activities, from the biggest to the smallest
+    """
+    if counts is None:
+        counts = {}
+        count_resources(activity, counts)
+
+    subtrees: List[Activity] = []
+    to_split = [activity]
+    while to_split:
+        current = to_split.pop()
+        if counts[id(current)] <= threshold:
+            if counts[id(current)] > 0:
+                subtrees.append(current)
+        else:
+            to_split += current.subactivities
+
+    return sorted(subtrees, key=lambda subtree: counts[id(subtree)], reverse=True)
+
+
+def compute_sharded_impact(
+    activity: Activity, threshold: int, max_workers: int
+) -> ActivityImpact:
+    """
+    Compute the complete impact of a large activity tree by splitting it in subtrees computed
+    by the process pool workers, then merging their ActivityImpact up to the root
+    Results are identical to Activity.get_impact()
+    :param activity: root of the tree to compute
+    :param threshold: maximum number of resources of a subtree sent to a worker
+    :param max_workers: number of worker processes
+    :return: the activity complete ActivityImpact
+    """
+    counts: dict[int, int] = {}
+    count_resources(activity, counts)
+    subtrees = split_activity_tree(activity, threshold, counts)
+
+    # Balance the subtrees between the workers, biggest first to the least loaded worker
+    tasks: List[List[Activity]] = [[] for _ in range(min(max_workers, len(subtrees)))]
+    loads = [0] * len(tasks)
+    for subtree in subtrees:
+        worker = loads.index(min(loads))
+        tasks[worker].append(subtree)
+        loads[worker] += counts[id(subtree)]
+
+    pool = get_process_pool(max_workers)
+    results = pool.map(
+        _compute_activity_trees,
+        [[serialize_activity_tree(subtree) for subtree in task] for task in tasks],
+    )
+
+    impacts: dict[int, ActivityImpact] = {}
+    for task, task_results in zip(tasks, results):
+        for subtree, result in zip(task, task_results):
+            impacts[id(subtree)] = ActivityImpact.from_dict(result)
+
+    return _merge_impacts(activity, impacts)
+
+
+def _merge_impacts(
+    activity: Activity, impacts: dict[int, ActivityImpact]
+) -> ActivityImpact:
+    """
+    Return the activity impact, from the subtrees impacts already computed by object id
+    """
+    if id(activity) in impacts:
+        return impacts[id(activity)]
+    return activity.aggregate_impact(
+        [_merge_impacts(subactivity, impacts) for subactivity in activity.subactivities]
+    )
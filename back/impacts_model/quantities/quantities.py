@@ -62,6 +62,25 @@ def deserialize_quantity(
     return ureg(input)
 
 
+def serialize_quantity_compact(input: Optional[Quantity[Any]]) -> Optional[list[Any]]:
+    """
+    Serialize a pint quantity to a compact [magnitude, unit] list
+    Cheaper to deserialize than a string as pint caches the units parsing
+    """
+    if input is None:
+        return None
+    return [input.magnitude, str(input.units)]
+
+
+def deserialize_quantity_compact(
+    input: Optional[list[Any]],
+) -> Optional[Quantity[Any]]:
+    """Deserialize a pint quantity from a compact [magnitude, unit] list"""
+    if input is None:
+        return None
+    return Q_(input[0], input[1])
+
+
 def deserialize_unit(input: Union[str, Unit]) -> Unit:
     if input is None:
         return None
@@ -0,0 +1,175 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""
+Sensitivity of a model impacts to its inputs
+The model total is linear in each resource value and in each catalog impact factor, so
+partial derivatives and elasticities of all the inputs are read from the compiled model
+in one pass, without perturbing the model
+"""
+
+from __future__ import annotations
+
+from typing import List, Optional
+
+import numpy as np
+from marshmallow import Schema, fields
+from marshmallow_sqlalchemy.fields import Nested
+
+from impacts_model.impacts import ImpactCategory
+from impacts_model.linear import CompiledModel, EnvironmentalImpactTotal, to_quantities
+
+
+class InputSensitivity:
+    """
+    Sensitivity of the model total to one input, a resource value or an impact source factor
+    partial is in category unit by unit for a resource, and in unit for a factor, the factor
+    being in category unit by unit
+    elasticity is the relative change of the total for a relative change of the input
+    """
+
+    def __init__(
+        self,
+        impact_source_id: str,
+        unit: str,
+        partial: dict[ImpactCategory, Optional[float]],
+        elasticity: dict[ImpactCategory, float],
+        resource_id: Optional[int] = None,
+        name: Optional[str] = None,
+    ) -> None:
+        self.impact_source_id = impact_source_id
+        self.unit = unit
+        self.partial = partial
+        self.elasticity = elasticity
+        self.resource_id = resource_id
+        self.name = name
+
+
+class InputSensitivitySchema(Schema):
+    resource_id = fields.Int()
+    name = fields.Str()
+    impact_source_id = fields.Str()
+    unit = fields.Str()
+    partial = fields.Dict(keys=fields.Str(), values=fields.Float(allow_none=True))
+    elasticity = fields.Dict(keys=fields.Str(), values=fields.Float())
+
+
+class ModelSensitivity:
+    """
+    Sensitivity of a model total to each of its resources and impact source factors
+    """
+
+    def __init__(
+        self,
+        total: EnvironmentalImpactTotal,
+        resources: List[InputSensitivity],
+        factors: List[InputSensitivity],
+    ) -> None:
+        self.total = total
+        self.resources = resources
+        self.factors = factors
+
+
+class ModelSensitivitySchema(Schema):
+    total = fields.Dict(keys=fields.Str(), values=Nested("QuantitySchema"))
+    resources = fields.Nested("InputSensitivitySchema", many=True)
+    factors = fields.Nested(
+        "InputSensitivitySchema", many=True, exclude=("resource_id", "name")
+    )
+
+
+def get_sensitivity(compiled: CompiledModel) -> ModelSensitivity:
+    """
+    Compute the partial derivatives and elasticities of the total of a compiled model
+    For a resource, the partial derivative is the impact of one unit of it
+    For an impact factor, it is the quantity of its impact source consumed by the model,
+    directly or by other impact sources, which is only known for the factors that are not 0
+    :param compiled: the CompiledModel
+    :return: the ModelSensitivity of the model root activity
+    """
+    total = compiled.values @ compiled.factors
+
+    # Resources values
+    resource_partials = compiled.factors
+    resource_elasticities = _divide(
+        compiled.values[:, np.newaxis] * compiled.factors, total
+    )
+
+    # Impact factors, from the impact of each factor summed over all the resources
+    source_values = np.bincount(
+        compiled.source_index,
+        weights=compiled.values,
+        minlength=len(compiled.impact_sources),
+    )
+    factor_impacts = np.einsum("s,sfc->fc", source_values, compiled.unit_factors)
+    own_factors = compiled.get_own_factors()
+    factor_partials = np.divide(
+        factor_impacts,
+        own_factors,
+        out=np.full(factor_impacts.shape, np.nan),
+        where=own_factors != 0,
+    )
+    factor_elasticities = _divide(factor_impacts, total)
+
+    resources = [
+        InputSensitivity(
+            resource.impact_source_id,
+            str(compiled.impact_sources[resource.impact_source_id].unit),
+            _by_category(resource_partials[index]),
+            _by_category(resource_elasticities[index]),
+            resource_id=resource.id,
+            name=resource.name,
+        )
+        for index, resource in enumerate(compiled.resources)
+    ]
+    factors = [
+        InputSensitivity(
+            impact_source.id,
+            str(impact_source.unit),
+            _by_category(factor_partials[index]),
+            _by_category(factor_elasticities[index]),
+        )
+        for index, impact_source in enumerate(compiled.factor_sources)
+    ]
+    return ModelSensitivity(to_quantities(total), resources, factors)
+
+
+def _divide(impacts: np.ndarray, total: np.ndarray) -> np.ndarray:
+    """Return impacts relative to the total by category, 0 for categories without impact"""
+    return np.divide(
+        impacts, total, out=np.zeros(impacts.shape), where=total[np.newaxis, :] != 0
+    )
+
+
+def _by_category(values: np.ndarray) -> dict[ImpactCategory, Optional[float]]:
+    """Return values by category, None for unknown ones"""
+    return {
+        category: None if np.isnan(values[index]) else float(values[index])
+        for index, category in enumerate(ImpactCategory)
+    }
@@ -0,0 +1,218 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""
+Reduction targets solver
+Finds the smallest changes of the resources values, within bounds given by resource, that
+bring a model impacts under targets by category. The model total being linear in the
+resources values, it is a linear program over the compiled model
+"""
+
+from __future__ import annotations
+
+from typing import Any, List, Optional
+
+import numpy as np
+from marshmallow import Schema, ValidationError, fields, validates_schema
+from marshmallow_sqlalchemy.fields import Nested
+from scipy.optimize import linprog
+
+from impacts_model.impacts import ImpactCategory
+from impacts_model.linear import (
+    CompiledModel,
+    EnvironmentalImpactTotal,
+    SelectorSchema,
+    to_quantities,
+)
+from impacts_model.quantities.quantities import deserialize_quantity
+
+
+class ChangeBoundsSchema(SelectorSchema):
+    """
+    Relative change allowed for the selected resources, ex min -0.5 and max 0 to remove up to half
+    """
+
+    min = fields.Float(required=True)
+    max = fields.Float(required=True)
+
+    @validates_schema
+    def validate_bounds(self, data, **kwargs):
+        if data["min"] > data["max"]:
+            raise ValidationError("min must be lower than max")
+        if data["min"] < -1:
+            raise ValidationError("min must be at least -1, values cannot be negative")
+
+
+class ReductionTargetsSchema(Schema):
+    targets = fields.Dict(
+        keys=fields.Str(), values=Nested("QuantitySchema"), required=True
+    )
+    bounds = fields.List(fields.Nested(ChangeBoundsSchema), required=True)
+
+    @validates_schema
+    def validate_targets(self, data, **kwargs):
+        """Targets are by ImpactCategory name, ex climate_change, in the category unit dimension"""
+        for category, target in data["targets"].items():
+            if category.upper() not in ImpactCategory.__members__:
+                raise ValidationError("Unknown impact category " + category)
+            if not deserialize_quantity(target).check(
+                ImpactCategory[category.upper()].value
+            ):
+                raise ValidationError("Wrong unit for " + category + " target")
+
+
+class ResourceChange:
+    """
+    Relative change of a resource value, ex -0.2 to remove 20%
+    """
+
+    def __init__(
+        self, resource_id: int, name: str, impact_source_id: str, change: float
+    ) -> None:
+        self.resource_id = resource_id
+        self.name = name
+        self.impact_source_id = impact_source_id
+        self.change = change
+
+
+class ResourceChangeSchema(Schema):
+    resource_id = fields.Int()
+    name = fields.Str()
+    impact_source_id = fields.Str()
+    change = fields.Float()
+
+
+class Reduction:
+    """
+    Result of the solver, the reduced total and the changes are only set if the targets can be met
+    """
+
+    def __init__(
+        self,
+        feasible: bool,
+        total: EnvironmentalImpactTotal,
+        reduced_total: Optional[EnvironmentalImpactTotal] = None,
+        changes: Optional[List[ResourceChange]] = None,
+    ) -> None:
+        self.feasible = feasible
+        self.total = total
+        self.reduced_total = reduced_total
+        self.changes = changes if changes is not None else []
+
+
+class ReductionSchema(Schema):
+    feasible = fields.Bool()
+    total = fields.Dict(keys=fields.Str(), values=Nested("QuantitySchema"))
+    reduced_total = fields.Dict(keys=fields.Str(), values=Nested("QuantitySchema"))
+    changes = fields.Nested("ResourceChangeSchema", many=True)
+
+
+def solve_reduction(
+    compiled: CompiledModel,
+    targets: dict[str, str],
+    bounds: List[dict[str, Any]],
+) -> Reduction:
+    """
+    Find the changes of the resources values meeting the targets with the smallest total change
+    The sum of the absolute relative changes is minimized, resources without bounds are not changed
+    :param compiled: the CompiledModel
+    :param targets: maximum impact by category name, loaded by ReductionTargetsSchema
+    :param bounds: relative changes allowed, loaded by ReductionTargetsSchema, a resource selected
+    by many rules gets the last one
+    :return: the Reduction, not feasible if the targets cannot be met within the bounds
+    :raise ValueError: if a rule selects something not in the model
+    """
+    impacts = compiled.values[:, np.newaxis] * compiled.factors
+    total = impacts.sum(axis=0)
+
+    # Bounds of the changes, fixed resources by default
+    lower = np.zeros(len(compiled.resources))
+    upper = np.zeros(len(compiled.resources))
+    for rule in bounds:
+        rows = compiled.select(rule)
+        lower[rows] = rule["min"]
+        upper[rows] = rule["max"]
+    variables = np.flatnonzero((lower != 0) | (upper != 0))
+
+    # Maximum change of the total of each targeted category
+    categories = list(ImpactCategory)
+    target_rows = [categories.index(ImpactCategory[name.upper()]) for name in targets]
+    target_changes = np.array(
+        [
+            deserialize_quantity(target)
+            .to(ImpactCategory[name.upper()].value)
+            .magnitude
+            - total[categories.index(ImpactCategory[name.upper()])]
+            for name, target in targets.items()
+        ]
+    )
+
+    if len(variables) == 0 or len(target_rows) == 0:
+        # Nothing to solve, the targets are met without changes or cannot be
+        if np.all(target_changes >= 0):
+            return Reduction(True, to_quantities(total), to_quantities(total))
+        return Reduction(False, to_quantities(total))
+
+    # Each change is split in increase - decrease, both positive, to minimize their sum
+    # Impacts of the changes on the targeted totals, shape (targets, 2 * variables)
+    changes_impacts = impacts[variables][:, target_rows].T
+    result = linprog(
+        c=np.ones(2 * len(variables)),
+        A_ub=np.hstack([changes_impacts, -changes_impacts]),
+        b_ub=target_changes,
+        bounds=list(
+            zip(
+                np.concatenate(
+                    [np.maximum(lower[variables], 0), np.maximum(-upper[variables], 0)]
+                ),
+                np.concatenate(
+                    [np.maximum(upper[variables], 0), np.maximum(-lower[variables], 0)]
+                ),
+            )
+        ),
+        method="highs",
+    )
+    if result.status != 0:
+        return Reduction(False, to_quantities(total))
+
+    change = np.zeros(len(compiled.resources))
+    change[variables] = result.x[: len(variables)] - result.x[len(variables) :]
+    reduced_total = total + change @ impacts
+    return Reduction(
+        True,
+        to_quantities(total),
+        to_quantities(reduced_total),
+        [
+            ResourceChange(
+                resource.id, resource.name, resource.impact_source_id, change[index]
+            )
+            for index, resource in enumerate(compiled.resources)
+            if change[index] != 0
+        ],
+    )
@@ -0,0 +1,130 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Streaming serialization of ActivityImpact trees
+The tree is evaluated depth first and written as JSON chunks as soon as each part is known,
+the sub activities of an activity before its total and impact sources, so only the
+impact sources of the activities being evaluated are kept in memory
+"""
+
+import json
+from typing import Generator, Iterable, Iterator, List, Optional
+
+from impacts_model.data_model import Activity
+from impacts_model.display_units import DisplayUnits
+from impacts_model.impact_cache import is_cached
+from impacts_model.impacts import ActivityImpact, ActivityImpactSchema, ImpactCategory
+
+
+def stream_activity_impact(
+    activity: Activity,
+    interval: bool = False,
+    depth: Optional[int] = None,
+    categories: Optional[Iterable[ImpactCategory]] = None,
+    sub_impacts: bool = True,
+    display_units: Optional[DisplayUnits] = None,
+) -> Iterator[str]:
+    """
+    Compute an activity complete impact and return it as JSON chunks, the same document as
+    ActivityImpactSchema would dump. Valid cache entries are read, missing ones are not saved
+    Parameters are the ones of Activity.get_impact()
+    :param activity: the activity to get the impact
+    :param display_units: if set, impacts are written in these units
+    :return: a generator of JSON strings
+    """
+    categories = list(categories) if categories is not None else None
+    use_cache = not interval and categories is None and sub_impacts
+    yield from _stream_activity_impact(
+        activity, interval, depth, categories, sub_impacts, use_cache, display_units
+    )
+
+
+def _stream_activity_impact(
+    activity: Activity,
+    interval: bool,
+    depth: Optional[int],
+    categories: Optional[List[ImpactCategory]],
+    sub_impacts: bool,
+    use_cache: bool,
+    display_units: Optional[DisplayUnits],
+) -> Generator[str, None, ActivityImpact]:
+    """
+    Write an activity impact, and return it without its sub activities for its parent
+    """
+    if depth is not None and depth <= 0:
+        if use_cache and is_cached(activity):
+            impact = activity.impact_cache.get_impact([])
+        else:
+            impact = activity.get_impact(interval, 0, categories, sub_impacts)
+        schema = ActivityImpactSchema(context={"display_units": display_units})
+        yield json.dumps(schema.dump(impact))
+        return impact
+
+    activity_id = str(activity.id) if activity.id is not None else None
+    yield '{"activity_id": ' + json.dumps(activity_id) + ', "sub_activities": ['
+
+    subactivities: List[ActivityImpact] = []
+    for index, subactivity in enumerate(activity.subactivities):
+        if index > 0:
+            yield ", "
+        subactivities.append(
+            (
+                yield from _stream_activity_impact(
+                    subactivity,
+                    interval,
+                    depth - 1 if depth is not None else None,
+                    categories,
+                    sub_impacts,
+                    use_cache,
+                    display_units,
+                )
+            )
+        )
+
+    if use_cache and is_cached(activity):
+        impact = activity.impact_cache.get_impact([])
+    else:
+        impact = activity.aggregate_impact(
+            subactivities, interval, categories, sub_impacts
+        )
+        impact.sub_activities = []
+
+    data = ActivityImpactSchema(
+        only=("total", "impact_sources"), context={"display_units": display_units}
+    ).dump(impact)
+    yield (
+        '], "total": '
+        + json.dumps(data["total"])
+        + ', "impact_sources": '
+        + json.dumps(data["impact_sources"])
+        + "}"
+    )
+    return impact
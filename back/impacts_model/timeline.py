@@ -0,0 +1,182 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""
+Distribution of the impacts over time
+Each resource impact is spread from the start of the model over its period: evenly if
+continuous, or by occurrence if it has a frequency. Resources without period are
+accounted at the start. All the resources are distributed at once as NumPy arrays, then
+summed up the activity tree
+"""
+
+from __future__ import annotations
+
+from typing import List
+
+import numpy as np
+from marshmallow import Schema, fields
+
+from impacts_model.data_model import Activity
+from impacts_model.impacts import ImpactCategory
+from impacts_model.linear import compile_activity
+
+# Length of the timeline buckets, in months
+GRANULARITIES = {"month": 1, "quarter": 3, "year": 12}
+
+
+class ImpactTimeline:
+    """
+    Impact of a category in each bucket of the timeline, in the category unit
+    """
+
+    def __init__(self, unit: str, values: List[float]) -> None:
+        self.unit = unit
+        self.values = values
+
+
+class ImpactTimelineSchema(Schema):
+    unit = fields.Str()
+    values = fields.List(fields.Float())
+
+
+class ActivityTimeline:
+    """
+    Impacts over time of an activity, and of its sub activities
+    """
+
+    def __init__(
+        self,
+        activity_id: int,
+        timeline: dict[ImpactCategory, ImpactTimeline],
+        sub_activities: List[ActivityTimeline],
+    ) -> None:
+        self.activity_id = activity_id
+        self.timeline = timeline
+        self.sub_activities = sub_activities
+
+
+class ActivityTimelineSchema(Schema):
+    activity_id = fields.Str()
+    timeline = fields.Dict(
+        keys=fields.Str(), values=fields.Nested("ImpactTimelineSchema")
+    )
+    sub_activities = fields.Nested("ActivityTimelineSchema", many=True)
+
+
+def get_activity_timeline(activity: Activity, granularity: str) -> ActivityTimeline:
+    """
+    Distribute the impacts of an activity tree over time
+    :param activity: root Activity of the tree
+    :param granularity: length of the buckets, one of GRANULARITIES
+    :return: the ActivityTimeline of the root activity and its sub activities, with as many
+    buckets as needed to cover the longest resource period
+    """
+    months = GRANULARITIES[granularity]
+
+    compiled = compile_activity(activity)
+    impacts = compiled.values[:, np.newaxis] * compiled.factors
+
+    # Resources time parameters, in months, 0 if not set
+    periods = np.zeros(len(compiled.resources))
+    frequencies = np.zeros(len(compiled.resources))
+    for index, resource in enumerate(compiled.resources):
+        if resource.period is not None:
+            periods[index] = resource.period.to("month").magnitude
+        if resource.frequency is not None:
+            frequencies[index] = resource.frequency.to("month").magnitude
+
+    buckets = max(1, int(np.ceil(periods.max(initial=0) / months)))
+    edges = np.arange(buckets + 1) * months
+
+    distribution = distribute(periods, frequencies, edges)
+
+    # Row of each resource in the arrays, to sum them by activity
+    resource_index = {
+        id(resource): index for index, resource in enumerate(compiled.resources)
+    }
+    return _get_activity_timeline(activity, impacts, distribution, resource_index)[0]
+
+
+def distribute(
+    periods: np.ndarray, frequencies: np.ndarray, edges: np.ndarray
+) -> np.ndarray:
+    """
+    Return the share of each resource impact in each bucket of the timeline
+    :param periods: period of each resource, 0 if not set
+    :param frequencies: time between two occurrences of each resource, 0 if continuous
+    :param edges: limits of the buckets, from the start of the timeline
+    :return: array of shape (resources, buckets), each row sums to 1
+    """
+    periods = periods[:, np.newaxis]
+    frequencies = frequencies[:, np.newaxis]
+    starts, ends = edges[np.newaxis, :-1], edges[np.newaxis, 1:]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Continuous resources, evenly spread over their period
+        continuous = np.clip(np.minimum(ends, periods) - starts, 0, None) / periods
+
+        # Periodic resources, by number of occurrences starting in each bucket
+        occurrences = np.ceil(periods / frequencies)
+        started = np.minimum(np.ceil(edges[np.newaxis, :] / frequencies), occurrences)
+        periodic = np.diff(started, axis=1) / occurrences
+
+    # Resources without period at the start of the timeline
+    single = np.zeros(continuous.shape)
+    single[:, 0] = 1
+
+    return np.where(
+        periods == 0, single, np.where(frequencies == 0, continuous, periodic)
+    )
+
+
+def _get_activity_timeline(
+    activity: Activity,
+    impacts: np.ndarray,
+    distribution: np.ndarray,
+    resource_index: dict[int, int],
+) -> tuple[ActivityTimeline, np.ndarray]:
+    """
+    Return the ActivityTimeline of an activity and its impacts of shape (buckets, categories)
+    """
+    rows = [resource_index[id(resource)] for resource in activity.resources]
+    total = distribution[rows].T @ impacts[rows]
+
+    sub_activities = []
+    for subactivity in activity.subactivities:
+        sub_timeline, sub_total = _get_activity_timeline(
+            subactivity, impacts, distribution, resource_index
+        )
+        sub_activities.append(sub_timeline)
+        total += sub_total
+
+    timeline = {
+        category: ImpactTimeline(str(category.value), total[:, index].tolist())
+        for index, category in enumerate(ImpactCategory)
+    }
+    return ActivityTimeline(activity.id, timeline, sub_activities), total
@@ -0,0 +1,164 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""
+Uncertainty of the impact factors and of the resources amounts
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Optional
+
+import numpy as np
+from marshmallow import (
+    Schema,
+    ValidationError,
+    fields,
+    post_load,
+    pre_dump,
+    validates_schema,
+)
+
+DISTRIBUTIONS = ["normal", "lognormal", "uniform", "triangular"]
+
+# Bounds of normal and lognormal distributions, as a 95% confidence interval
+INTERVAL_Z = 1.96
+
+# Interval of an exact value, as factors [min, nominal, max] of the nominal value
+EXACT_INTERVAL = np.ones(3)
+
+
+class Uncertainty:
+    """
+    Uncertainty of an impact factor or of a resource amount, as a distribution of the
+    factor applied to its nominal value:
+        - normal: relative standard deviation sd, ex: 0.1 for 10%
+        - lognormal: geometric standard deviation gsd, the nominal value is the median
+        - uniform: between min and max times the nominal value
+        - triangular: between min and max times the nominal value, with the nominal value as mode
+    Uniform distributions are used as plain min and max bounds of the value
+    """
+
+    def __init__(
+        self,
+        distribution: str,
+        sd: Optional[float] = None,
+        gsd: Optional[float] = None,
+        min: Optional[float] = None,
+        max: Optional[float] = None,
+    ) -> None:
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError("Unknown distribution: " + str(distribution))
+        if distribution == "normal" and (sd is None or sd < 0):
+            raise ValueError("Normal distribution requires a positive sd")
+        if distribution == "lognormal" and (gsd is None or gsd < 1):
+            raise ValueError("Lognormal distribution requires a gsd of at least 1")
+        if distribution in ["uniform", "triangular"] and (
+            min is None or max is None or not min <= 1 <= max
+        ):
+            raise ValueError(
+                distribution.capitalize() + " distribution requires min <= 1 <= max"
+            )
+
+        self.distribution = distribution
+        self.sd = sd
+        self.gsd = gsd
+        self.min = min
+        self.max = max
+
+    def sample(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        """
+        Draw samples of the factor applied to the nominal value
+        :param rng: NumPy random generator
+        :param size: number of samples
+        :return: array of size samples
+        """
+        if self.distribution == "normal":
+            return rng.normal(1, self.sd, size)
+        if self.distribution == "lognormal":
+            return rng.lognormal(0, np.log(self.gsd), size)
+        if self.distribution == "uniform":
+            return rng.uniform(self.min, self.max, size)
+        return rng.triangular(self.min, 1, self.max, size)
+
+    def interval(self) -> np.ndarray:
+        """
+        Return the bounds of the factor applied to the nominal value, as [min, 1, max]
+        Normal and lognormal distributions are bounded by their 95% confidence interval
+        """
+        if self.distribution == "normal":
+            return np.array(
+                [max(0, 1 - INTERVAL_Z * self.sd), 1, 1 + INTERVAL_Z * self.sd]
+            )
+        if self.distribution == "lognormal":
+            return np.array([self.gsd**-INTERVAL_Z, 1, self.gsd**INTERVAL_Z])
+        return np.array([self.min, 1, self.max])
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return this Uncertainty as plain data, without unset parameters"""
+        return {
+            key: value
+            for key, value in vars(self).items()
+            if value is not None and key != "distribution"
+        } | {"distribution": self.distribution}
+
+    @staticmethod
+    def from_dict(data: dict[str, Any]) -> Uncertainty:
+        """Load an Uncertainty from plain data, see to_dict()"""
+        return Uncertainty(**data)
+
+
+class UncertaintySchema(Schema):
+    distribution = fields.Str(required=True)
+    sd = fields.Float(allow_none=True)
+    gsd = fields.Float(allow_none=True)
+    min = fields.Float(allow_none=True)
+    max = fields.Float(allow_none=True)
+
+    @post_load
+    def post_load(self, data, **kwargs):
+        """Uncertainties are saved as json strings in the database"""
+        return json.dumps(Uncertainty.from_dict(data).to_dict())
+
+    @pre_dump
+    def preprocess(self, data, **kwargs):
+        """Translate json strings and Uncertainty objects to dict before serialization"""
+        if isinstance(data, Uncertainty):
+            return data.to_dict()
+        if isinstance(data, str):
+            return json.loads(data)
+        return data
+
+    @validates_schema
+    def validate_uncertainty(self, data, **kwargs):
+        try:
+            Uncertainty.from_dict(data)
+        except (TypeError, ValueError) as err:
+            raise ValidationError(str(err))
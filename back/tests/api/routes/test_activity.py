@@ -35,7 +35,17 @@ import pytest
 from flask.testing import FlaskClient
 from flask_sqlalchemy import SQLAlchemy
 
-from impacts_model.data_model import Model, Project, Activity, ActivitySchema
+from impacts_model.data_model import (
+    Model,
+    Project,
+    Activity,
+    ActivityImpactCache,
+    ActivitySchema,
+    Resource,
+)
+from impacts_model.impact_sources import ImpactSource
+from impacts_model.impacts import ImpactCategory, ImpactValue
+from impacts_model.quantities.quantities import KG_CO2E, SERVER
 
 activities_root_path = "/api/v1/activities"
 
@@ -175,3 +185,122 @@ def test_get_activity_impacts(
         activities_root_path + "/" + str(activity_fixture.id) + "/impacts"
     )
     assert response.status_code == 200
+
+
+@mock.patch(
+    "impacts_model.data_model.impact_source_factory",
+    MagicMock(
+        return_value=ImpactSource(
+            id="testImpactSource",
+            name="test",
+            unit=SERVER,
+            uses=[{"quantity": "10 kWh", "resource_id": "electricity"}],
+            environmental_impact={
+                ImpactCategory.CLIMATE_CHANGE: ImpactValue(use=1000 * KG_CO2E)
+            },
+        ),
+    ),
+)
+def test_get_activity_impact_source(
+    client: FlaskClient, db: SQLAlchemy, activity_fixture: Activity
+) -> None:
+    """
+    Test that sub impacts are only collapsed in GET /activities/<id>/impacts?sub_impacts=false
+    and expanded by GET /activities/<id>/impacts/<impact_source_id>
+    :param client: flask client fixture
+    :param db: SQLAlchemy database fixture
+    :param activity_fixture: Activity fixture
+    """
+    subactivity = Activity(name="Subactivity")
+    subactivity.resources = [
+        Resource(
+            name="Resource", impact_source_id="testImpactSource", amount=2 * SERVER
+        )
+    ]
+    activity_fixture.resources = [
+        Resource(
+            name="Resource", impact_source_id="testImpactSource", amount=1 * SERVER
+        )
+    ]
+    activity_fixture.subactivities = [subactivity]
+    db.session.commit()
+    path = activities_root_path + "/" + str(activity_fixture.id) + "/impacts"
+    impact = client.get(path).json
+
+    response = client.get(path + "?sub_impacts=false")
+    assert response.status_code == 200
+    collapsed = response.json["impact_sources"]["testImpactSource"]
+    assert collapsed["sub_impacts"] == {}
+    assert collapsed["total_impact"]["Climate change"]["use"]["value"] == pytest.approx(
+        impact["impact_sources"]["testImpactSource"]["total_impact"]["Climate change"][
+            "use"
+        ]["value"]
+    )
+
+    response = client.get(path + "/testImpactSource")
+    assert response.status_code == 200
+    assert response.json == impact["impact_sources"]["testImpactSource"]
+
+    # Test impact source not used 404
+    response = client.get(path + "/electricity")
+    assert response.status_code == 404
+
+
+@mock.patch(
+    "impacts_model.data_model.impact_source_factory",
+    MagicMock(
+        return_value=ImpactSource(
+            id="testImpactSource",
+            name="test",
+            unit=SERVER,
+            environmental_impact={
+                ImpactCategory.CLIMATE_CHANGE: ImpactValue(use=1000 * KG_CO2E)
+            },
+        ),
+    ),
+)
+def test_patch_activity_parent_invalidates_impacts(
+    client: FlaskClient, db: SQLAlchemy, activity_fixture: Activity
+) -> None:
+    """
+    Test that moving an activity under one of its subactivities with PATCH /activities/<id>
+    invalidates the cached impacts of all the exchanged activities
+    For a tree 1 -> 2 -> 3 and activity 2 goes under 3, 3 parent will be set as 1
+    :param client: flask client fixture
+    :param db: SQLAlchemy database fixture
+    :param activity_fixture: Activity fixture
+    """
+    activity_2 = Activity(name="Activity 2")
+    activity_3 = Activity(name="Activity 3")
+    activity_3.resources = [
+        Resource(
+            name="Resource 3", impact_source_id="testImpactSource", amount=1 * SERVER
+        )
+    ]
+    activity_2.subactivities = [activity_3]
+    activity_fixture.subactivities = [activity_2]
+    db.session.commit()
+    ids = [activity_fixture.id, activity_2.id, activity_3.id]
+
+    # Cache the impacts of the whole tree
+    response = client.get(activities_root_path + "/" + str(ids[0]) + "/impacts")
+    assert response.status_code == 200
+    assert len(ActivityImpactCache.query.all()) == 3
+
+    response = client.patch(
+        activities_root_path + "/" + str(ids[1]),
+        json=[{"op": "replace", "path": "/parent_activity_id", "value": str(ids[2])}],
+    )
+    assert response.status_code == 200
+    assert ActivityImpactCache.query.all() == []
+
+    # Impacts are the same as a computation from scratch
+    response = client.get(activities_root_path + "/" + str(ids[0]) + "/impacts")
+    assert response.status_code == 200
+    assert (
+        response.json["total"]["Climate change"]["use"]["value"]
+        == db.session.get(Activity, ids[0])
+        .get_impact()
+        .total[ImpactCategory.CLIMATE_CHANGE]
+        .use.magnitude
+    )
@@ -0,0 +1,109 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from unittest import mock
+from unittest.mock import MagicMock
+
+from flask.testing import FlaskClient
+from flask_sqlalchemy import SQLAlchemy
+
+from impacts_model.data_model import Activity, Project, Resource
+from impacts_model.impact_sources import ImpactSource
+from impacts_model.impacts import ImpactCategory, ImpactValue
+from impacts_model.quantities.quantities import KG_CO2E, SERVER
+
+compute_root = "/api/v1/compute"
+
+
+def _resource(name: str, servers: int) -> dict:
+    return {
+        "name": name,
+        "impact_source_id": "testImpactSource",
+        "amount": {"value": servers, "unit": "server"},
+    }
+
+
+@mock.patch(
+    "impacts_model.data_model.impact_source_factory",
+    MagicMock(
+        return_value=ImpactSource(
+            id="testImpactSource",
+            name="test",
+            unit=SERVER,
+            environmental_impact={
+                ImpactCategory.CLIMATE_CHANGE: ImpactValue(use=1000 * KG_CO2E)
+            },
+        ),
+    ),
+)
+def test_compute_project_impacts(client: FlaskClient, db: SQLAlchemy) -> None:
+    """
+    Test response of POST /compute, and that nothing is saved
+    :param client: flask client fixture
+    :param db: SQLAlchemy database fixture
+    """
+    project = {
+        "name": "Draft project",
+        "models": [
+            {
+                "name": "Draft model",
+                "project_id": None,
+                "root_activity": {
+                    "name": "Root",
+                    "resources": [_resource("Servers", 2)],
+                    "subactivities": [
+                        {
+                            "name": "Sub",
+                            "resources": [_resource("More servers", 3)],
+                            "subactivities": [],
+                        }
+                    ],
+                },
+            }
+        ],
+    }
+
+    response = client.post(compute_root, json=project)
+    assert response.status_code == 200
+    assert response.json[0]["model_name"] == "Draft model"
+    impact = response.json[0]["impact"]
+    assert impact["total"]["Climate change"]["use"]["value"] == 5000
+    assert (
+        impact["sub_activities"][0]["total"]["Climate change"]["use"]["value"] == 3000
+    )
+
+    assert Project.query.all() == []
+    assert Activity.query.all() == []
+    assert Resource.query.all() == []
+
+    # Test invalid resource 400
+    project["models"][0]["root_activity"]["resources"][0]["amount"]["unit"] = "kWh"
+    response = client.post(compute_root, json=project)
+    assert response.status_code == 400
@@ -0,0 +1,165 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from unittest import mock
+from unittest.mock import MagicMock
+
+import pytest
+from flask.testing import FlaskClient
+from flask_sqlalchemy import SQLAlchemy
+
+from impacts_model.data_model import Activity, Model, Project, Resource
+from impacts_model.impact_sources import ImpactSource
+from impacts_model.impacts import ImpactCategory, ImpactValue
+from impacts_model.quantities.quantities import KG_CO2E, SERVER
+from tests.api.routes.test_activity import activities_root_path
+from tests.api.routes.test_model import models_root
+
+impacts_root = "/api/v1/impacts"
+
+impact_source_mock = MagicMock(
+    return_value=ImpactSource(
+        id="testid",
+        name="test",
+        unit=SERVER,
+        environmental_impact={
+            ImpactCategory.CLIMATE_CHANGE: ImpactValue(use=1000 * KG_CO2E)
+        },
+    ),
+)
+
+
+@pytest.fixture(scope="function")
+def project_fixture(db: SQLAlchemy) -> Project:
+    """Project fixture with two models of two levels of activities"""
+    project = Project(name="Project test_impacts")
+    for i in range(1, 3):
+        subactivity = Activity(
+            name="Subactivity",
+            resources=[
+                Resource(name="Resource", impact_source_id="testid", amount=i * SERVER)
+            ],
+        )
+        root_activity = Activity(
+            name="Model " + str(i),
+            subactivities=[subactivity],
+            resources=[
+                Resource(name="Resource", impact_source_id="testid", amount=1 * SERVER)
+            ],
+        )
+        project.models.append(
+            Model(name="Model " + str(i), root_activity=root_activity)
+        )
+    db.session.add(project)
+    db.session.commit()
+    return project
+
+
+@mock.patch("impacts_model.data_model.impact_source_factory", impact_source_mock)
+def test_get_impacts_batch(client: FlaskClient, project_fixture: Project) -> None:
+    """
+    Test response of POST /impacts/batch
+    :param client: flask client fixture
+    :param project_fixture: Project fixture
+    """
+    models = project_fixture.models
+    subactivity = models[1].root_activity.subactivities[0]
+    batch = {
+        "model_ids": [model.id for model in models],
+        "activity_ids": [subactivity.id],
+    }
+
+    response = client.post(impacts_root + "/batch", json=batch)
+    assert response.status_code == 200
+    assert response.json["models"].keys() == {str(model.id) for model in models}
+    assert response.json["activities"].keys() == {str(subactivity.id)}
+
+    # Totals only, same as the impact of each
+    for model in models:
+        impact = response.json["models"][str(model.id)]
+        assert "sub_activities" not in impact
+        assert (
+            impact["total"]
+            == client.get(models_root + "/" + str(model.id) + "/impact").json["total"]
+        )
+    assert (
+        response.json["activities"][str(subactivity.id)]["total"]["Climate change"][
+            "use"
+        ]["value"]
+        == 2000
+    )
+
+    # Full impacts
+    response = client.post(impacts_root + "/batch", json={**batch, "full": True})
+    assert response.status_code == 200
+    assert response.json["activities"][str(subactivity.id)] == (
+        client.get(activities_root_path + "/" + str(subactivity.id) + "/impacts").json
+    )
+    assert len(response.json["models"][str(models[0].id)]["sub_activities"]) == 1
+
+    # Test 404
+    response = client.post(impacts_root + "/batch", json={"model_ids": [-1]})
+    assert response.status_code == 404
+    response = client.post(impacts_root + "/batch", json={"activity_ids": [-1]})
+    assert response.status_code == 404
+
+
+@mock.patch("impacts_model.fleet.impact_source_factory", impact_source_mock)
+def test_get_impact_sources_totals(
+    client: FlaskClient, project_fixture: Project
+) -> None:
+    """
+    Test response of GET /impacts/sources
+    :param client: flask client fixture
+    :param project_fixture: Project fixture
+    """
+    response = client.get(
+        impacts_root + "/sources?project_ids=" + str(project_fixture.id)
+    )
+    assert response.status_code == 200
+    assert response.json["projects"] == 1
+    assert response.json["models"] == 2
+    assert response.json["total"]["Climate change"]["use"]["value"] == 5000
+
+    source = response.json["impact_sources"]["testid"]
+    assert source["resources"] == 4
+    assert source["value"]["value"] == 5
+    assert source["total_impact"] == response.json["total"]
+
+    # All projects
+    response = client.get(impacts_root + "/sources?categories=climate_change")
+    assert response.status_code == 200
+    assert response.json["total"]["Climate change"]["use"]["value"] == 5000
+
+    # Test 400 and 404
+    response = client.get(impacts_root + "/sources?categories=climate")
+    assert response.status_code == 400
+    response = client.get(impacts_root + "/sources?project_ids=-1")
+    assert response.status_code == 404
@@ -28,13 +28,21 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
+import json
 import time
 import pytest
 from flask.testing import FlaskClient
 from flask_sqlalchemy import SQLAlchemy
 from unittest import mock
 from unittest.mock import MagicMock
-from impacts_model.data_model import Model, ModelSchema, Project, Resource, Activity
+from impacts_model.data_model import (
+    Activity,
+    ActivityImpactCache,
+    Model,
+    ModelSchema,
+    Project,
+    Resource,
+)
 from impacts_model.impact_sources import ImpactSource
 from impacts_model.impacts import ImpactCategory, ImpactValue
 from impacts_model.quantities.quantities import (
@@ -229,6 +237,52 @@ def test_delete_model(
     assert response.status_code == 404
 
 
+def test_duplicate_model(client: FlaskClient) -> None:
+    """
+    Test response of POST /models/<model_id>/copy, the copy has the same tree and cached impacts
+    :param client: flask client fixture
+    """
+    client.get("/api/v1/debug/reset")
+    model = client.get(models_root).json[0]
+    impact = client.get(models_root + "/" + str(model["id"]) + "/impact").json
+    model = client.get(models_root + "/" + str(model["id"])).json
+    cached = ActivityImpactCache.query.count()
+    assert cached > 0
+
+    response = client.post(models_root + "/" + str(model["id"]) + "/copy")
+    assert response.status_code == 200
+    model_copy = response.json
+    assert model_copy["name"] == model["name"] + " copy"
+    assert model_copy["project_id"] == model["project_id"]
+    assert model_copy["root_activity"]["name"] == (
+        model["root_activity"]["name"] + " copy"
+    )
+
+    def content(activity: dict) -> list:
+        return [
+            [
+                [resource[key] for key in ["name", "impact_source_id", "amount"]]
+                for resource in activity["resources"]
+            ],
+            [
+                [subactivity["name"], content(subactivity)]
+                for subactivity in activity["subactivities"]
+            ],
+        ]
+
+    assert content(model_copy["root_activity"]) == content(model["root_activity"])
+    assert model_copy["root_activity"]["id"] != model["root_activity"]["id"]
+
+    # Valid cache entries are copied
+    assert ActivityImpactCache.query.count() == 2 * cached
+    copy_impact = client.get(models_root + "/" + str(model_copy["id"]) + "/impact")
+    assert copy_impact.json["total"] == impact["total"]
+
+    # Test no model 404
+    response = client.post(models_root + "/-1/copy")
+    assert response.status_code == 404
+
+
 def test_get_model_activities(client: FlaskClient, db: SQLAlchemy) -> None:
     """
     Test response of GET /models/<id>/activities
@@ -257,3 +311,466 @@ def test_get_model_impact(client: FlaskClient, model_fixture: Model) -> None:
 
     response = client.get(models_root + "/" + str(model_fixture.id) + "/impact")
     assert response.status_code == 200
+
+
+def test_get_model_impact_units(client: FlaskClient) -> None:
+    """
+    Test response of GET /models/<model_id>/impact with display units, on the example models
+    :param client: flask client fixture
+    """
+    client.get("/api/v1/debug/reset")
+    model = client.get(models_root).json[0]
+    path = models_root + "/" + str(model["id"]) + "/impact"
+    impact = client.get(path).json
+
+    response = client.get(path + "?units=climate_change:t_co2e,water_depletion:liter")
+    assert response.status_code == 200
+    for category, unit, factor in [
+        ("Climate change", "t_co2e", 0.001),
+        ("Water depletion", "liter", 1000),
+        ("Fine particles", "disease_incidence", 1),
+    ]:
+        value = response.json["total"][category]["use"]
+        assert value["unit"] == unit
+        assert value["value"] == pytest.approx(
+            impact["total"][category]["use"]["value"] * factor
+        )
+
+    # Same units whatever the way the impact is computed
+    stream = client.get(
+        path + "?units=climate_change:t_co2e,water_depletion:liter&stream=true"
+    )
+    assert json.loads(stream.get_data(as_text=True)) == response.json
+    summary = client.get(path + "?units=climate_change:t_co2e&summary=true").json
+    assert (
+        summary["total"]["Climate change"] == response.json["total"]["Climate change"]
+    )
+
+    # Test unknown or wrong dimension units 400
+    assert client.get(path + "?units=climate_change:unknown").status_code == 400
+    assert client.get(path + "?units=climate_change:liter").status_code == 400
+    # Test a unit of another category 400
+    assert client.get(path + "?units=raw_materials:t_co2e").status_code == 400
+
+
+def test_get_model_impact_interval(client: FlaskClient) -> None:
+    """
+    Test response of GET /models/<model_id>/impact with interval bounds, on the example models
+    Example impact sources have no uncertainty, the bounds are the nominal values
+    :param client: flask client fixture
+    """
+    client.get("/api/v1/debug/reset")
+    model = client.get(models_root).json[0]
+    impact = client.get(models_root + "/" + str(model["id"]) + "/impact").json
+
+    response = client.get(
+        models_root + "/" + str(model["id"]) + "/impact?interval=true"
+    )
+    assert response.status_code == 200
+    manufacture = response.json["total"]["Climate change"]["manufacture"]
+    assert manufacture["value"] == pytest.approx(
+        impact["total"]["Climate change"]["manufacture"]["value"]
+    )
+    assert manufacture["min"] == manufacture["value"] == manufacture["max"]
+
+
+def test_get_model_impact_summary(client: FlaskClient) -> None:
+    """
+    Test response of GET /models/<model_id>/impact with summary, on the example models
+    :param client: flask client fixture
+    """
+    client.get("/api/v1/debug/reset")
+    model = client.get(models_root).json[0]
+
+    response = client.get(
+        models_root
+        + "/"
+        + str(model["id"])
+        + "/impact?summary=true&sub_activities=true"
+    )
+    assert response.status_code == 200
+    assert "impact_sources" not in response.json
+    assert len(response.json["sub_activities"]) == len(
+        model["root_activity"]["subactivities"]
+    )
+    summary = response.json["total"]["Climate change"]
+
+    # Same totals as the complete impact, the second time read from the cache
+    impact = client.get(models_root + "/" + str(model["id"]) + "/impact").json
+    response = client.get(models_root + "/" + str(model["id"]) + "/impact?summary=true")
+    assert response.json["sub_activities"] == []
+    assert response.json["total"]["Climate change"]["use"]["value"] == pytest.approx(
+        impact["total"]["Climate change"]["use"]["value"]
+    )
+    assert summary["use"]["value"] == pytest.approx(
+        impact["total"]["Climate change"]["use"]["value"]
+    )
+
+    # Categories apply to the summary, from the cache and computed
+    path = models_root + "/" + str(model["id"]) + "/impact?summary=true"
+    for query in [
+        "&categories=climate_change",
+        "&categories=climate_change&sub_activities=true",
+    ]:
+        response = client.get(path + query)
+        assert response.status_code == 200
+        assert list(response.json["total"].keys()) == ["Climate change"]
+        for sub_activity in response.json["sub_activities"]:
+            assert list(sub_activity["total"].keys()) == ["Climate change"]
+        assert response.json["total"]["Climate change"]["use"][
+            "value"
+        ] == pytest.approx(impact["total"]["Climate change"]["use"]["value"])
+
+    # Interval and depth are not available with summary
+    assert client.get(path + "&interval=true").status_code == 400
+    assert client.get(path + "&depth=1").status_code == 400
+
+
+def test_get_model_impact_depth_categories(client: FlaskClient) -> None:
+    """
+    Test response of GET /models/<model_id>/impact with depth and categories, on the example models
+    :param client: flask client fixture
+    """
+    client.get("/api/v1/debug/reset")
+    model = client.get(models_root).json[0]
+    impact = client.get(models_root + "/" + str(model["id"]) + "/impact").json
+
+    for query in ["?depth=1", "?depth=1&categories=climate_change"]:
+        response = client.get(models_root + "/" + str(model["id"]) + "/impact" + query)
+        assert response.status_code == 200
+        assert response.json["sub_activities"]
+        assert all(
+            sub_activity["sub_activities"] == []
+            for sub_activity in response.json["sub_activities"]
+        )
+        assert response.json["total"]["Climate change"]["use"][
+            "value"
+        ] == pytest.approx(impact["total"]["Climate change"]["use"]["value"])
+    assert list(response.json["total"]) == ["Climate change"]
+
+    # Test unknown category 400
+    response = client.get(
+        models_root + "/" + str(model["id"]) + "/impact?categories=climate"
+    )
+    assert response.status_code == 400
+
+
+def test_get_model_impact_stream(client: FlaskClient) -> None:
+    """
+    Test that GET /models/<model_id>/impact streamed is the same document, on the example models
+    :param client: flask client fixture
+    """
+    client.get("/api/v1/debug/reset")
+    model = client.get(models_root).json[0]
+
+    response = client.get(
+        models_root + "/" + str(model["id"]) + "/impact?stream=true", buffered=False
+    )
+    assert response.status_code == 200
+    assert response.is_streamed
+    streamed = json.loads(response.get_data())
+    assert streamed == client.get(models_root + "/" + str(model["id"]) + "/impact").json
+
+
+def test_get_model_impact_flat(client: FlaskClient) -> None:
+    """
+    Test response of GET /models/<model_id>/impact normalized, on the example models
+    :param client: flask client fixture
+    """
+    client.get("/api/v1/debug/reset")
+    model = client.get(models_root).json[0]
+    impact = client.get(models_root + "/" + str(model["id"]) + "/impact").json
+
+    response = client.get(models_root + "/" + str(model["id"]) + "/impact?flat=true")
+    assert response.status_code == 200
+    assert len(json.dumps(response.json)) < len(json.dumps(impact))
+    activities = response.json["activities"]
+    root = activities[response.json["root_activity_id"]]
+    assert root["total"]["Climate change"]["use"]["value"] == pytest.approx(
+        impact["total"]["Climate change"]["use"]["value"]
+    )
+    assert root["sub_activities"] == [
+        sub_activity["activity_id"] for sub_activity in impact["sub_activities"]
+    ]
+    assert all(
+        key in response.json["impact_sources"]
+        for activity in activities.values()
+        for key in activity["impact_sources"]
+    )
+
+
+def test_get_model_impact_sharded(client: FlaskClient) -> None:
+    """
+    Test that GET /models/<model_id>/impact is identical when large models are split in subtrees
+    :param client: flask client fixture
+    """
+    client.get("/api/v1/debug/reset")
+    models = client.get(models_root).json
+    serial = [
+        client.get(models_root + "/" + str(model["id"]) + "/impact").json
+        for model in models
+    ]
+
+    client.get("/api/v1/debug/reset")
+    client.application.config["IMPACT_SHARD_THRESHOLD"] = 3
+    client.application.config["IMPACT_PROCESS_POOL_WORKERS"] = 2
+    sharded = [
+        client.get(models_root + "/" + str(model["id"]) + "/impact").json
+        for model in models
+    ]
+    assert sharded == serial
+
+    # Impacts saved in cache are consistent
+    assert client.get("/api/v1/debug/impacts_cache").json == []
+
+
+def test_get_model_uncertainty(client: FlaskClient) -> None:
+    """
+    Test response of GET /models/<model_id>/uncertainty, on the example models
+    :param client: flask client fixture
+    """
+    client.get("/api/v1/debug/reset")
+    model = client.get(models_root).json[0]
+    impact = client.get(models_root + "/" + str(model["id"]) + "/impact").json
+
+    response = client.get(
+        models_root
+        + "/"
+        + str(model["id"])
+        + "/uncertainty?samples=10&percentiles=5,95"
+    )
+    assert response.status_code == 200
+    assert len(response.json["sub_activities"]) == len(impact["sub_activities"])
+    climate_change = response.json["total"]["Climate change"]
+    assert climate_change["unit"] == "kg_co2e"
+    assert list(climate_change["percentiles"]) == ["5", "95"]
+    assert climate_change["mean"] == pytest.approx(
+        impact["total"]["Climate change"]["manufacture"]["value"]
+        + impact["total"]["Climate change"]["use"]["value"]
+    )
+
+    # Test no model 404
+    response = client.get(models_root + "/-1/uncertainty")
+    assert response.status_code == 404
+
+
+def test_get_model_timeline(client: FlaskClient) -> None:
+    """
+    Test response of GET /models/<model_id>/timeline, on the example models
+    :param client: flask client fixture
+    """
+    client.get("/api/v1/debug/reset")
+    model = client.get(models_root).json[0]
+    impact = client.get(models_root + "/" + str(model["id"]) + "/impact").json
+
+    response = client.get(
+        models_root + "/" + str(model["id"]) + "/timeline?granularity=year"
+    )
+    assert response.status_code == 200
+    assert len(response.json["sub_activities"]) == len(impact["sub_activities"])
+    climate_change = response.json["timeline"]["Climate change"]
+    assert climate_change["unit"] == "kg_co2e"
+    # The timeline distributes the whole impact
+    assert sum(climate_change["values"]) == pytest.approx(
+        impact["total"]["Climate change"]["manufacture"]["value"]
+        + impact["total"]["Climate change"]["use"]["value"]
+    )
+
+    # Test wrong granularity
+    response = client.get(
+        models_root + "/" + str(model["id"]) + "/timeline?granularity=week"
+    )
+    assert response.status_code == 400
+
+    # Test no model 404
+    response = client.get(models_root + "/-1/timeline")
+    assert response.status_code == 404
+
+
+def test_get_model_scenarios(client: FlaskClient) -> None:
+    """
+    Test response of POST /models/<model_id>/scenarios, on the example models
+    :param client: flask client fixture
+    """
+    client.get("/api/v1/debug/reset")
+    model = client.get(models_root).json[0]
+    impact = client.get(models_root + "/" + str(model["id"]) + "/impact").json
+    climate_change = (
+        impact["total"]["Climate change"]["manufacture"]["value"]
+        + impact["total"]["Climate change"]["use"]["value"]
+    )
+
+    scenarios = [
+        {"name": "nominal", "scaling": []},
+        {
+            "name": "double",
+            "scaling": [{"activity_id": model["root_activity"]["id"], "factor": 2}],
+        },
+    ]
+    response = client.post(
+        models_root + "/" + str(model["id"]) + "/scenarios?activities=true",
+        json={"scenarios": scenarios},
+    )
+    assert response.status_code == 200
+    assert [scenario["name"] for scenario in response.json] == ["nominal", "double"]
+    nominal, double = response.json
+    assert nominal["total"]["Climate change"]["value"] == pytest.approx(climate_change)
+    assert double["total"]["Climate change"]["value"] == pytest.approx(
+        2 * climate_change
+    )
+    assert nominal["activities"][str(model["root_activity"]["id"])] == nominal["total"]
+
+    # Test scaling rule selecting nothing
+    response = client.post(
+        models_root + "/" + str(model["id"]) + "/scenarios",
+        json={
+            "scenarios": [{"name": "", "scaling": [{"resource_id": -1, "factor": 2}]}]
+        },
+    )
+    assert response.status_code == 400
+
+    # Test no model 404
+    response = client.post(models_root + "/-1/scenarios", json={"scenarios": []})
+    assert response.status_code == 404
+
+
+def test_get_model_sensitivity(client: FlaskClient) -> None:
+    """
+    Test response of GET /models/<model_id>/sensitivity, on the example models
+    :param client: flask client fixture
+    """
+    client.get("/api/v1/debug/reset")
+    model = client.get(models_root).json[0]
+
+    response = client.get(models_root + "/" + str(model["id"]) + "/sensitivity")
+    assert response.status_code == 200
+    assert len(response.json["resources"]) > 0
+    # The total is linear, elasticities of all the resources sum to 1
+    assert sum(
+        resource["elasticity"]["Climate change"]
+        for resource in response.json["resources"]
+    ) == pytest.approx(1)
+    assert "resource_id" not in response.json["factors"][0]
+
+    # Test no model 404
+    response = client.get(models_root + "/-1/sensitivity")
+    assert response.status_code == 404
+
+
+def test_get_model_reduction(client: FlaskClient) -> None:
+    """
+    Test response of POST /models/<model_id>/reduction, on the example models
+    :param client: flask client fixture
+    """
+    client.get("/api/v1/debug/reset")
+    model = client.get(models_root).json[0]
+    total = client.get(models_root + "/" + str(model["id"]) + "/sensitivity").json[
+        "total"
+    ]["Climate change"]["value"]
+    reduction = {
+        "targets": {"climate_change": {"value": total * 0.8, "unit": "kg_co2e"}},
+        "bounds": [
+            {"activity_id": model["root_activity"]["id"], "min": -0.5, "max": 0}
+        ],
+    }
+
+    response = client.post(
+        models_root + "/" + str(model["id"]) + "/reduction", json=reduction
+    )
+    assert response.status_code == 200
+    assert response.json["feasible"]
+    assert response.json["reduced_total"]["Climate change"]["value"] == pytest.approx(
+        total * 0.8
+    )
+    assert all(-0.5 <= change["change"] < 0 for change in response.json["changes"])
+
+    # Test unreachable target
+    reduction["targets"]["climate_change"]["value"] = total * 0.1
+    response = client.post(
+        models_root + "/" + str(model["id"]) + "/reduction", json=reduction
+    )
+    assert response.status_code == 200
+    assert not response.json["feasible"]
+
+    # Test wrong category 400
+    reduction["targets"] = {"climate": {"value": 1, "unit": "kg_co2e"}}
+    response = client.post(
+        models_root + "/" + str(model["id"]) + "/reduction", json=reduction
+    )
+    assert response.status_code == 400
+
+    # Test no model 404
+    response = client.post(models_root + "/-1/reduction", json=reduction)
+    assert response.status_code == 404
+
+
+def test_get_model_hotspots(client: FlaskClient) -> None:
+    """
+    Test response of GET /models/<model_id>/hotspots, on the example models
+    :param client: flask client fixture
+    """
+    client.get("/api/v1/debug/reset")
+    model = client.get(models_root).json[0]
+
+    response = client.get(
+        models_root
+        + "/"
+        + str(model["id"])
+        + "/hotspots?top=3&categories=climate_change"
+    )
+    assert response.status_code == 200
+    resources = response.json["resources"]["Climate change"]
+    assert len(resources) == 3
+    assert list(response.json["activities"]) == ["Climate change"]
+    values = [resource["impact"]["value"] for resource in resources]
+    assert values == sorted(values, reverse=True)
+    assert resources[0]["share"] == pytest.approx(
+        values[0] / response.json["total"]["Climate change"]["value"]
+    )
+
+    # Test unknown category 400
+    response = client.get(
+        models_root + "/" + str(model["id"]) + "/hotspots?categories=climate"
+    )
+    assert response.status_code == 400
+
+    # Test no model 404
+    response = client.get(models_root + "/-1/hotspots")
+    assert response.status_code == 404
+
+
+def test_get_model_diff(client: FlaskClient) -> None:
+    """
+    Test response of GET /models/<model_id>/diff/<other_model_id>, on an example model copy
+    :param client: flask client fixture
+    """
+    client.get("/api/v1/debug/reset")
+    model = client.get(models_root).json[0]
+    model_copy = client.post(models_root + "/" + str(model["id"]) + "/copy").json
+    path = models_root + "/" + str(model["id"]) + "/diff/" + str(model_copy["id"])
+
+    response = client.get(path)
+    assert response.status_code == 200
+    assert response.json["status"] == "unchanged"
+
+    # Remove a sub activity of the copy
+    removed = model_copy["root_activity"]["subactivities"][-1]
+    client.delete("/api/v1/activities/" + str(removed["id"]))
+    response = client.get(path)
+    assert response.status_code == 200
+    assert response.json["status"] == "changed"
+    assert [
+        (sub_activity["name"], sub_activity["status"])
+        for sub_activity in response.json["sub_activities"]
+    ] == [(removed["name"], "removed")]
+
+    before = client.get(models_root + "/" + str(model["id"]) + "/impact").json
+    after = client.get(models_root + "/" + str(model_copy["id"]) + "/impact").json
+    assert response.json["delta"]["Climate change"]["use"]["value"] == pytest.approx(
+        after["total"]["Climate change"]["use"]["value"]
+        - before["total"]["Climate change"]["use"]["value"]
+    )
+
+    # Test no model 404
+    response = client.get(models_root + "/" + str(model["id"]) + "/diff/-1")
+    assert response.status_code == 404
@@ -171,3 +171,28 @@ def test_get_project_models(
     """
     response = client.get(projects_root + "/" + str(project_fixture.id) + "/models")
     assert response.status_code == 200
+
+
+def test_get_project_impacts(client: FlaskClient) -> None:
+    """
+    Test response of GET /projects/<id>/impacts, on the example projects
+    :param client: flask client fixture
+    """
+    client.get("/api/v1/debug/reset")
+    for project in client.get(projects_root).json:
+        response = client.get(projects_root + "/" + str(project["id"]) + "/impacts")
+        assert response.status_code == 200
+        assert [impact["model_id"] for impact in response.json] == [
+            model["id"] for model in project["models"]
+        ]
+        for impact in response.json:
+            assert (
+                impact["impact"]
+                == client.get(
+                    "/api/v1/models/" + str(impact["model_id"]) + "/impact"
+                ).json
+            )
+
+    # Test no project 404
+    response = client.get(projects_root + "/-1/impacts")
+    assert response.status_code == 404
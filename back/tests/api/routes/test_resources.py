@@ -322,6 +322,27 @@ def test_patch_resource(
     assert response.status_code == 200
     assert response.json["amount"] == {"value": 8, "unit": "server"}
 
+    # Patch the amount uncertainty
+    uncertainty = {"distribution": "lognormal", "gsd": 1.5}
+    response = client.patch(
+        resources_root + "/" + str(resource_fixture.id),
+        json=[{"op": "replace", "path": "/uncertainty", "value": uncertainty}],
+    )
+    assert response.status_code == 200
+    assert response.json["uncertainty"] == uncertainty
+
+    response = client.patch(
+        resources_root + "/" + str(resource_fixture.id),
+        json=[
+            {
+                "op": "replace",
+                "path": "/uncertainty",
+                "value": {"distribution": "lognormal", "gsd": 0.5},
+            }
+        ],
+    )
+    assert response.status_code == 400
+
     # Test wrong patch format
     response = client.patch(
         resources_root + "/" + str(resource_fixture.id),
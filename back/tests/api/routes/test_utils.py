@@ -56,3 +56,32 @@ def test_impact(client: FlaskClient) -> None:
 
     response = client.get(models_root + "/" + str(model_id) + "/impact")
     assert response.status_code == 200
+
+
+def test_check_impacts_cache(client: FlaskClient) -> None:
+    """
+    Test that after GET /debug/reset, computing and updating impacts
+    GET /debug/impacts_cache finds no inconsistent cached impact
+    :param client: flask client fixture
+    """
+    client.get(debug_root + "/reset")
+    models = client.get(projects_root)
+    model_id = models.json[0]["models"][0]["id"]  # retrieve the id of the first model
+    client.get(models_root + "/" + str(model_id) + "/impact")
+
+    resource = client.get("/api/v1/resources").json[0]
+    response = client.patch(
+        "/api/v1/resources/" + str(resource["id"]),
+        json=[
+            {
+                "op": "replace",
+                "path": "/amount",
+                "value": {"value": 42, "unit": resource["amount"]["unit"]},
+            }
+        ],
+    )
+    assert response.status_code == 200
+
+    response = client.get(debug_root + "/impacts_cache")
+    assert response.status_code == 200
+    assert response.json == []
@@ -33,6 +33,7 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 
 from api.server import create_app
+from impacts_model.content_cache import content_impact_cache
 from impacts_model.data_model import db as _db
 
 TESTDB = "test.db"
@@ -40,6 +41,12 @@ TESTDB = "test.db"
 # TEST_DATABASE_URI = 'sqlite:///' + TESTDB_PATH
 
 
+@pytest.fixture(autouse=True)
+def clear_content_cache() -> None:
+    """Impact sources are mocked by the tests with the same ids, forget their impacts"""
+    content_impact_cache.clear()
+
+
 @pytest.fixture(name="app")
 def app(request) -> Flask:
     """Session-wide test `Flask` application."""
@@ -43,8 +43,10 @@ from impacts_model.impact_sources import ImpactSource
 from impacts_model.impacts import ImpactCategory, ImpactValue
 from impacts_model.quantities.quantities import (
     KG_CO2E,
+    MOL_HPOS,
     SERVER,
 )
+from impacts_model.uncertainty import Uncertainty
 
 
 ############
@@ -217,3 +219,133 @@ def test_get_activity_impact_by_impact_source(
         res_dict["testImpactSource"].total_impact[ImpactCategory.CLIMATE_CHANGE].use
         == 3000 * KG_CO2E
     )
+
+
+@mock.patch(
+    "impacts_model.data_model.impact_source_factory",
+    MagicMock(
+        return_value=ImpactSource(
+            id="testImpactSource",
+            name="test",
+            unit=SERVER,
+            environmental_impact={
+                ImpactCategory.CLIMATE_CHANGE: ImpactValue(use=1000 * KG_CO2E)
+            },
+            uncertainty=Uncertainty("uniform", min=0.8, max=1.5),
+        )
+    ),
+)
+def test_get_activity_impact_interval(
+    activity_fixture_with_subactivity: Activity,
+) -> None:
+    """
+    Test that the impact factors and resources amounts bounds are propagated to the activity impact
+    """
+    use = (
+        activity_fixture_with_subactivity.get_impact(interval=True)
+        .total[ImpactCategory.CLIMATE_CHANGE]
+        .use
+    )
+    assert list(use.magnitude) == pytest.approx([2400, 3000, 4500])
+    assert use.units == KG_CO2E
+
+    # Bounds of a resource amount
+    subactivity = activity_fixture_with_subactivity.subactivities[0]
+    subactivity.resources[0].uncertainty = Uncertainty("uniform", min=0.5, max=2)
+    use = (
+        activity_fixture_with_subactivity.get_impact(interval=True)
+        .total[ImpactCategory.CLIMATE_CHANGE]
+        .use
+    )
+    assert list(use.magnitude) == pytest.approx([2000, 3000, 6000])
+
+
+@mock.patch(
+    "impacts_model.data_model.impact_source_factory",
+    MagicMock(
+        return_value=ImpactSource(
+            id="testImpactSource",
+            name="test",
+            unit=SERVER,
+            uses=[{"quantity": "10 kWh", "resource_id": "electricity"}],
+            environmental_impact={
+                ImpactCategory.CLIMATE_CHANGE: ImpactValue(manufacture=1776 * KG_CO2E)
+            },
+        ),
+    ),
+)
+def test_get_activity_summary(
+    activity_fixture_with_subactivity: Activity,
+) -> None:
+    """
+    Test that the summary totals are the ones of the complete impact, sub impacts included
+    """
+    impact = activity_fixture_with_subactivity.get_impact()
+
+    summary = activity_fixture_with_subactivity.get_summary()
+    assert summary.sub_activities == []
+    for category, value in impact.total.items():
+        for phase in ["manufacture", "use"]:
+            expected = getattr(value, phase)
+            if expected is not None:
+                assert getattr(summary.total[category], phase).to(
+                    expected.units
+                ).magnitude == pytest.approx(expected.magnitude)
+
+    summary = activity_fixture_with_subactivity.get_summary(sub_activities=True)
+    assert len(summary.sub_activities) == 1
+    assert summary.sub_activities[0].sub_activities == []
+    assert summary.sub_activities[0].total[
+        ImpactCategory.CLIMATE_CHANGE
+    ].manufacture.magnitude == pytest.approx(
+        impact.sub_activities[0]
+        .total[ImpactCategory.CLIMATE_CHANGE]
+        .manufacture.magnitude
+    )
+    assert summary.total[ImpactCategory.CLIMATE_CHANGE].use.magnitude == pytest.approx(
+        impact.total[ImpactCategory.CLIMATE_CHANGE].use.magnitude
+    )
+
+    summary = activity_fixture_with_subactivity.get_summary(
+        sub_activities=True, categories=[ImpactCategory.CLIMATE_CHANGE]
+    )
+    assert list(summary.total) == [ImpactCategory.CLIMATE_CHANGE]
+    assert list(summary.sub_activities[0].total) == [ImpactCategory.CLIMATE_CHANGE]
+    assert summary.total[ImpactCategory.CLIMATE_CHANGE].use.magnitude == pytest.approx(
+        impact.total[ImpactCategory.CLIMATE_CHANGE].use.magnitude
+    )
+
+
+@mock.patch(
+    "impacts_model.data_model.impact_source_factory",
+    MagicMock(
+        return_value=ImpactSource(
+            id="testImpactSource",
+            name="test",
+            unit=SERVER,
+            environmental_impact={
+                ImpactCategory.CLIMATE_CHANGE: ImpactValue(manufacture=1000 * KG_CO2E),
+                ImpactCategory.ACIDIFICATION: ImpactValue(manufacture=1 * MOL_HPOS),
+            },
+        ),
+    ),
+)
+def test_get_activity_impact_depth_categories(
+    activity_fixture_with_subactivity: Activity,
+) -> None:
+    """
+    Test that depth only cuts the returned sub activities and categories the computed ones
+    """
+    impact = activity_fixture_with_subactivity.get_impact(
+        depth=0, categories=[ImpactCategory.CLIMATE_CHANGE]
+    )
+    assert impact.sub_activities == []
+    assert list(impact.total) == [ImpactCategory.CLIMATE_CHANGE]
+    assert impact.total[ImpactCategory.CLIMATE_CHANGE].manufacture == 3000 * KG_CO2E
+    assert list(impact.impact_sources["testImpactSource"].own_impact) == [
+        ImpactCategory.CLIMATE_CHANGE
+    ]
+
+    impact = activity_fixture_with_subactivity.get_impact(depth=1)
+    assert len(impact.sub_activities) == 1
+    assert impact.total[ImpactCategory.ACIDIFICATION].manufacture == 3 * MOL_HPOS
@@ -0,0 +1,76 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import json
+import shutil
+from pathlib import Path
+
+from impacts_model.batch import (
+    compute_projects,
+    find_project_files,
+    load_project_models,
+    main,
+)
+from impacts_model.impacts import ImpactCategory
+
+
+def test_compute_projects(tmp_path: Path) -> None:
+    """Test the batch computation of project files, and that invalid files are reported"""
+    shutil.copy("examples/Paper.json", tmp_path / "paper.json")
+    with open(tmp_path / "invalid.json", "w") as f:
+        f.write("{")
+
+    files = find_project_files([str(tmp_path)])
+    assert files == [str(tmp_path / "invalid.json"), str(tmp_path / "paper.json")]
+    assert find_project_files([str(tmp_path / "*.json"), str(tmp_path)]) == files
+
+    _, models = load_project_models("examples/Paper.json")
+    summary = compute_projects(files, max_workers=1)
+    assert summary["files"] == 2
+    assert summary["models"] == len(models)
+    assert summary["models_per_second"] > 0
+    assert [error["file"] for error in summary["errors"]] == [files[0]]
+
+    for model, result in zip(models, summary["results"]):
+        assert result["model_name"] == model.name
+        expected = model.root_activity.get_impact().total
+        climate_change = result["impact"]["total"]["Climate change"]
+        assert (
+            climate_change["use"]["value"]
+            == expected[ImpactCategory.CLIMATE_CHANGE].use.magnitude
+        )
+
+    # Test the command line writes the summary file
+    output = tmp_path / "summary.json"
+    main([str(tmp_path / "paper.json"), "--output", str(output), "--full"])
+    with open(output, "r") as f:
+        written = json.load(f)
+    assert written["models"] == len(models)
+    assert "impact_sources" in written["results"][0]["impact"]
@@ -0,0 +1,114 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from unittest import mock
+from unittest.mock import MagicMock
+
+from impacts_model.content_cache import (
+    content_impact_cache,
+    get_activity_impact,
+    get_content_hash,
+)
+from impacts_model.data_model import Activity, Resource
+from impacts_model.impact_sources import ImpactSource
+from impacts_model.impacts import ImpactCategory, ImpactValue
+from impacts_model.quantities.quantities import KG_CO2E, SERVER
+
+
+def _tree(name: str, servers: int) -> Activity:
+    """Return a transient activity with one sub activity, each using servers"""
+    return Activity(
+        name=name,
+        resources=[
+            Resource(name=name, impact_source_id="testImpactSource", amount=1 * SERVER)
+        ],
+        subactivities=[
+            Activity(
+                name=name + " sub",
+                resources=[
+                    Resource(
+                        name=name,
+                        impact_source_id="testImpactSource",
+                        amount=servers * SERVER,
+                    )
+                ],
+            )
+        ],
+    )
+
+
+@mock.patch(
+    "impacts_model.data_model.impact_source_factory",
+    MagicMock(
+        return_value=ImpactSource(
+            id="testImpactSource",
+            name="test",
+            unit=SERVER,
+            environmental_impact={
+                ImpactCategory.CLIMATE_CHANGE: ImpactValue(manufacture=100 * KG_CO2E)
+            },
+        )
+    ),
+)
+def test_content_cache() -> None:
+    """Test that identical subtrees, whatever their names, are computed once"""
+    first, copy, other = _tree("first", 2), _tree("copy", 2), _tree("other", 3)
+
+    hashes: dict[Activity, str] = {}
+    assert get_content_hash(first, hashes) == get_content_hash(copy, hashes)
+    assert get_content_hash(first, hashes) != get_content_hash(other, hashes)
+    # A different sub activity changes the hash of its ancestors
+    assert hashes[first.subactivities[0]] != hashes[other.subactivities[0]]
+    assert len(hashes) == 6
+
+    impact = get_activity_impact(first)
+    assert impact.total[ImpactCategory.CLIMATE_CHANGE].manufacture == 300 * KG_CO2E
+    assert len(content_impact_cache) == 2
+    assert content_impact_cache.hits == 0
+
+    copy_impact = get_activity_impact(copy)
+    assert content_impact_cache.hits == 2
+    assert copy_impact.to_dict() == copy.get_impact().to_dict()
+
+    # Returned impacts can be modified without changing the cache
+    copy_impact.total[ImpactCategory.CLIMATE_CHANGE].add_impact(
+        ImpactValue(manufacture=1 * KG_CO2E)
+    )
+    assert get_activity_impact(first).to_dict() == impact.to_dict()
+
+    other_impact = get_activity_impact(other)
+    assert other_impact.total[ImpactCategory.CLIMATE_CHANGE].manufacture == (
+        400 * KG_CO2E
+    )
+    assert len(content_impact_cache) == 4
+
+    # Entries of another catalog version are not used
+    with mock.patch("impacts_model.content_cache.catalog_version", "other"):
+        assert get_content_hash(first, {}) not in content_impact_cache
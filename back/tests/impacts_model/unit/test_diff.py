@@ -0,0 +1,100 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+from unittest import mock
+from copy import copy
+from unittest import mock
+from unittest.mock import MagicMock
+
+from impacts_model.data_model import Activity, Resource
+from impacts_model.diff import ADDED, CHANGED, REMOVED, UNCHANGED, get_activity_diff
+from impacts_model.impact_sources import ImpactSource
+from impacts_model.impacts import ImpactCategory, ImpactValue
+from impacts_model.quantities.quantities import KG_CO2E, SERVER
+
+
+def _tree() -> Activity:
+    """Root with resources A, and sub activities Sub 1 with B and Sub 2 with C"""
+    root = Activity(name="Root")
+    root.resources = [
+        Resource(name="A", impact_source_id="testImpactSource", amount=1 * SERVER)
+    ]
+    for index, name in enumerate(["B", "C"]):
+        subactivity = Activity(name="Sub " + str(index + 1))
+        subactivity.resources = [
+            Resource(name=name, impact_source_id="testImpactSource", amount=2 * SERVER)
+        ]
+        root.subactivities.append(subactivity)
+    return root
+
+
+@mock.patch(
+    "impacts_model.data_model.impact_source_factory",
+    MagicMock(
+        return_value=ImpactSource(
+            id="testImpactSource",
+            name="test",
+            unit=SERVER,
+            environmental_impact={
+                ImpactCategory.CLIMATE_CHANGE: ImpactValue(manufacture=100 * KG_CO2E)
+            },
+        )
+    ),
+)
+def test_get_activity_diff() -> None:
+    """Test that only the changed activities and resources are returned, with their deltas"""
+    first = _tree()
+    second = copy(first)
+    second.name = "Root copy"
+    assert get_activity_diff(first, second).status == UNCHANGED
+
+    # Change B, remove Sub 2 and add a resource to the root
+    second.subactivities[0].resources[0].amount = 5 * SERVER
+    second.subactivities.pop()
+    second.resources.append(
+        Resource(name="D", impact_source_id="testImpactSource", amount=1 * SERVER)
+    )
+    diff = get_activity_diff(first, second)
+    assert diff.status == CHANGED
+    # +300 for B, -200 for Sub 2, +100 for D
+    assert diff.delta[ImpactCategory.CLIMATE_CHANGE].manufacture == 200 * KG_CO2E
+
+    assert [(r.name, r.status) for r in diff.resources] == [("D", ADDED)]
+    assert [(a.name, a.status) for a in diff.sub_activities] == [
+        ("Sub 1", CHANGED),
+        ("Sub 2", REMOVED),
+    ]
+    changed = diff.sub_activities[0].resources
+    assert [(r.name, r.status) for r in changed] == [("B", CHANGED)]
+    assert changed[0].delta[ImpactCategory.CLIMATE_CHANGE].manufacture == (
+        300 * KG_CO2E
+    )
+    assert diff.sub_activities[1].delta[ImpactCategory.CLIMATE_CHANGE].manufacture == (
+        -200 * KG_CO2E
+    )
@@ -0,0 +1,116 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import numpy as np
+import pytest
+
+from impacts_model.display_units import get_display_units
+from impacts_model.impacts import (
+    ActivityImpact,
+    ActivityImpactSchema,
+    ImpactCategory,
+    ImpactSourceImpact,
+    ImpactValue,
+)
+from impacts_model.quantities.quantities import KG_CO2E, Q_, ureg
+
+
+def test_get_display_units() -> None:
+    """Test parsing of category:unit entries, and their errors"""
+    display_units = get_display_units(
+        ["climate_change:t_co2e", "WATER_DEPLETION:liter"]
+    )
+    assert display_units.units[ImpactCategory.CLIMATE_CHANGE] == ureg.t_co2e
+    assert display_units.units[ImpactCategory.WATER_DEPLETION] == ureg.liter
+    # Reference unit of the others
+    assert display_units.units[ImpactCategory.ACIDIFICATION] == ureg.mol_Hpos
+
+    for entries in [
+        ["climate_change"],
+        ["climate:t_co2e"],
+        ["climate_change:unknown_unit"],
+        ["climate_change:liter"],
+        # Units of another category, of the same dimension
+        ["raw_materials:t_co2e"],
+        ["climate_change:kg_Sbe"],
+        ["climate_change:kilogram"],
+    ]:
+        with pytest.raises(ValueError):
+            get_display_units(entries)
+
+
+def test_display_units_convert() -> None:
+    """Test that impacts in reduced units are dumped converted, with one factor by unit"""
+    display_units = get_display_units(["climate_change:t_co2e"])
+    impact = ActivityImpact(
+        activity_id="1",
+        total={
+            ImpactCategory.CLIMATE_CHANGE: ImpactValue(
+                manufacture=Q_(1500, "kilogram"), use=2500 * KG_CO2E
+            ),
+            ImpactCategory.WATER_DEPLETION: ImpactValue(use=Q_(3000, "liter")),
+            ImpactCategory.FINE_PARTICLES: ImpactValue(use=Q_(2, "dimensionless")),
+        },
+        sub_activities=[],
+        impact_sources={
+            "test": ImpactSourceImpact(
+                impact_source_id="test",
+                own_impact={
+                    ImpactCategory.CLIMATE_CHANGE: ImpactValue(
+                        use=Q_(np.array([1000.0, 2000.0, 3000.0]), "kg_co2e")
+                    )
+                },
+                sub_impacts={},
+            )
+        },
+    )
+
+    data = ActivityImpactSchema(context={"display_units": display_units}).dump(impact)
+    climate_change = data["total"]["Climate change"]
+    assert climate_change["manufacture"] == {"value": 1.5, "unit": "t_co2e"}
+    assert climate_change["use"]["unit"] == "t_co2e"
+    assert climate_change["use"]["value"] == pytest.approx(2.5)
+    water = data["total"]["Water depletion"]["use"]
+    assert water["unit"] == "cubic_meter"
+    assert water["value"] == pytest.approx(3)
+    assert data["total"]["Fine particles"]["use"]["unit"] == "disease_incidence"
+    interval = data["impact_sources"]["test"]["own_impact"]["Climate change"]["use"]
+    assert [interval["min"], interval["value"], interval["max"]] == pytest.approx(
+        [1, 2, 3]
+    )
+
+    # The impact itself is not modified
+    assert impact.total[ImpactCategory.CLIMATE_CHANGE].use == 2500 * KG_CO2E
+    # kilogram and kg_co2e are different units, with their own factor
+    assert len(display_units._factors) == 4
+
+    # Without display units, values are written in their own unit
+    data = ActivityImpactSchema().dump(impact)
+    assert data["total"]["Climate change"]["use"] == {"value": 2500, "unit": "kg_co2e"}
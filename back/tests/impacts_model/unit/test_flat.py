@@ -0,0 +1,92 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+from unittest import mock
+from unittest import mock
+from unittest.mock import MagicMock
+
+from flask_sqlalchemy import SQLAlchemy
+
+from impacts_model.data_model import Activity, Model, Project, Resource
+from impacts_model.flat import get_flat_impact
+from impacts_model.impact_sources import ImpactSource
+from impacts_model.impacts import ImpactCategory, ImpactValue
+from impacts_model.quantities.quantities import KG_CO2E, SERVER
+
+
+@mock.patch(
+    "impacts_model.data_model.impact_source_factory",
+    MagicMock(
+        return_value=ImpactSource(
+            id="testImpactSource",
+            name="test",
+            unit=SERVER,
+            environmental_impact={
+                ImpactCategory.CLIMATE_CHANGE: ImpactValue(manufacture=100 * KG_CO2E)
+            },
+        )
+    ),
+)
+def test_get_flat_impact(db: SQLAlchemy) -> None:
+    """Test that each activity and own impact source appears once, with the tree totals"""
+    project = Project(name="Project test_flat")
+    model = Model(name="Model test_flat")
+    project.models = [model]
+    activities = [Activity(name=str(index)) for index in range(3)]
+    for index, activity in enumerate(activities):
+        activity.resources = [
+            Resource(
+                name=str(index),
+                impact_source_id="testImpactSource",
+                amount=(index + 1) * SERVER,
+            )
+        ]
+    activities[0].subactivities = [activities[1]]
+    activities[1].subactivities = [activities[2]]
+    model.root_activity = activities[0]
+    db.session.add_all([project, model, *activities])
+    db.session.commit()
+    ids = [str(activity.id) for activity in activities]
+
+    flat = get_flat_impact(activities[0])
+    assert flat.root_activity_id == ids[0]
+    assert list(flat.activities) == [ids[2], ids[1], ids[0]]
+    assert flat.activities[ids[0]].sub_activities == [ids[1]]
+    assert flat.activities[ids[2]].sub_activities == []
+
+    # Totals include the sub activities, impact sources are only the own resources ones
+    for index, manufacture in enumerate([600, 500, 300]):
+        activity = flat.activities[ids[index]]
+        assert activity.total[ImpactCategory.CLIMATE_CHANGE].manufacture == (
+            manufacture * KG_CO2E
+        )
+        assert activity.impact_sources == [ids[index] + "/testImpactSource"]
+        assert flat.impact_sources[activity.impact_sources[0]].total_impact[
+            ImpactCategory.CLIMATE_CHANGE
+        ].manufacture == ((index + 1) * 100 * KG_CO2E)
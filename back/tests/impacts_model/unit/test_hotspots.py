@@ -0,0 +1,84 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+from unittest import mock
+from unittest import mock
+from unittest.mock import MagicMock
+
+import pytest
+
+from impacts_model.data_model import Activity, Resource
+from impacts_model.hotspots import get_hotspots
+from impacts_model.impact_sources import ImpactSource
+from impacts_model.impacts import ImpactCategory, ImpactValue
+from impacts_model.linear import compile_activity
+from impacts_model.quantities.quantities import KG_CO2E, SERVER
+
+
+@mock.patch(
+    "impacts_model.data_model.impact_source_factory",
+    MagicMock(
+        return_value=ImpactSource(
+            id="testImpactSource",
+            name="test",
+            unit=SERVER,
+            environmental_impact={
+                ImpactCategory.CLIMATE_CHANGE: ImpactValue(manufacture=100 * KG_CO2E)
+            },
+        )
+    ),
+)
+def test_get_hotspots() -> None:
+    """Test that the biggest resources and activities own impacts are ranked with their share"""
+    root = Activity(name="Root")
+    root.resources = [
+        Resource(name="A", impact_source_id="testImpactSource", amount=1 * SERVER)
+    ]
+    subactivity = Activity(name="Sub")
+    subactivity.resources = [
+        Resource(name="B", impact_source_id="testImpactSource", amount=2 * SERVER),
+        Resource(name="C", impact_source_id="testImpactSource", amount=5 * SERVER),
+    ]
+    root.subactivities = [subactivity]
+
+    hotspots = get_hotspots(
+        compile_activity(root), top=2, categories=[ImpactCategory.CLIMATE_CHANGE]
+    )
+    assert list(hotspots.resources) == [ImpactCategory.CLIMATE_CHANGE]
+    assert hotspots.total[ImpactCategory.CLIMATE_CHANGE].magnitude == pytest.approx(800)
+
+    resources = hotspots.resources[ImpactCategory.CLIMATE_CHANGE]
+    assert [resource.name for resource in resources] == ["C", "B"]
+    assert resources[0].impact.magnitude == pytest.approx(500)
+    assert resources[0].share == pytest.approx(500 / 800)
+
+    # Sub activity first with its own resources, the root only has A
+    activities = hotspots.activities[ImpactCategory.CLIMATE_CHANGE]
+    assert [activity.name for activity in activities] == ["Sub", "Root"]
+    assert activities[1].share == pytest.approx(100 / 800)
@@ -0,0 +1,351 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from unittest import mock
+from unittest.mock import MagicMock
+
+import pytest
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects.sqlite import insert
+
+from impacts_model.data_model import (
+    Activity,
+    ActivityImpactCache,
+    Model,
+    Project,
+    Resource,
+)
+from impacts_model.impact_cache import (
+    check_activity_impact,
+    commit_activity_impacts,
+    get_activity_impact,
+    get_tree_versions,
+)
+from impacts_model.impact_sources import ImpactSource
+from impacts_model.impacts import ImpactCategory, ImpactValue
+from impacts_model.quantities.quantities import KG_CO2E, SERVER
+
+impact_source_mock = MagicMock(
+    return_value=ImpactSource(
+        id="testImpactSource",
+        name="test",
+        unit=SERVER,
+        environmental_impact={
+            ImpactCategory.CLIMATE_CHANGE: ImpactValue(manufacture=1000 * KG_CO2E)
+        },
+    ),
+)
+
+
+@pytest.fixture(scope="function")
+def activity_tree_fixture(db: SQLAlchemy) -> Activity:
+    """
+    Activity tree fixture root -> child -> grandchild and root -> sibling
+    Each activity has one resource of 1 server
+    """
+    project = Project(name="Project test_impact_cache")
+    model = Model(name="Model test_impact_cache")
+    project.models = [model]
+
+    activities = {}
+    for name in ["root", "child", "grandchild", "sibling"]:
+        activities[name] = Activity(
+            name=name,
+            resources=[
+                Resource(
+                    name=name + " resource",
+                    impact_source_id="testImpactSource",
+                    amount=1 * SERVER,
+                )
+            ],
+        )
+    activities["root"].subactivities = [activities["child"], activities["sibling"]]
+    activities["child"].subactivities = [activities["grandchild"]]
+    model.root_activity = activities["root"]
+
+    db.session.add_all([project, model, *activities.values()])
+    db.session.commit()
+    return activities["root"]
+
+
+def _cached_names(db: SQLAlchemy) -> set[str]:
+    """Return the name of all the activities with a cache entry"""
+    return {
+        db.session.get(Activity, cache.activity_id).name
+        for cache in ActivityImpactCache.query.all()
+    }
+
+
+def _total(activity: Activity) -> float:
+    return (
+        get_activity_impact(activity)
+        .total[ImpactCategory.CLIMATE_CHANGE]
+        .manufacture.magnitude
+    )
+
+
+@mock.patch("impacts_model.data_model.impact_source_factory", impact_source_mock)
+def test_get_activity_impact_cached(
+    db: SQLAlchemy, activity_tree_fixture: Activity
+) -> None:
+    """Test that impacts are cached for the whole tree and then served from the cache"""
+    impact = get_activity_impact(activity_tree_fixture)
+    db.session.commit()
+    assert _cached_names(db) == {"root", "child", "grandchild", "sibling"}
+    assert (
+        impact.total[ImpactCategory.CLIMATE_CHANGE].manufacture
+        == activity_tree_fixture.get_impact()
+        .total[ImpactCategory.CLIMATE_CHANGE]
+        .manufacture
+    )
+
+    # Cached impact is the same, without any computation
+    with mock.patch.object(
+        Activity, "aggregate_impact", side_effect=Exception("Not cached")
+    ):
+        cached = get_activity_impact(activity_tree_fixture)
+    assert (
+        cached.total[ImpactCategory.CLIMATE_CHANGE].manufacture
+        == impact.total[ImpactCategory.CLIMATE_CHANGE].manufacture
+    )
+    assert [s.activity_id for s in cached.sub_activities] == [
+        s.activity_id for s in impact.sub_activities
+    ]
+    assert (
+        cached.impact_sources["testImpactSource"]
+        .total_impact[ImpactCategory.CLIMATE_CHANGE]
+        .manufacture
+        == 4000 * KG_CO2E
+    )
+
+
+@mock.patch("impacts_model.data_model.impact_source_factory", impact_source_mock)
+def test_cache_invalidation_resource(
+    db: SQLAlchemy, activity_tree_fixture: Activity
+) -> None:
+    """Test that moving or deleting a resource invalidate its activities and their ancestors"""
+    get_activity_impact(activity_tree_fixture)
+    db.session.commit()
+
+    # Move grandchild resource to sibling
+    grandchild = Activity.query.filter(Activity.name == "grandchild").one()
+    sibling = Activity.query.filter(Activity.name == "sibling").one()
+    grandchild.resources[0].activity_id = sibling.id
+    db.session.commit()
+    assert _cached_names(db) == set()
+    assert _total(activity_tree_fixture) == 4000
+    assert _total(sibling) == 2000
+    db.session.commit()
+
+    # Deletion
+    db.session.delete(sibling.resources[0])
+    db.session.commit()
+    assert _cached_names(db) == {"child", "grandchild"}
+    assert _total(activity_tree_fixture) == 3000
+
+
+@mock.patch("impacts_model.data_model.impact_source_factory", impact_source_mock)
+def test_cache_resource_delta(db: SQLAlchemy, activity_tree_fixture: Activity) -> None:
+    """Test that updating a resource quantity or creating a resource updates the cache in place"""
+    get_activity_impact(activity_tree_fixture)
+    db.session.commit()
+
+    # Update
+    grandchild = Activity.query.filter(Activity.name == "grandchild").one()
+    grandchild.resources[0].amount = 3 * SERVER
+    db.session.commit()
+    assert _cached_names(db) == {"root", "child", "grandchild", "sibling"}
+    with mock.patch.object(
+        Activity, "aggregate_impact", side_effect=Exception("Not cached")
+    ):
+        assert _total(activity_tree_fixture) == 6000
+        assert _total(grandchild) == 3000
+
+    # Creation
+    sibling = Activity.query.filter(Activity.name == "sibling").one()
+    db.session.add(
+        Resource(
+            name="new resource",
+            impact_source_id="testImpactSource",
+            amount=2 * SERVER,
+            activity_id=sibling.id,
+        )
+    )
+    db.session.commit()
+    assert _cached_names(db) == {"root", "child", "grandchild", "sibling"}
+    with mock.patch.object(
+        Activity, "aggregate_impact", side_effect=Exception("Not cached")
+    ):
+        assert _total(activity_tree_fixture) == 8000
+        assert _total(sibling) == 3000
+
+    assert check_activity_impact(activity_tree_fixture) == []
+
+
+@mock.patch("impacts_model.data_model.impact_source_factory", impact_source_mock)
+def test_check_activity_impact(db: SQLAlchemy, activity_tree_fixture: Activity) -> None:
+    """Test that the consistency checker finds entries different from a computation from scratch"""
+    get_activity_impact(activity_tree_fixture)
+    db.session.commit()
+    assert check_activity_impact(activity_tree_fixture) == []
+
+    # Corrupt the child entry
+    child = Activity.query.filter(Activity.name == "child").one()
+    delta = child.resources[0].get_impact()
+    child.impact_cache.add_impact_source_impact(delta)
+    db.session.commit()
+    assert check_activity_impact(activity_tree_fixture) == [child.id]
+
+
+@mock.patch("impacts_model.data_model.impact_source_factory", impact_source_mock)
+def test_cache_invalidation_activity(
+    db: SQLAlchemy, activity_tree_fixture: Activity
+) -> None:
+    """Test that creating, moving or deleting a subactivity invalidate its ancestors"""
+    get_activity_impact(activity_tree_fixture)
+    db.session.commit()
+
+    # Creation
+    child = Activity.query.filter(Activity.name == "child").one()
+    child.subactivities.append(
+        Activity(
+            name="new",
+            resources=[
+                Resource(
+                    name="new resource",
+                    impact_source_id="testImpactSource",
+                    amount=1 * SERVER,
+                )
+            ],
+        )
+    )
+    db.session.commit()
+    assert _cached_names(db) == {"grandchild", "sibling"}
+    assert _total(activity_tree_fixture) == 5000
+    db.session.commit()
+
+    # Move grandchild under sibling
+    grandchild = Activity.query.filter(Activity.name == "grandchild").one()
+    sibling = Activity.query.filter(Activity.name == "sibling").one()
+    grandchild.parent_activity_id = sibling.id
+    db.session.commit()
+    assert _cached_names(db) == {"grandchild", "new"}
+    assert _total(activity_tree_fixture) == 5000
+    assert _total(sibling) == 2000
+    db.session.commit()
+
+    # Deletion
+    db.session.delete(grandchild)
+    db.session.commit()
+    assert _cached_names(db) == {"child", "new"}
+    assert _total(activity_tree_fixture) == 4000
+
+
+@mock.patch("impacts_model.data_model.impact_source_factory", impact_source_mock)
+def test_cache_catalog_version(db: SQLAlchemy, activity_tree_fixture: Activity) -> None:
+    """Test that entries computed with another catalog version are recomputed"""
+    get_activity_impact(activity_tree_fixture)
+    db.session.commit()
+
+    with mock.patch("impacts_model.data_model.catalog_version", "other version"):
+        get_activity_impact(activity_tree_fixture)
+        db.session.commit()
+        assert {cache.catalog_version for cache in ActivityImpactCache.query.all()} == {
+            "other version"
+        }
+
+
+@mock.patch("impacts_model.data_model.impact_source_factory", impact_source_mock)
+def test_get_activity_impact_depth(
+    db: SQLAlchemy, activity_tree_fixture: Activity
+) -> None:
+    """Test that a depth limited impact still caches the whole tree, and keeps its totals"""
+    impact = get_activity_impact(activity_tree_fixture, depth=0)
+    db.session.commit()
+    assert impact.sub_activities == []
+    assert _cached_names(db) == {"root", "child", "grandchild", "sibling"}
+
+    impact = get_activity_impact(activity_tree_fixture, depth=1)
+    assert [s.sub_activities for s in impact.sub_activities] == [[], []]
+    assert impact.sub_activities[0].total[
+        ImpactCategory.CLIMATE_CHANGE
+    ].manufacture == (2000 * KG_CO2E)
+
+
+@mock.patch("impacts_model.data_model.impact_source_factory", impact_source_mock)
+def test_commit_activity_impacts_concurrent_entry(
+    db: SQLAlchemy, activity_tree_fixture: Activity
+) -> None:
+    """Test that an entry inserted by a concurrent request is kept instead of failing"""
+    versions = get_tree_versions(db.session, [activity_tree_fixture.id])
+    assert versions == {activity_tree_fixture.id: 0}
+    get_activity_impact(activity_tree_fixture)
+
+    # Root entry inserted by another request in the meantime
+    db.session.execute(
+        insert(ActivityImpactCache).values(
+            activity_id=activity_tree_fixture.id,
+            catalog_version="concurrent",
+            _total="{}",
+            _impact_sources="{}",
+        )
+    )
+    assert commit_activity_impacts(db.session, versions)
+    assert _cached_names(db) == {"root", "child", "grandchild", "sibling"}
+    assert db.session.get(
+        ActivityImpactCache, activity_tree_fixture.id
+    ).catalog_version == ("concurrent")
+
+
+@mock.patch("impacts_model.data_model.impact_source_factory", impact_source_mock)
+def test_commit_activity_impacts_changed_tree(
+    db: SQLAlchemy, activity_tree_fixture: Activity
+) -> None:
+    """Test that entries are discarded if the tree changed after its version was read"""
+    versions = get_tree_versions(db.session, [activity_tree_fixture.id])
+
+    # Change committed by another request before the entries are saved
+    grandchild = Activity.query.filter(Activity.name == "grandchild").one()
+    grandchild.resources[0].amount = 3 * SERVER
+    db.session.commit()
+    assert get_tree_versions(db.session, [grandchild.id]) == {
+        activity_tree_fixture.id: 1
+    }
+
+    get_activity_impact(activity_tree_fixture)
+    assert not commit_activity_impacts(db.session, versions)
+    assert _cached_names(db) == set()
+
+    # Saved with the current version
+    versions = get_tree_versions(db.session, [activity_tree_fixture.id])
+    assert _total(activity_tree_fixture) == 6000
+    assert commit_activity_impacts(db.session, versions)
+    assert _cached_names(db) == {"root", "child", "grandchild", "sibling"}
+    assert check_activity_impact(activity_tree_fixture) == []
@@ -28,18 +28,26 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
+from copy import deepcopy
 import json
 from os import listdir
 from os.path import isfile, join
 from impacts_model.data_model import ProjectSchema
+import pytest
 from impacts_model.impact_sources import (
     ImpactSource,
+    impact_source_factory,
 )
 
 ##########
 # STATIC #
 ##########
-from impacts_model.impacts import EnvironmentalImpact, ImpactCategory, ImpactValue
+from impacts_model.impacts import (
+    EnvironmentalImpact,
+    ImpactCategory,
+    ImpactSourceImpact,
+    ImpactValue,
+)
 from impacts_model.quantities.quantities import (
     CUBIC_METER,
     DISEASE_INCIDENCE,
@@ -168,3 +176,39 @@ def test_gitlab_computation() -> None:
         assert value.manufacture + value.use == co2_nominal
     else:
         raise Exception("Gitlab value manufacture or use is None")
+
+
+def test_impact_source_impact_collapsed() -> None:
+    """Test that collapsing sub impacts keeps the total, also once multiplied or added"""
+    impact_source = impact_source_factory("userDevice")
+    impact = impact_source.unit_impact.multiplied_by(3 * impact_source.unit)
+    collapsed = impact_source.get_unit_impact(sub_impacts=False).multiplied_by(
+        3 * impact_source.unit
+    )
+    assert collapsed.sub_impacts == {}
+    assert collapsed.own_impact.keys() == impact.own_impact.keys()
+
+    collapsed.add(deepcopy(collapsed))
+    impact.add(deepcopy(impact))
+    for category, value in impact.total_impact.items():
+        for phase in ["manufacture", "use"]:
+            expected = getattr(value, phase)
+            if expected is not None:
+                assert getattr(collapsed.total_impact[category], phase).to(
+                    expected.units
+                ).magnitude == pytest.approx(expected.magnitude)
+
+
+def test_impacts_slots() -> None:
+    """Test that impact objects have no __dict__, and can still be copied and serialized"""
+    impact_source = impact_source_factory("userDevice")
+    impact = impact_source.unit_impact.multiplied_by(3 * impact_source.unit)
+    value = impact.total_impact[ImpactCategory.CLIMATE_CHANGE]
+    assert not hasattr(value, "__dict__")
+    assert not hasattr(impact, "__dict__")
+    with pytest.raises(AttributeError):
+        value.other = None  # type: ignore
+
+    copied = ImpactSourceImpact.from_dict(deepcopy(impact).to_dict())
+    assert copied.impact_source_id == impact.impact_source_id
+    assert copied.total_impact[ImpactCategory.CLIMATE_CHANGE].use == value.use
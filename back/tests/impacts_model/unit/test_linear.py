@@ -0,0 +1,116 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import json
+
+import numpy as np
+import pytest
+
+from impacts_model.data_model import Activity, ProjectSchema
+from impacts_model.impacts import ActivityImpact, ImpactCategory
+from impacts_model.linear import compile_activity, get_scenarios_impacts
+
+
+@pytest.fixture(scope="function")
+def gitlab_activity() -> Activity:
+    """Root activity of the first gitlab example model, not saved"""
+    f = open("./examples/gitlab.json", "r")
+    project = ProjectSchema().load(json.load(f))
+    return project.models[0].root_activity
+
+
+def _totals(impact: ActivityImpact) -> list[float]:
+    """Return an ActivityImpact total by category, manufacture and use summed"""
+    totals = []
+    for category in ImpactCategory:
+        value = impact.total.get(category)
+        total = 0.0
+        if value is not None:
+            for quantity in [value.manufacture, value.use]:
+                if quantity is not None:
+                    total += quantity.to(category.value).magnitude
+        totals.append(total)
+    return totals
+
+
+def test_compile_activity(gitlab_activity: Activity) -> None:
+    """Test that the compiled model gives the impacts of the engine, for all the activities"""
+    compiled = compile_activity(gitlab_activity)
+    impact = gitlab_activity.get_impact()
+
+    impacts = compiled.evaluate(activities=True)
+    assert impacts.shape == (1, len(compiled.activities), len(ImpactCategory))
+    assert list(impacts[0, 0]) == pytest.approx(_totals(impact))
+    assert list(compiled.evaluate()[0, 0]) == pytest.approx(_totals(impact))
+
+    # Sub activities are the next ones depth first
+    sub_impact = impact.sub_activities[0]
+    index = compiled.activities.index(gitlab_activity.subactivities[0])
+    assert list(impacts[0, index]) == pytest.approx(_totals(sub_impact))
+
+
+def test_get_scenarios_impacts(gitlab_activity: Activity) -> None:
+    """Test scaling of the resources by impact source and by activity"""
+    compiled = compile_activity(gitlab_activity)
+    nominal = compiled.evaluate()[0, 0]
+    impact_source_id = compiled.resources[0].impact_source_id
+    selected = compiled.select({"impact_source_id": impact_source_id})
+    selected_impacts = compiled.values[selected] @ compiled.factors[selected]
+
+    scenarios = [
+        {"name": "nominal", "scaling": []},
+        {
+            "name": "double",
+            "scaling": [
+                {"impact_source_id": id, "factor": 2} for id in compiled.impact_sources
+            ],
+        },
+        {
+            "name": "half",
+            "scaling": [{"impact_source_id": impact_source_id, "factor": 0.5}],
+        },
+    ]
+    impacts = get_scenarios_impacts(compiled, scenarios)
+    assert [impact.name for impact in impacts] == ["nominal", "double", "half"]
+
+    climate_change = [
+        impact.total[ImpactCategory.CLIMATE_CHANGE].magnitude for impact in impacts
+    ]
+    index = list(ImpactCategory).index(ImpactCategory.CLIMATE_CHANGE)
+    assert climate_change[0] == pytest.approx(nominal[index])
+    assert climate_change[1] == pytest.approx(2 * nominal[index])
+    assert climate_change[2] == pytest.approx(
+        nominal[index] - selected_impacts[index] / 2
+    )
+
+    # Unknown resource
+    with pytest.raises(ValueError):
+        get_scenarios_impacts(
+            compiled, [{"name": "", "scaling": [{"resource_id": -1, "factor": 2}]}]
+        )
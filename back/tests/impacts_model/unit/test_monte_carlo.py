@@ -0,0 +1,157 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+from unittest import mock
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from impacts_model.data_model import Activity, Resource
+from impacts_model.impact_sources import ImpactSource
+from impacts_model.impacts import ImpactCategory, ImpactValue
+from impacts_model.monte_carlo import get_activity_uncertainty
+from impacts_model.quantities.quantities import KG_CO2E, SERVER
+from impacts_model.uncertainty import Uncertainty
+
+
+@pytest.fixture(scope="function")
+def activity_fixture() -> Activity:
+    """Activity with a subactivity, not saved"""
+    activity = Activity(name="Test activity")
+    activity.resources = [
+        Resource(
+            name="testResource 1",
+            impact_source_id="testImpactSource",
+            amount=1 * SERVER,
+        )
+    ]
+    subactivity = Activity(name="Test subactivity")
+    subactivity.resources = [
+        Resource(
+            name="testResource 2",
+            impact_source_id="testImpactSource",
+            amount=2 * SERVER,
+        )
+    ]
+    activity.subactivities = [subactivity]
+    return activity
+
+
+def test_uncertainty() -> None:
+    """Test distributions parameters validation and samples"""
+    with pytest.raises(ValueError):
+        Uncertainty("unknown")
+    with pytest.raises(ValueError):
+        Uncertainty("lognormal", gsd=0.5)
+    with pytest.raises(ValueError):
+        Uncertainty("uniform", min=1.1, max=1.2)
+
+    uncertainty = Uncertainty("uniform", min=0.9, max=1.2)
+    assert Uncertainty.from_dict(uncertainty.to_dict()).to_dict() == {
+        "distribution": "uniform",
+        "min": 0.9,
+        "max": 1.2,
+    }
+    assert list(uncertainty.interval()) == [0.9, 1, 1.2]
+    assert list(Uncertainty("normal", sd=0.1).interval()) == pytest.approx(
+        [0.804, 1, 1.196]
+    )
+    samples = uncertainty.sample(np.random.default_rng(0), 1000)
+    assert samples.shape == (1000,)
+    assert samples.min() >= 0.9 and samples.max() <= 1.2
+
+
+@mock.patch(
+    "impacts_model.data_model.impact_source_factory",
+    MagicMock(
+        return_value=ImpactSource(
+            id="testImpactSource",
+            name="test",
+            unit=SERVER,
+            environmental_impact={
+                ImpactCategory.CLIMATE_CHANGE: ImpactValue(
+                    manufacture=100 * KG_CO2E, use=1000 * KG_CO2E
+                )
+            },
+        )
+    ),
+)
+def test_get_activity_uncertainty_exact(activity_fixture: Activity) -> None:
+    """Test that without uncertainty all the samples are the nominal impact"""
+    uncertainty = get_activity_uncertainty(activity_fixture, 100, [5, 50, 95])
+
+    total = uncertainty.total[ImpactCategory.CLIMATE_CHANGE]
+    assert total.unit == "kg_co2e"
+    assert total.mean == pytest.approx(3300)
+    assert list(total.percentiles.values()) == pytest.approx([3300, 3300, 3300])
+
+    sub_total = uncertainty.sub_activities[0].total[ImpactCategory.CLIMATE_CHANGE]
+    assert sub_total.mean == pytest.approx(2200)
+
+
+@mock.patch(
+    "impacts_model.data_model.impact_source_factory",
+    MagicMock(
+        return_value=ImpactSource(
+            id="testImpactSource",
+            name="test",
+            unit=SERVER,
+            environmental_impact={
+                ImpactCategory.CLIMATE_CHANGE: ImpactValue(use=1000 * KG_CO2E)
+            },
+            uncertainty={"climate_change": Uncertainty("normal", sd=0.1)},
+        )
+    ),
+)
+def test_get_activity_uncertainty(activity_fixture: Activity) -> None:
+    """Test the propagation of impact factors and resources amounts uncertainties"""
+    uncertainty = get_activity_uncertainty(activity_fixture, 10000, [5, 95], seed=1)
+    total = uncertainty.total[ImpactCategory.CLIMATE_CHANGE]
+    assert total.mean == pytest.approx(3000, rel=0.01)
+    # The factor is shared by both resources, the relative spread is the factor one
+    assert total.percentiles["5"] == pytest.approx(3000 * (1 - 1.645 * 0.1), rel=0.02)
+    assert total.percentiles["95"] == pytest.approx(3000 * (1 + 1.645 * 0.1), rel=0.02)
+
+    # Same seed, same results
+    assert (
+        get_activity_uncertainty(activity_fixture, 10000, [5, 95], seed=1)
+        .total[ImpactCategory.CLIMATE_CHANGE]
+        .percentiles
+        == total.percentiles
+    )
+
+    # Resource amount uncertainty widens the distribution
+    activity_fixture.resources[0].uncertainty = Uncertainty("uniform", min=0.5, max=1.5)
+    wider = get_activity_uncertainty(activity_fixture, 10000, [5, 95], seed=1).total[
+        ImpactCategory.CLIMATE_CHANGE
+    ]
+    assert wider.mean == pytest.approx(3000, rel=0.01)
+    assert wider.percentiles["5"] < total.percentiles["5"]
+    assert wider.percentiles["95"] > total.percentiles["95"]
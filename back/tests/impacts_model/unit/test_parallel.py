@@ -0,0 +1,119 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import json
+
+import pytest
+
+from impacts_model.data_model import Activity, ProjectSchema
+from impacts_model.impacts import ImpactCategory
+from impacts_model.parallel import (
+    compute_activities_impacts,
+    compute_sharded_impact,
+    count_resources,
+    deserialize_activity_tree,
+    serialize_activity_tree,
+    split_activity_tree,
+)
+
+
+@pytest.fixture(scope="function")
+def gitlab_activities() -> list[Activity]:
+    """Root activities of the gitlab example models, not saved"""
+    f = open("./examples/gitlab.json", "r")
+    project = ProjectSchema().load(json.load(f))
+    return [model.root_activity for model in project.models]
+
+
+def test_serialize_activity_tree(gitlab_activities: list[Activity]) -> None:
+    """Test that a serialized activity tree is rebuilt with the same impact"""
+    activity = gitlab_activities[0]
+    data = serialize_activity_tree(activity)
+    json.dumps(data)  # Plain data only
+
+    rebuilt = deserialize_activity_tree(data)
+    assert len(rebuilt.subactivities) == len(activity.subactivities)
+    assert (
+        rebuilt.get_impact().total[ImpactCategory.CLIMATE_CHANGE].manufacture
+        == activity.get_impact().total[ImpactCategory.CLIMATE_CHANGE].manufacture
+    )
+
+
+def test_compute_activities_impacts(gitlab_activities: list[Activity]) -> None:
+    """Test that impacts computed on the process pool are identical to serial ones"""
+    serial = compute_activities_impacts(gitlab_activities, max_workers=1)
+    parallel = compute_activities_impacts(
+        gitlab_activities, max_workers=2, min_parallel=2
+    )
+
+    assert len(parallel) == len(gitlab_activities)
+    for serial_impact, parallel_impact in zip(serial, parallel):
+        for category in ImpactCategory:
+            assert (
+                serial_impact.total[category].manufacture
+                == parallel_impact.total[category].manufacture
+            )
+            assert (
+                serial_impact.total[category].use == parallel_impact.total[category].use
+            )
+        assert (
+            serial_impact.impact_sources.keys() == parallel_impact.impact_sources.keys()
+        )
+        assert len(serial_impact.sub_activities) == len(parallel_impact.sub_activities)
+
+
+def test_split_activity_tree(gitlab_activities: list[Activity]) -> None:
+    """Test that subtrees are under the threshold and cover all the resources"""
+    activity = gitlab_activities[0]
+    total = count_resources(activity)
+
+    subtrees = split_activity_tree(activity, total)
+    assert subtrees == [activity]
+
+    subtrees = split_activity_tree(activity, 3)
+    assert len(subtrees) > 1
+    counts = [count_resources(subtree) for subtree in subtrees]
+    assert all(0 < count <= 3 for count in counts)
+    assert counts == sorted(counts, reverse=True)
+    # Resources above the subtrees are the ones of the split activities
+    assert sum(counts) <= total
+
+
+def test_compute_sharded_impact(gitlab_activities: list[Activity]) -> None:
+    """Test that a tree computed by subtrees is identical to the serial computation"""
+    activity = gitlab_activities[0]
+    serial = activity.get_impact()
+    sharded = compute_sharded_impact(activity, threshold=3, max_workers=2)
+
+    for category in ImpactCategory:
+        assert serial.total[category].manufacture == sharded.total[category].manufacture
+        assert serial.total[category].use == sharded.total[category].use
+    assert serial.impact_sources.keys() == sharded.impact_sources.keys()
+    assert len(serial.sub_activities) == len(sharded.sub_activities)
@@ -0,0 +1,98 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+from unittest import mock
+from unittest.mock import MagicMock
+
+import pytest
+
+from impacts_model.data_model import Activity, Resource
+from impacts_model.impact_sources import ImpactSource, impact_source_factory
+from impacts_model.impacts import ImpactCategory, ImpactValue
+from impacts_model.linear import compile_activity
+from impacts_model.quantities.quantities import KG_CO2E, SERVER
+from impacts_model.sensitivity import get_sensitivity
+
+
+@mock.patch(
+    "impacts_model.data_model.impact_source_factory",
+    MagicMock(
+        return_value=ImpactSource(
+            id="testImpactSource",
+            name="test",
+            unit=SERVER,
+            uses=[{"quantity": "10 kWh", "resource_id": "electricity"}],
+            environmental_impact={
+                ImpactCategory.CLIMATE_CHANGE: ImpactValue(manufacture=100 * KG_CO2E)
+            },
+        )
+    ),
+)
+def test_get_sensitivity() -> None:
+    """Test partial derivatives and elasticities of resources and of the factors they use"""
+    activity = Activity(name="Test activity")
+    activity.resources = [
+        Resource(name="A", impact_source_id="testImpactSource", amount=2 * SERVER),
+        Resource(name="B", impact_source_id="testImpactSource", amount=3 * SERVER),
+    ]
+    electricity = impact_source_factory("electricity")
+    electricity_factor = (
+        electricity.unit_impact.own_impact[ImpactCategory.CLIMATE_CHANGE].use
+        * electricity.unit
+    ).to(KG_CO2E)
+    unit_impact = 100 + 10 * electricity_factor.magnitude
+
+    sensitivity = get_sensitivity(compile_activity(activity))
+    assert sensitivity.total[ImpactCategory.CLIMATE_CHANGE].magnitude == pytest.approx(
+        5 * unit_impact
+    )
+
+    first, second = sensitivity.resources
+    assert first.name == "A" and first.unit == "server"
+    assert first.partial[ImpactCategory.CLIMATE_CHANGE] == pytest.approx(unit_impact)
+    assert first.elasticity[ImpactCategory.CLIMATE_CHANGE] == pytest.approx(2 / 5)
+    assert second.elasticity[ImpactCategory.CLIMATE_CHANGE] == pytest.approx(3 / 5)
+
+    factors = {factor.impact_source_id: factor for factor in sensitivity.factors}
+    # Quantities of each impact source consumed by the model
+    assert factors["testImpactSource"].partial[
+        ImpactCategory.CLIMATE_CHANGE
+    ] == pytest.approx(5)
+    assert factors["electricity"].partial[
+        ImpactCategory.CLIMATE_CHANGE
+    ] == pytest.approx(50)
+    assert factors["electricity"].elasticity[
+        ImpactCategory.CLIMATE_CHANGE
+    ] == pytest.approx(50 * electricity_factor.magnitude / (5 * unit_impact))
+    # No factor set
+    assert factors["testImpactSource"].partial[ImpactCategory.ACIDIFICATION] is None
+    assert sum(
+        factor.elasticity[ImpactCategory.CLIMATE_CHANGE]
+        for factor in sensitivity.factors
+    ) == pytest.approx(1)
@@ -0,0 +1,88 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+from unittest import mock
+from unittest import mock
+from unittest.mock import MagicMock
+
+import pytest
+
+from impacts_model.data_model import Activity, Resource
+from impacts_model.impact_sources import ImpactSource
+from impacts_model.impacts import ImpactCategory, ImpactValue
+from impacts_model.linear import compile_activity
+from impacts_model.quantities.quantities import KG_CO2E, SERVER
+from impacts_model.solver import solve_reduction
+
+
+@mock.patch(
+    "impacts_model.data_model.impact_source_factory",
+    MagicMock(
+        return_value=ImpactSource(
+            id="testImpactSource",
+            name="test",
+            unit=SERVER,
+            environmental_impact={
+                ImpactCategory.CLIMATE_CHANGE: ImpactValue(manufacture=100 * KG_CO2E)
+            },
+        )
+    ),
+)
+def test_solve_reduction() -> None:
+    """Test the smallest changes within bounds are found, or the targets reported infeasible"""
+    activity = Activity(name="Test activity")
+    activity.resources = [
+        Resource(name="A", impact_source_id="testImpactSource", amount=2 * SERVER),
+        Resource(name="B", impact_source_id="testImpactSource", amount=8 * SERVER),
+    ]
+    compiled = compile_activity(activity)
+    targets = {"climate_change": "600 kg_co2e"}
+
+    # Total is 1000 kg, cutting 400 kg is cheaper on the biggest resource
+    bounds = [{"impact_source_id": "testImpactSource", "min": -1, "max": 0}]
+    reduction = solve_reduction(compiled, targets, bounds)
+    assert reduction.feasible
+    assert reduction.reduced_total[
+        ImpactCategory.CLIMATE_CHANGE
+    ].magnitude == pytest.approx(600)
+    assert len(reduction.changes) == 1
+    assert reduction.changes[0].name == "B"
+    assert reduction.changes[0].change == pytest.approx(-0.5)
+
+    # Only A can change, removing it is not enough
+    compiled.resources[0].id = 1
+    bounds = [{"resource_id": 1, "min": -1, "max": 0}]
+    reduction = solve_reduction(compiled, targets, bounds)
+    assert not reduction.feasible
+    assert reduction.reduced_total is None
+
+    # No bounds, targets already met
+    reduction = solve_reduction(compiled, {"climate_change": "2000 kg_co2e"}, [])
+    assert reduction.feasible
+    assert reduction.changes == []
@@ -0,0 +1,94 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+from unittest import mock
+import json
+from unittest import mock
+from unittest.mock import MagicMock
+
+from flask_sqlalchemy import SQLAlchemy
+
+from impacts_model.data_model import Activity, Model, Project, Resource
+from impacts_model.impact_cache import get_activity_impact
+from impacts_model.impact_sources import ImpactSource
+from impacts_model.impacts import ActivityImpactSchema, ImpactCategory, ImpactValue
+from impacts_model.quantities.quantities import KG_CO2E, SERVER
+from impacts_model.streaming import stream_activity_impact
+
+
+@mock.patch(
+    "impacts_model.data_model.impact_source_factory",
+    MagicMock(
+        return_value=ImpactSource(
+            id="testImpactSource",
+            name="test",
+            unit=SERVER,
+            uses=[{"quantity": "10 kWh", "resource_id": "electricity"}],
+            environmental_impact={
+                ImpactCategory.CLIMATE_CHANGE: ImpactValue(manufacture=100 * KG_CO2E)
+            },
+        )
+    ),
+)
+def test_stream_activity_impact(db: SQLAlchemy) -> None:
+    """Test that the streamed document is the dumped ActivityImpact, computed or cached"""
+    project = Project(name="Project test_streaming")
+    model = Model(name="Model test_streaming")
+    project.models = [model]
+    activities = [Activity(name=str(index)) for index in range(4)]
+    for index, activity in enumerate(activities):
+        activity.resources = [
+            Resource(
+                name=str(index),
+                impact_source_id="testImpactSource",
+                amount=(index + 1) * SERVER,
+            )
+        ]
+    activities[0].subactivities = [activities[1], activities[3]]
+    activities[1].subactivities = [activities[2]]
+    model.root_activity = activities[0]
+    db.session.add_all([project, model, *activities])
+    db.session.commit()
+
+    expected = ActivityImpactSchema().dump(activities[0].get_impact())
+    assert json.loads("".join(stream_activity_impact(activities[0]))) == expected
+
+    get_activity_impact(activities[0])
+    db.session.commit()
+    assert json.loads("".join(stream_activity_impact(activities[0]))) == expected
+
+    expected = ActivityImpactSchema().dump(
+        activities[0].get_impact(depth=1, categories=[ImpactCategory.CLIMATE_CHANGE])
+    )
+    streamed = "".join(
+        stream_activity_impact(
+            activities[0], depth=1, categories=[ImpactCategory.CLIMATE_CHANGE]
+        )
+    )
+    assert json.loads(streamed) == expected
@@ -0,0 +1,106 @@
+# BSD-3-Clause License
+#
+# Copyright 2017 Orange
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+#    may be used to endorse or promote products derived from this software
+#    without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+from unittest import mock
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from impacts_model.data_model import Activity, Resource
+from impacts_model.impact_sources import ImpactSource
+from impacts_model.impacts import ImpactCategory, ImpactValue
+from impacts_model.quantities.quantities import KG_CO2E, SERVER, ureg
+from impacts_model.timeline import distribute, get_activity_timeline
+
+
+def test_distribute() -> None:
+    """Test the share of continuous, periodic and single resources in each bucket"""
+    edges = np.arange(5) * 3  # 4 quarters
+    distribution = distribute(
+        periods=np.array([6, 12, 0, 4]),
+        frequencies=np.array([0, 5, 0, 0]),
+        edges=edges,
+    )
+    assert distribution.shape == (4, 4)
+    assert distribution.sum(axis=1) == pytest.approx([1, 1, 1, 1])
+    # Continuous over 6 months
+    assert list(distribution[0]) == pytest.approx([0.5, 0.5, 0, 0])
+    # Every 5 months over a year: months 0, 5 and 10
+    assert list(distribution[1]) == pytest.approx([1 / 3, 1 / 3, 0, 1 / 3])
+    # No period, at the start
+    assert list(distribution[2]) == [1, 0, 0, 0]
+    # Period not a multiple of the buckets
+    assert list(distribution[3]) == pytest.approx([0.75, 0.25, 0, 0])
+
+
+@mock.patch(
+    "impacts_model.data_model.impact_source_factory",
+    MagicMock(
+        return_value=ImpactSource(
+            id="testImpactSource",
+            name="test",
+            unit=SERVER,
+            environmental_impact={
+                ImpactCategory.CLIMATE_CHANGE: ImpactValue(
+                    manufacture=100 * KG_CO2E, use=1100 * KG_CO2E
+                )
+            },
+        )
+    ),
+)
+def test_get_activity_timeline() -> None:
+    """Test that resources impacts are distributed by year and summed up the tree"""
+    activity = Activity(name="Test activity")
+    activity.resources = [
+        Resource(
+            name="Single",
+            impact_source_id="testImpactSource",
+            amount=1 * SERVER,
+        )
+    ]
+    subactivity = Activity(name="Test subactivity")
+    subactivity.resources = [
+        Resource(
+            name="Every six months",
+            impact_source_id="testImpactSource",
+            amount=1 * SERVER,
+            period=ureg("3 year"),
+            frequency=ureg("6 month"),
+        )
+    ]
+    activity.subactivities = [subactivity]
+
+    timeline = get_activity_timeline(activity, "year")
+    climate_change = timeline.timeline[ImpactCategory.CLIMATE_CHANGE]
+    assert climate_change.unit == "kg_co2e"
+    # 6 occurrences for a total of 6 * 1200, 2 by year
+    assert climate_change.values == pytest.approx([1200 + 2400, 2400, 2400])
+    sub_values = timeline.sub_activities[0].timeline[ImpactCategory.CLIMATE_CHANGE]
+    assert sub_values.values == pytest.approx([2400, 2400, 2400])